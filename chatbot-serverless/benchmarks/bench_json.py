@@ -0,0 +1,135 @@
+"""
+Benchmark of JSON serialization for large pet / adoption solicitation lists.
+
+Compares the approaches used to serialize DynamoDB results (numbers as Decimal):
+    - convert-then-dumps: recursive copy replacing Decimal/sets, then json.dumps
+    - json.dumps(default=...): stdlib encoder with a per-object fallback
+    - json_utils (stdlib): the shared serializer without orjson
+    - json_utils (orjson): the shared serializer with orjson, when installed
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_json --pets 5000 --solicitations 5000 --repeat 5
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from utils import json_utils
+
+
+def make_pets(count):
+    species = ['Cachorro', 'Gato', 'Pássaro']
+    breeds = ['Labrador', 'Poodle', 'Siamês', 'Persa', 'Calopsita', 'Sem raça específica']
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'nome': f'Pet {i}',
+            'especie': random.choice(species),
+            'raça': random.choice(breeds),
+            'idade': Decimal(random.randint(1, 15)),
+            'peso': Decimal(f'{random.uniform(1, 40):.2f}'),
+            'disponivel': random.random() > 0.3,
+            'tags': {'vacinado', 'castrado'},
+        }
+        for i in range(count)
+    ]
+
+
+def make_solicitations(count, pets):
+    now = datetime.now()
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'pet': pet,
+            'user': {
+                'id': str(uuid.uuid4()),
+                'name': f'Usuário {i}',
+                'email': f'user{i}@example.com',
+                'phone': f'+55119{i:08d}',
+                'age': Decimal(random.randint(18, 80)),
+            },
+            'dataCriacao': (now - timedelta(minutes=i)).isoformat(),
+            'atualizadoEm': now - timedelta(minutes=i),
+            'status': 'Pendente',
+        }
+        for i, pet in ((i, random.choice(pets)) for i in range(count))
+    ]
+
+
+def convert(value):
+    if isinstance(value, dict):
+        return {key: convert(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [convert(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return [convert(item) for item in value]
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def convert_then_dumps(payload):
+    return json.dumps(convert(payload))
+
+
+def stdlib_default(payload):
+    return json.dumps(payload, default=json_utils._default)
+
+
+def json_utils_stdlib(payload):
+    return json_utils._encoder.encode(payload)
+
+
+def json_utils_dumps(payload):
+    return json_utils.dumps(payload)
+
+
+def measure(function, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = function(payload)
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body.encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pets', type=int, default=5000)
+    parser.add_argument('--solicitations', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    pets = make_pets(args.pets)
+    payloads = {
+        f'{args.pets} pets': pets,
+        f'{args.solicitations} solicitations': {'data': make_solicitations(args.solicitations, pets)},
+    }
+
+    candidates = [
+        ('convert-then-dumps', convert_then_dumps),
+        ('json.dumps(default=...)', stdlib_default),
+        ('json_utils (stdlib)', json_utils_stdlib),
+    ]
+    if json_utils.orjson is not None:
+        candidates.append(('json_utils (orjson)', json_utils_dumps))
+    else:
+        print('orjson is not installed, skipping the orjson path')
+
+    for name, payload in payloads.items():
+        print(f'\n{name}')
+        print(f"{'serializer':<26}{'best ms':>10}{'MB/s':>10}{'bytes':>12}")
+        for label, function in candidates:
+            seconds, size = measure(function, payload, args.repeat)
+            print(f'{label:<26}{seconds * 1000:>10.1f}{size / seconds / 1e6:>10.1f}{size:>12}')
+
+
+if __name__ == '__main__':
+    main()
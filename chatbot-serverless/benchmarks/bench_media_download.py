@@ -0,0 +1,90 @@
+"""
+Benchmark of the Twilio media downloads: one connection per download vs the pooled session.
+
+Serves a photo-sized body from a local keep-alive HTTP server that waits
+`--handshake` seconds on every new connection (the TCP and TLS handshakes to
+Twilio) and `--latency` seconds on every request, then downloads it `--downloads`
+times in a row, as sequential photos of one container do: with a bare
+`requests.get` per download (what open_url_stream did before) and with the
+session of utils.client_utils.get_twilio_session.
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_media_download --downloads 50 --handshake 0.06 --latency 0.02
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.client_utils import (
+    get_twilio_session, get_http_pool_stats, TWILIO_CONNECT_TIMEOUT, TWILIO_READ_TIMEOUT, TWILIO_DOWNLOAD_CHUNK_SIZE
+)
+
+BODY = b'\xff\xd8' + b'\0' * (300 * 1024)
+
+
+def start_server(handshake, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            time.sleep(handshake)
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/media.jpg"
+
+
+def download(get, url):
+    with get(url, auth=('AC', 'token'), stream=True, timeout=(TWILIO_CONNECT_TIMEOUT, TWILIO_READ_TIMEOUT)) as response:
+        return sum(len(chunk) for chunk in response.iter_content(TWILIO_DOWNLOAD_CHUNK_SIZE))
+
+
+def timed(get, url, downloads):
+    started = time.perf_counter()
+    for _ in range(downloads):
+        download(get, url)
+    return (time.perf_counter() - started) / downloads * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--downloads', type=int, default=50)
+    parser.add_argument('--handshake', type=float, default=0.06, help='Seconds per new connection')
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds per request')
+    args = parser.parse_args(argv)
+
+    server, url = start_server(args.handshake, args.latency)
+    try:
+        per_download = timed(requests.get, url, args.downloads)
+        session = get_twilio_session()
+        pooled = timed(session.get, url, args.downloads)
+        stats = get_http_pool_stats(session)
+    finally:
+        server.shutdown()
+
+    print(f"{args.downloads} downloads of {len(BODY) // 1024} KB, {args.handshake * 1000:.0f} ms handshake, "
+          f"{args.latency * 1000:.0f} ms per request")
+    print(f"{'variant':<24}{'ms/download':>12}{'connections':>13}")
+    print(f"{'requests.get':<24}{per_download:>12.1f}{args.downloads:>13}")
+    print(f"{'pooled session':<24}{pooled:>12.1f}{stats['connections']:>13}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark of the in-memory pet search (services.pet_search_service).
+
+Indexes a synthetic catalog of `--pets` pets and times the index build, an
+incremental insert and queries of each kind: exact words, prefixes, typos
+(trigram matching) and age bands. For comparison, the same catalog is also
+searched with a linear scan that folds every pet's fields per query, which is
+what a search over get_pets() would do without the index.
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_pet_search --pets 1000 --repeat 2000
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+
+from services.pet_search_service import build_index, STOPWORDS, _fields  # noqa: E402
+from utils.search_index import tokenize  # noqa: E402
+
+NAMES = ('Rex', 'Mel', 'Thor', 'Luna', 'Bob', 'Nina', 'Pipoca', 'Amora', 'Fred', 'Lola', 'Zeca', 'Bidu', 'Mimi',
+         'Paçoca', 'Jabuti', 'Frida', 'Tobias', 'Ônix', 'Cacau', 'Pérola')
+BREEDS = {
+    'Cachorro': ('Labrador', 'Poodle', 'Beagle', 'Sem raça específica'),
+    'Gato': ('Siamês', 'Persa', 'Maine Coon', 'Sem raça específica'),
+    'Pássaro': ('Canário', 'Papagaio', 'Calopsita', 'Sem raça específica'),
+}
+
+QUERIES = (
+    ('exact', 'rex labrador'),
+    ('accents', 'passaro canario'),
+    ('prefix', 'lab'),
+    ('typo', 'labrdor'),
+    ('typo name', 'tobyas'),
+    ('age band', 'gato filhote'),
+)
+
+
+def synthetic_catalog(size, seed=7):
+    rng = random.Random(seed)
+    pets = []
+    for index in range(size):
+        species = rng.choice(tuple(BREEDS))
+        pets.append({
+            'id': f"pet-{index:05d}",
+            'nome': f"{rng.choice(NAMES)} {index}" if index >= len(NAMES) else NAMES[index],
+            'especie': species,
+            'raça': rng.choice(BREEDS[species]),
+            'idade': rng.choice((0.5, 1, 2, 4, 6, 9, 12)),
+            'disponivel': rng.random() > 0.2,
+        })
+    return pets
+
+
+def linear_search(pets, query):
+    tokens = set(tokenize(query, STOPWORDS))
+    scored = []
+    for pet in pets:
+        score = sum(weight for text, weight in _fields(pet) for token in tokenize(text, STOPWORDS) if token in tokens)
+        if score:
+            scored.append((score, pet))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored[:10]
+
+
+def per_call_us(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pets', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    pets = synthetic_catalog(args.pets)
+    started = time.perf_counter()
+    index = build_index(pets)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    new_pet = {'id': 'pet-new', 'nome': 'Biscoito', 'especie': 'Cachorro', 'raça': 'Beagle', 'idade': 2}
+    insert_us = per_call_us(lambda: index.add(new_pet['id'], new_pet, _fields(new_pet)), 200)
+
+    print(f"{args.pets} pets: index built in {build_ms:.1f} ms, {len(index.vocabulary)} tokens, "
+          f"insert {insert_us:.1f} us")
+    print(f"{'query':<12}{'text':<18}{'results':>8}{'index us':>10}{'scan us':>10}")
+    for kind, query in QUERIES:
+        results = index.search(query)
+        indexed = per_call_us(lambda: index.search(query), args.repeat)
+        scan = per_call_us(lambda: linear_search(pets, query), max(args.repeat // 100, 3))
+        print(f"{kind:<12}{query:<18}{len(results):>8}{indexed:>10.1f}{scan:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
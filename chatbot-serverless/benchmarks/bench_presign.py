@@ -0,0 +1,65 @@
+"""
+Benchmark of the pre-signed URL generation used by the pet catalog.
+
+Signs the photo keys of a catalog of `--pets` pets with a plain boto3
+`generate_presigned_url` loop (what get_image did on every call) and with
+services.s3_service.get_images, cold (empty cache) and warm. Signing is local,
+so no AWS access is needed; dummy credentials are used when none are configured.
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_presign --pets 200 --repeat 20
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'AKIDEXAMPLE')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'wJalrXUtnFEMI/K7MDENG+bPxRfiCYEXAMPLEKEY')
+os.environ.setdefault('S3_BUCKET_NAME', 'aumigo-bench')
+
+from services import s3_service  # noqa: E402
+
+
+def sign_uncached(keys):
+    for key in keys:
+        s3_service.s3.generate_presigned_url(
+            ClientMethod='get_object',
+            Params={'Bucket': s3_service.S3_BUCKET, 'Key': key},
+            ExpiresIn=3600
+        )
+
+
+def measure(function, keys, repeat, before=None):
+    total = 0.0
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        function(keys)
+        total += time.perf_counter() - started
+    return total / repeat * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pets', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    keys = [f"assets/{index:064x}-1280.jpg" for index in range(args.pets)]
+    sign_uncached(keys[:1])  # loads the signer and credentials once
+
+    uncached = measure(sign_uncached, keys, args.repeat)
+    cold = measure(s3_service.get_images, keys, args.repeat, before=s3_service.clear_presigned_url_cache)
+    warm = measure(s3_service.get_images, keys, args.repeat)
+
+    print(f"{args.pets} keys per catalog response")
+    print(f"{'variant':<28}{'ms/response':>12}{'us/key':>10}")
+    for name, ms in (('generate_presigned_url', uncached), ('get_images (cold cache)', cold), ('get_images (warm cache)', warm)):
+        print(f"{name:<28}{ms:>12.2f}{ms / args.pets * 1000:>10.1f}")
+    print(f"warm speedup: {uncached / warm:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark of the bulk status transitions (utils.dynamo_utils.transact_write_groups).
+
+Moves `--items` solicitations, each a group of two actions (the solicitation and
+its pet), through a TransactWriteItems stand-in with a fixed latency per call,
+and compares one transaction per solicitation (what approving them one at a time
+costs) with the chunked transactions of transact_write_groups. `--failing`
+solicitations fail their pet condition, so the cancelled transactions and their
+resubmission without the failed groups are part of the measurement.
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_transitions --items 2000 --latency 0.03 --failing 20
+"""
+import argparse
+import random
+import threading
+import time
+
+from utils.dynamo_utils import transact_write_groups
+
+
+class TransactionCanceledException(Exception):
+    def __init__(self, reasons):
+        super().__init__('Transaction cancelled')
+        self.response = {'CancellationReasons': reasons}
+
+
+class LocalTransactClient:
+    """Applies every action except the updates of the `failing` keys, which fail their condition."""
+
+    class exceptions:
+        TransactionCanceledException = TransactionCanceledException
+
+        class TransactionInProgressException(Exception):
+            pass
+
+        class ProvisionedThroughputExceededException(Exception):
+            pass
+
+    def __init__(self, latency, failing=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        reasons = [
+            {'Code': 'ConditionalCheckFailed' if action['Update']['Key']['id'] in self.failing else 'None'}
+            for action in TransactItems
+        ]
+        if any(reason['Code'] != 'None' for reason in reasons):
+            raise TransactionCanceledException(reasons)
+
+
+def build_groups(items):
+    return [
+        (f"solicitation-{index}", [
+            {'Update': {'TableName': 'solicitations', 'Key': {'id': f"solicitation-{index}"}}},
+            {'Update': {'TableName': 'pets', 'Key': {'id': f"pet-{index}"}}},
+        ])
+        for index in range(items)
+    ]
+
+
+def one_by_one(client, groups):
+    failed = 0
+    for _, actions in groups:
+        try:
+            client.transact_write_items(TransactItems=actions)
+        except TransactionCanceledException:
+            failed += 1
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.03, help='Seconds per TransactWriteItems call')
+    parser.add_argument('--failing', type=int, default=20, help='Solicitations whose pet is no longer available')
+    args = parser.parse_args(argv)
+
+    groups = build_groups(args.items)
+    failing = {f"pet-{index}" for index in random.Random(3).sample(range(args.items), args.failing)}
+
+    rows = []
+    # the per-item loop is timed on a sample and extrapolated, it takes minutes at real latencies
+    sample = groups[:max(1, min(len(groups), 100))]
+    client = LocalTransactClient(args.latency, failing)
+    started = time.perf_counter()
+    one_by_one(client, sample)
+    elapsed = (time.perf_counter() - started) * len(groups) / len(sample)
+    rows.append(('one transaction per item', elapsed, len(groups)))
+
+    client = LocalTransactClient(args.latency, failing)
+    started = time.perf_counter()
+    outcomes = transact_write_groups(client, groups)
+    rows.append(('transact_write_groups', time.perf_counter() - started, client.calls))
+    failed = sum(1 for outcome in outcomes.values() if outcome is not None)
+
+    print(f"{args.items} transitions, {args.failing} failing, {args.latency * 1000:.0f} ms per call "
+          f"({failed} reported as failed)")
+    print(f"{'variant':<28}{'seconds':>10}{'calls':>8}")
+    for name, seconds, calls in rows:
+        print(f"{name:<28}{seconds:>10.2f}{calls:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
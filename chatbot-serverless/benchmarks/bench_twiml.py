@@ -0,0 +1,123 @@
+"""
+Benchmark of the TwiML reply rendering of the webhook.
+
+Compares the previous builder (twilio MessagingResponse tree + json.loads of every
+Lex message + str()) with utils.twiml_utils, after checking that both produce
+byte-identical XML for a set of representative and edge-case replies. Also
+reports the import time of each option. Requires the twilio package
+(`pip install twilio`), which is no longer a runtime dependency.
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_twiml --repeat 20000
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from utils.twiml_utils import render_lex_messages
+
+try:
+    from twilio.twiml.messaging_response import MessagingResponse
+except ImportError:
+    MessagingResponse = None
+
+REPLIES = {
+    'text': [
+        {'contentType': 'PlainText', 'content': 'Cadastro encontrado com sucesso.'},
+        {'contentType': 'CustomPayload', 'content': (
+            "O que você deseja fazer agora Ana? \n \n1. Adotar um Animal \n2. Realizar doação para ONG \n"
+            "3. Identificar Raça de Cachorro (Não precisa selecionar a opção, basta enviar a foto do mesmo!) \n4. Sair"
+        )},
+    ],
+    'text + audio': [
+        {'contentType': 'PlainText', 'content': "Sua solicitação para adotar o Cachorro 'Rex' foi recebida."},
+        {'contentType': 'CustomPayload', 'content': json.dumps({'audio': 'https://bucket.s3.amazonaws.com/a1b2.mp3'})},
+    ],
+    'image + audio + text': [
+        {'contentType': 'CustomPayload', 'content': json.dumps({'image': 'https://bucket.s3.amazonaws.com/images/Projeto_Compass.png'})},
+        {'contentType': 'CustomPayload', 'content': json.dumps({'audio': 'https://bucket.s3.amazonaws.com/c3d4.mp3'})},
+        {'contentType': 'PlainText', 'content': 'Você pode realizar sua doação para a ONG através do QRCODE de PIX acima! <3 \n'},
+    ],
+    'pet list': [
+        {'contentType': 'PlainText', 'content': 'Aqui estão os animais disponíveis para adoção. Qual você prefere?'},
+        {'contentType': 'CustomPayload', 'content': '\n'.join(f'Pet {i} - Cachorro - Labrador' for i in range(30))},
+    ],
+    'edge cases': [
+        {'contentType': 'PlainText', 'content': 'a & b < c > d "e" \'f\''},
+        {'contentType': 'CustomPayload', 'content': json.dumps({'audio': None, 'text': 'sem áudio'})},
+        {'contentType': 'CustomPayload', 'content': json.dumps({'image': 'https://x/y?a=1&b=2', 'text': 'x & y'})},
+        {'contentType': 'CustomPayload', 'content': '{not json'},
+        {'contentType': 'PlainText', 'content': ''},
+        {'contentType': 'PlainText', 'content': '42'},
+        {'contentType': 'ImageResponseCard'},
+    ],
+    'empty': [],
+}
+
+
+def legacy_render(messages):
+    """The rendering previously done inline by webhook_service."""
+    twilio_response = MessagingResponse()
+    for msg in messages:
+        if 'content' in msg:
+            content = msg['content']
+            try:
+                content_dict = json.loads(content)
+                if 'image' in content_dict:
+                    twilio_response.message().media(content_dict['image'])
+                if content_dict.get('audio'):
+                    twilio_response.message().media(content_dict['audio'])
+                if 'text' in content_dict:
+                    twilio_response.message(content_dict['text'])
+            except (json.JSONDecodeError, TypeError):
+                twilio_response.message(content)
+    return str(twilio_response)
+
+
+def check_identical():
+    for name, messages in REPLIES.items():
+        expected = legacy_render(messages)
+        rendered = render_lex_messages(messages)
+        if rendered != expected:
+            raise SystemExit(f"Output differs for '{name}':\n  legacy: {expected!r}\n  new:    {rendered!r}")
+    print(f"Output identical for {len(REPLIES)} replies")
+
+
+def measure(function, messages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(messages)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def import_time(module):
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return float(output.stdout) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    if MessagingResponse is None:
+        raise SystemExit('twilio is not installed: pip install twilio')
+
+    check_identical()
+
+    print(f"\n{'reply':<24}{'legacy us':>12}{'twiml_utils us':>16}{'speedup':>10}")
+    for name, messages in REPLIES.items():
+        legacy = measure(legacy_render, messages, args.repeat)
+        new = measure(render_lex_messages, messages, args.repeat)
+        print(f"{name:<24}{legacy:>12.2f}{new:>16.2f}{legacy / new:>9.1f}x")
+
+    print(f"\n{'import':<40}{'ms':>8}")
+    for module in ('twilio.twiml.messaging_response', 'utils.twiml_utils'):
+        print(f"{module:<40}{import_time(module):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
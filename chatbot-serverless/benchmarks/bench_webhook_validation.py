@@ -0,0 +1,86 @@
+"""
+Benchmark of the cost of rejecting a webhook request.
+
+Drives handler.webhook_handler with a signed text message and with the kinds of
+traffic the validation front stage (utils.twilio_utils) refuses: an oversized
+body, a body without From, a forged signature and a replay of the valid body to
+another URL. Lex is the echo stand-in and S3/DynamoDB the in-memory ones of
+tools.local_clients, so the accepted turn shows only our own CPU cost; the
+downstream calls it makes are listed too, while rejected requests make none.
+
+Usage (from the chatbot-serverless folder):
+    python -m benchmarks.bench_webhook_validation --repeat 2000
+"""
+import argparse
+import contextlib
+import logging
+import os
+import time
+
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('BOT_ID', 'BENCH')
+os.environ.setdefault('BOT_ALIAS_ID', 'BENCH')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['METRICS_ENABLED'] = 'false'
+os.environ['RATE_LIMIT_USER_MESSAGES'] = ''
+os.environ['RATE_LIMIT_GLOBAL_MESSAGES'] = ''
+
+from tools import loadgen  # noqa: E402  (sets the Twilio test credentials)
+from tools.local_clients import count_storage_calls, install_local_clients  # noqa: E402
+from utils.metrics_utils import count_dependency_calls  # noqa: E402
+
+
+def build_events():
+    body = loadgen.synthesize_body('5511900000001', text='Oi')
+    valid = loadgen.build_event(body)
+
+    forged = loadgen.build_event(body)
+    forged['headers'] = dict(forged['headers'], **{'X-Twilio-Signature': 'AAAAAAAAAAAAAAAAAAAAAAAAAAA='})
+
+    replayed = loadgen.build_event(body)
+    replayed['headers'] = dict(replayed['headers'], Host='attacker.example.com')
+
+    return {
+        'accepted (signed)': valid,
+        'oversized body': loadgen.build_event(body + '&Body=' + 'x' * 1024 * 1024),
+        'missing From': loadgen.build_event(body.replace('From=', 'Frm=')),
+        'forged signature': forged,
+        'replayed to other URL': replayed,
+    }
+
+
+def measure(webhook_handler, event, repeat):
+    with count_dependency_calls() as calls:
+        response = webhook_handler(event, None)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        webhook_handler(event, None)
+    elapsed = time.perf_counter() - started
+    return response['statusCode'], elapsed / repeat * 1e6, calls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    from services.storage import set_storage
+
+    install_local_clients()
+    count_storage_calls(set_storage('memory'))
+    from handler import webhook_handler
+    import services.webhook_service  # noqa: F401  (configures logging on import)
+
+    logging.getLogger().setLevel(logging.ERROR)
+    rows = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name, event in build_events().items():
+            rows.append((name,) + measure(webhook_handler, event, args.repeat))
+
+    print(f"{'request':<24}{'status':>7}{'us/request':>12}  downstream calls")
+    for name, status, micros, calls in rows:
+        print(f"{name:<24}{status:>7}{micros:>12.1f}  {dict(sorted(calls.items())) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
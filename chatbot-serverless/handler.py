@@ -1,10 +1,24 @@
+"""
+Lambda entry points.
+
+Each function imports the services it uses inside its own body, so a cold start
+only loads that function's dependency graph (e.g. apiGetPets does not import
+Lex, Polly, Rekognition or the webhook). Check the cost per function with
+`python -m tools.importtime`.
+
+Every entry point also answers warmup events (utils.warmup_utils), which load
+its modules, clients and data ahead of the first request.
+"""
 import json
-from services.lex_service import lex_response
-from services.polly_service import text_to_speech
-from services.dynamo.pets import get_pets, insert_pet
-from services.dynamo.adopt_solicitations import get_adopt_solicitations
-from services.rekogntion_service import detect_pet_in_image
-from services.webhook_service import webhook_service
+import time
+from utils.http_utils import json_response, http_response, get_request_body, compute_etag
+from utils.warmup_utils import warmable
+
+# GET /pets body rendered from the cached catalog: (catalog expiry, reuse until, body, ETag).
+# Reused at most PETS_RESPONSE_MAX_AGE seconds, well inside the safety margin that the
+# pre-signed photo URLs it embeds still have left when they are handed out
+PETS_RESPONSE_MAX_AGE = 60
+_pets_response = None
 
 def handler_geral(event, context):
     """
@@ -17,14 +31,11 @@ def handler_geral(event, context):
     Returns:
         dict: Response with HTTP status 200 and a simple message.
     """
-    response = {
-        "statusCode": 200,
-        "body": json.dumps({
-            "message": "Hello World!",
-        }),
-    }
-    return response
+    return json_response(event, 200, {
+        "message": "Hello World!",
+    })
 
+@warmable
 def lex_handler(event, context):
     """
     Handler for integration with Amazon Lex.
@@ -36,10 +47,13 @@ def lex_handler(event, context):
     Returns:
         dict: Response processed by the Lex service.
     """
+    from services.lex_service import lex_response
+
     intentName = event['sessionState']['intent']['name']
     response = lex_response(intentName, event)
     return response
 
+@warmable
 def polly_handler(event, context):
     """
     Handler for text-to-speech conversion using Amazon Polly.
@@ -51,23 +65,20 @@ def polly_handler(event, context):
     Returns:
         dict: HTTP response containing the result of text-to-speech processing.
     """
+    from services.polly_service import text_to_speech
+
     try:
-        body = json.loads(event['body'])
+        body = json.loads(get_request_body(event))
         text = body.get('text')
         
         if not text:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Text parameter is required"})
-            }
+            return json_response(event, 400, {"error": "Text parameter is required"})
         
-        return text_to_speech(text)
+        return text_to_speech(text, body.get('profile'))
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(event, 500, {"error": str(e)})
 
+@warmable
 def apiGetPets(event, context):
     """
     Handler to retrieve the list of registered pets.
@@ -78,31 +89,94 @@ def apiGetPets(event, context):
 
     Returns:
         dict: HTTP response with the list of pets or an error message.
+        Pets with a photo ('imagem') get a pre-signed 'imagemUrl'.
+        Sends an ETag and answers 304 when the catalog did not change.
+
+    The serialized body and its ETag are kept while the container's catalog is the
+    same one (services.dynamo.pets.catalog_expiry), so a conditional GET, or any
+    repeated GET, skips the copy of the catalog, the URL signing and the serialization.
     """
+    from services.dynamo import pets as pets_service
+    from services.storage import get_storage
+    from utils.json_utils import dumps
+
+    global _pets_response
     try:
-        response_pets = get_pets()
-        print(response_pets)
-        
-        if response_pets is None:
-            response = {
-                "statusCode": 404,
-                "body": json.dumps({
+        storage = get_storage()
+        cached = _pets_response
+        catalog_expiry = pets_service.catalog_expiry(storage)
+        if cached is None or catalog_expiry is None or cached[0] != catalog_expiry or cached[1] <= time.monotonic():
+            response_pets = pets_service.get_pets()
+            print(response_pets)
+
+            if response_pets is None:
+                return json_response(event, 404, {
                     "message": "No pets found",
-                }),
-            }
-        else:       
-            response = {
-                "statusCode": 200,
-                "body": json.dumps(response_pets),
-            }
-        
-        return response
+                })
+
+            add_image_urls(response_pets)
+            body = dumps(response_pets)
+            catalog_expiry = pets_service.catalog_expiry(storage)
+            cached = (catalog_expiry, time.monotonic() + PETS_RESPONSE_MAX_AGE, body, compute_etag(body))
+            # without a cached catalog (PETS_CACHE_TTL=0) every request is rendered again
+            _pets_response = cached if catalog_expiry is not None else None
+
+        return http_response(event, 200, cached[2], etag=cached[3])
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(event, 500, {"error": str(e)})
+
+def add_image_urls(pets):
+    """Adds a pre-signed 'imagemUrl' to the pets with a photo ('imagem')."""
+    with_image = [pet for pet in pets if pet.get('imagem')]
+    if with_image:
+        # imported only when needed: the S3 client is not part of a plain catalog cold start
+        from services.s3_service import get_images
+
+        # cached URLs are reused, so the body (and its ETag) stays the same between calls
+        urls = get_images(pet['imagem'] for pet in with_image)
+        for pet in with_image:
+            pet['imagemUrl'] = urls.get(pet['imagem'])
+
+@warmable
+def apiSearchPets(event, context):
+    """
+    Handler to search the pets by free text (name, breed, species or age band).
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        context (object): Context of the Lambda execution.
+
+    Query parameters:
+        q (str): Search text, e.g. 'labrador', 'gato filhote' or 'rex'. Accents and typos are tolerated.
+        limit (int, optional): Maximum number of pets (1-50, default 10).
+        available (str, optional): 'true' to return only pets available for adoption.
 
+    Returns:
+        dict: HTTP response with the matching pets, best first, each with its 'score'.
+        The search runs on an in-memory index of the catalog (services.pet_search_service).
+    """
+    from services.pet_search_service import search_pets
+
+    try:
+        params = event.get('queryStringParameters') or {}
+        query = (params.get('q') or '').strip()
+        if not query or len(query) > 200:
+            return json_response(event, 400, {"error": "The 'q' parameter is required (up to 200 characters)"})
+
+        try:
+            limit = int(params.get('limit') or 10)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= 50:
+            return json_response(event, 400, {"error": "The 'limit' parameter must be between 1 and 50"})
+
+        results = search_pets(query, limit=limit, available_only=params.get('available') == 'true')
+        add_image_urls(results)
+        return json_response(event, 200, {"query": query, "count": len(results), "data": results})
+    except Exception as e:
+        return json_response(event, 500, {"error": str(e)})
+
+@warmable
 def apiPostPets(event, context):
     """
     Handler to register a new pet.
@@ -114,36 +188,30 @@ def apiPostPets(event, context):
     Returns:
         dict: HTTP response indicating success or failure when registering the pet.
     """
+    from services.dynamo.pets import insert_pet
+
     try:
-        body = json.loads(event['body'])
+        body = json.loads(get_request_body(event))
         name = body.get('nome', '').strip()
         specie = body.get('especie', '').strip()
         breed = body.get('raça', 'Sem raça específica').strip()
         age = body.get('idade')
+        image = body.get('imagem')
 
         if not name or not specie or not age:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "All fields are required: name, species, and age"})
-            }
+            return json_response(event, 400, {"error": "All fields are required: name, species, and age"})
         
         if not isinstance(name, str) or len(name) > 100:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "The 'name' field must be a string with up to 100 characters"})
-            }
+            return json_response(event, 400, {"error": "The 'name' field must be a string with up to 100 characters"})
         
         if specie not in ['Cachorro', 'Gato', 'Pássaro']:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "The 'species' field must be 'Cachorro', 'Gato', or 'Pássaro'"})
-            }
+            return json_response(event, 400, {"error": "The 'species' field must be 'Cachorro', 'Gato', or 'Pássaro'"})
         
         if not isinstance(age, (int, float)) or age <= 0:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "The 'age' field must be a positive number"})
-            }
+            return json_response(event, 400, {"error": "The 'age' field must be a positive number"})
+
+        if image is not None and (not isinstance(image, str) or not 0 < len(image) <= 1024):
+            return json_response(event, 400, {"error": "The 'image' field must be the S3 key of the photo"})
 
         valid_breeds = {
             'Cachorro': ['Labrador', 'Poodle', 'Beagle', 'Sem raça específica'],
@@ -152,27 +220,16 @@ def apiPostPets(event, context):
         }
 
         if breed not in valid_breeds.get(specie, []):
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": f"Invalid breed for species '{specie}'"})
-            }
-
-        if insert_pet(name, specie, breed, age):
-            return {
-                "statusCode": 201,
-                "body": json.dumps({"message": "Pet successfully created"}),
-            }
-
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": "Error saving the pet to the database"})
-        }
+            return json_response(event, 400, {"error": f"Invalid breed for species '{specie}'"})
+
+        if insert_pet(name, specie, breed, age, image):
+            return json_response(event, 201, {"message": "Pet successfully created"})
+
+        return json_response(event, 500, {"error": "Error saving the pet to the database"})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+        return json_response(event, 500, {"error": str(e)})
 
+@warmable
 def apiGetAdoptSolicitations(event, context):
     """
     Handler to retrieve adoption solicitations.
@@ -181,41 +238,215 @@ def apiGetAdoptSolicitations(event, context):
         event (dict): Event data received by the Lambda function.
         context (object): Context of the Lambda execution.
 
+    Query parameters (optional):
+        limit (int): Page size (1-1000). When present, a single page is returned.
+        nextToken (str): Token returned by the previous page.
+
     Returns:
-        dict: HTTP response with the adoption solicitations or an error message.
+        dict: HTTP response with the adoption solicitations or an error message
+            (400 for an invalid limit or nextToken, 503 when DynamoDB throttled the
+            reads of the page's pets and users).
     """
+    from services.dynamo.adopt_solicitations import get_adopt_solicitations, get_adopt_solicitations_page
+    from services.storage.base import UnprocessedKeysError
+    from utils.dynamo_utils import encode_page_token, decode_page_token
+
     try:
-        response_solicitations = get_adopt_solicitations()
+        params = event.get('queryStringParameters') or {}
+        next_token = None
+
+        if params.get('limit') or params.get('nextToken'):
+            try:
+                limit = int(params.get('limit') or 50)
+            except ValueError:
+                limit = 0
+            if not 1 <= limit <= 1000:
+                return json_response(event, 400, {"error": "The 'limit' parameter must be between 1 and 1000"})
+            try:
+                start_key = decode_page_token(params.get('nextToken'))
+            except ValueError:
+                return json_response(event, 400, {"error": "The 'nextToken' parameter is invalid"})
+
+            response_solicitations, last_key = get_adopt_solicitations_page(limit=limit, start_key=start_key)
+            next_token = encode_page_token(last_key)
+        else:
+            response_solicitations = get_adopt_solicitations()
+
+        if not response_solicitations and not next_token:
+            return json_response(event, 404, {
+                "success": False,
+                "message": "No adoption solicitations found",
+                "data": [],
+            })
 
-        if not response_solicitations:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({
-                    "success": False,
-                    "message": "No adoption solicitations found",
-                    "data": [],
-                }),
-            }
-
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "success": True,
-                "message": "Adoption solicitations found",
-                "data": response_solicitations,
-                "count": len(response_solicitations),
-            }),
-        }
+        return json_response(event, 200, {
+            "success": True,
+            "message": "Adoption solicitations found",
+            "data": response_solicitations or [],
+            "count": len(response_solicitations or []),
+            "nextToken": next_token,
+        })
+    except UnprocessedKeysError as e:
+        return json_response(event, 503, {
+            "success": False,
+            "error": f"Throttled while reading the solicitations, try again ({e})",
+        }, headers={'Retry-After': '1'})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({
+        return json_response(event, 500, {
+            "success": False,
+            "error": str(e)
+        })
+
+@warmable
+def apiTransitionAdoptSolicitations(event, context):
+    """
+    Handler to move many adoption solicitations to a new status at once.
+
+    Approving a solicitation makes its pet unavailable and cancelling an approved
+    one makes it available again, in the same transaction as the status change
+    (see services.dynamo.adopt_solicitations.transition_adopt_solicitations).
+
+    The endpoint is private: API Gateway rejects requests without the API key of
+    serverless.yml (x-api-key header) before this handler runs.
+
+    Body (JSON), either:
+        {"status": "Aprovada", "ids": ["...", "..."], "motivo": "..."} or
+        {"transitions": [{"id": "...", "status": "Rejeitada", "motivo": "..."}, ...]}
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        context (object): Context of the Lambda execution.
+
+    Returns:
+        dict: HTTP response with the outcome of every solicitation, in request order,
+        and a summary with how many were applied. Items that could not be moved do
+        not fail the request; they are reported with their outcome.
+    """
+    from services.dynamo.adopt_solicitations import (
+        transition_adopt_solicitations, SOLICITATION_TRANSITIONS, BULK_TRANSITION_MAX_ITEMS
+    )
+
+    try:
+        body = json.loads(get_request_body(event))
+        if not isinstance(body, dict):
+            return json_response(event, 400, {"success": False, "error": "The body must be a JSON object"})
+
+        if 'transitions' in body:
+            changes = body['transitions']
+            if not isinstance(changes, list) or not all(isinstance(change, dict) for change in changes):
+                return json_response(event, 400, {
+                    "success": False,
+                    "error": "'transitions' must be a list of objects with 'id' and 'status'"
+                })
+        else:
+            status = body.get('status')
+            ids = body.get('ids')
+            if status not in SOLICITATION_TRANSITIONS or not isinstance(ids, list):
+                return json_response(event, 400, {
+                    "success": False,
+                    "error": f"'ids' (list) and 'status' ({', '.join(SOLICITATION_TRANSITIONS)}) are required"
+                })
+            changes = [{'id': solicitation_id, 'status': status} for solicitation_id in ids]
+
+        if not changes or len(changes) > BULK_TRANSITION_MAX_ITEMS:
+            return json_response(event, 400, {
                 "success": False,
-                "error": str(e)
+                "error": f"Between 1 and {BULK_TRANSITION_MAX_ITEMS} solicitations are accepted per request"
             })
-        }
-    
 
+        results = transition_adopt_solicitations(changes, reason=body.get('motivo'))
+        outcomes = {}
+        for result in results:
+            outcomes[result['outcome']] = outcomes.get(result['outcome'], 0) + 1
+
+        return json_response(event, 200, {
+            "success": True,
+            "summary": {
+                "requested": len(results),
+                "applied": outcomes.get('applied', 0),
+                "outcomes": outcomes,
+            },
+            "results": results,
+        })
+    except json.JSONDecodeError:
+        return json_response(event, 400, {"success": False, "error": "Invalid JSON body"})
+    except Exception as e:
+        return json_response(event, 500, {
+            "success": False,
+            "error": str(e)
+        })
+
+@warmable
+def apiExportAdoptSolicitations(event, context):
+    """
+    Handler to export every adoption solicitation using a DynamoDB parallel scan.
+
+    The endpoint is private (x-api-key header, see serverless.yml): the rows carry
+    the names and phones of the users.
+
+    Query parameters (optional):
+        format (str): 'ndjson' (default) or 'csv'.
+        destination (str): 'response' (default) to return the rows in the body,
+            or 's3' to stream them to a multipart upload and return a download URL.
+        segments (int): Number of parallel scan segments (1-16, default: 4).
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        context (object): Context of the Lambda execution.
+
+    Returns:
+        dict: HTTP response with the exported rows or the S3 location, plus the throughput
+            report (400 for invalid parameters, 413 when the rows do not fit in a response).
+    """
+    from services.export_service import export_solicitations_to_body, export_solicitations_to_s3, ExportTooLargeError, EXPORT_FORMATS
+    from services.s3_service import get_image
+    from utils.http_utils import response_size, LAMBDA_RESPONSE_MAX_BYTES
+
+    try:
+        params = event.get('queryStringParameters') or {}
+        export_format = params.get('format') or 'ndjson'
+        destination = params.get('destination') or 'response'
+        try:
+            segments = int(params.get('segments') or 4)
+        except ValueError:
+            segments = 0
+
+        if export_format not in EXPORT_FORMATS:
+            return json_response(event, 400, {"error": f"The 'format' parameter must be one of: {', '.join(EXPORT_FORMATS)}"})
+        if destination not in ('response', 's3'):
+            return json_response(event, 400, {"error": "The 'destination' parameter must be 'response' or 's3'"})
+        if not 1 <= segments <= 16:
+            return json_response(event, 400, {"error": "The 'segments' parameter must be between 1 and 16"})
+
+        if destination == 's3':
+            report = export_solicitations_to_s3(export_format, segments)
+            print(f"Export report: {report}")
+            return json_response(event, 200, {
+                "success": True,
+                "url": get_image(report['key']),
+                "report": report,
+            })
+
+        body, report = export_solicitations_to_body(export_format, segments)
+        print(f"Export report: {report}")
+        response = http_response(event, 200, body, content_type=EXPORT_FORMATS[export_format], headers={
+            "X-Export-Items": str(report['items']),
+            "X-Export-Items-Per-Second": str(report['items_per_second']),
+        })
+        # the raw rows fit, but escaping them into the proxy response may not
+        if response_size(response) > LAMBDA_RESPONSE_MAX_BYTES:
+            raise ExportTooLargeError(f"Export exceeds the {LAMBDA_RESPONSE_MAX_BYTES} bytes of a Lambda response, use destination=s3")
+        return response
+    except ExportTooLargeError as e:
+        return json_response(event, 413, {"success": False, "error": str(e)})
+    except Exception as e:
+        return json_response(event, 500, {
+            "success": False,
+            "error": str(e)
+        })
+
+
+@warmable
 def webhook_handler(event, context):
     """
     Handler for a webhook that receives a POST request.
@@ -227,38 +458,30 @@ def webhook_handler(event, context):
     Returns:
         dict: HTTP response with the body of the request.
     """
+    from services.webhook_service import webhook_service
 
     return webhook_service(event, context)
 
+@warmable
 def apiDetectPet(event, context):
     """
     Handler para detectar pets em imagens do S3.
     """
+    from services.rekogntion_service import detect_pet_in_image
+
     try:
-        if not event.get('body'):
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Body da requisição está vazio"})
-            }
+        if not get_request_body(event):
+            return json_response(event, 400, {"error": "Body da requisição está vazio"})
 
-        body = json.loads(event['body'])
+        body = json.loads(get_request_body(event))
         image_name = body.get('image_name')
 
         if not image_name:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "O nome da imagem é obrigatório"})
-            }
+            return json_response(event, 400, {"error": "O nome da imagem é obrigatório"})
 
         result = detect_pet_in_image(image_name)
         
-        return {
-            "statusCode": 200 if result['success'] else 400,
-            "body": json.dumps(result)
-        }
+        return json_response(event, 200 if result['success'] else 400, result)
 
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
\ No newline at end of file
+        return json_response(event, 500, {"error": str(e)})
\ No newline at end of file
@@ -1,9 +1,15 @@
 import json
 from services.dynamo.pets import get_pets
 from services.dynamo.adopt_solicitations import insert_adopt_solicitation
-from utils.lex_utils import animal_exists
+from utils.lex_utils import resolve_animal
 from services.polly_service import text_to_speech
 
+ADOPTION_ERROR_MESSAGE = "Desculpe, ocorreu um erro ao tentar adotar o animal. Por favor, tente novamente."
+NO_PETS_MESSAGE = "Desculpe, não temos animais disponíveis no momento."
+
+# frases fixas sintetizadas com antecedência (services.warmup_service)
+STATIC_AUDIO_PHRASES = (ADOPTION_ERROR_MESSAGE, NO_PETS_MESSAGE)
+
 def adotarPet(event):
     """
     Gerencia o processo de adoção de um animal em um bot de atendimento.
@@ -26,21 +32,23 @@ def adotarPet(event):
 
     Comportamento:
         1. Verifica se o usuário escolheu um animal no slot "AnimalToAdopt".
-        2. Valida a existência do animal escolhido no banco de dados usando a função `animal_exists`.
+        2. Valida a existência do animal escolhido no banco de dados usando a função `resolve_animal`,
+            que também aceita texto livre ("rex labrador"), resolvido pelo índice de busca de animais.
         3. Se o animal existir:
             - Obtém os atributos da sessão, como userId e telefone.
             - Registra a solicitação de adoção com a função `insert_adopt_solicitation`.
             - Retorna uma mensagem confirmando ou indicando um erro no registro.
-        4. Se o animal escolhido não estiver disponível, solicita que o usuário escolha novamente
+        4. Se o texto corresponder a mais de um animal, solicita que o usuário escolha entre os mais próximos.
+        5. Se o animal escolhido não estiver disponível, solicita que o usuário escolha novamente
             a partir de uma lista de opções.
-        5. Se nenhum animal estiver disponível, retorna uma mensagem informando a indisponibilidade.
+        6. Se nenhum animal estiver disponível, retorna uma mensagem informando a indisponibilidade.
 
     Retorna:
         dict: Uma resposta formatada para o bot, que pode ser uma mensagem finalizada, um pedido
         de entrada adicional do usuário (elicit slot), ou uma confirmação de sucesso/erro.
 
     Dependências:
-        - `animal_exists(animal_chosen)`: Função que verifica a existência de um animal no banco de dados.
+        - `resolve_animal(animal_chosen)`: Função que encontra o animal escolhido ou os animais mais próximos do texto.
         - `insert_adopt_solicitation(pet_id, phone, user_id)`: Função que registra a solicitação de adoção.
         - `show_pets_list()`: Função que retorna uma lista de animais disponíveis para adoção.
         - `close_dialog(sessionAttributes, intent_name, message, slots)`: Retorna uma mensagem de diálogo finalizado.
@@ -70,8 +78,8 @@ def adotarPet(event):
         # verify if the user has chosen an animal
         if slots.get(slot_name) and slots[slot_name].get('value'):
             animal_chosen = slots[slot_name]['value']['interpretedValue']
-            # validate if the animal exists in the database
-            pet = animal_exists(animal_chosen)
+            # validate if the animal exists in the database (or resolve a free-text answer)
+            pet, closest = resolve_animal(animal_chosen)
             print("Pet na intent adotarPet", pet) 
             if pet:
                 print(sessionAttributes)
@@ -83,7 +91,7 @@ def adotarPet(event):
                     return close_dialog(
                         sessionAttributes,
                         intent_name,
-                        "Desculpe, ocorreu um erro ao tentar adotar o animal. Por favor, tente novamente.",
+                        ADOPTION_ERROR_MESSAGE,
                         slots
                     )
                 else:
@@ -93,6 +101,15 @@ def adotarPet(event):
                         f"Sua solicitação para adotar o Cachorro '{pet['nome']}' foi recebida. Em breve entraremos em contato.",
                         slots
                     )
+            elif closest:
+                # the answer does not name exactly one pet: the user confirms one of the closest
+                return elicit_slot_with_list(
+                    session_attributes=sessionAttributes,
+                    intent_name=intent_name,
+                    slot_to_elicit=slot_name,
+                    message="Encontramos estes animais parecidos com o que você digitou. Qual deles você quer adotar?",
+                    options=format_pets(closest)
+                )
             else:
                 # return a message if the animal chosen is not available
                 return elicit_slot_with_list(
@@ -109,8 +126,9 @@ def adotarPet(event):
         # return a message if there are no animals available
         if not animal_options:
             return close_dialog(
+                sessionAttributes,
                 intent_name,
-                "Desculpe, não temos animais disponíveis no momento.",
+                NO_PETS_MESSAGE,
                 slots
             )
 
@@ -157,13 +175,15 @@ def show_pets_list():
         return []
 
     # Formata os resultados, filtrando apenas os animais disponíveis
-    formatted_pets = [
+    return format_pets(pet for pet in pets if pet.get('disponivel', True))
+
+def format_pets(pets):
+    """Formata os animais no formato das opções da lista: "Nome - Espécie - Raça"."""
+    return [
         f"{pet.get('nome', 'Unknown')} - {pet.get('especie', 'Unknown')} - {pet.get('raça', 'Unknown')}"
-        for pet in pets if pet.get('disponivel', True)
+        for pet in pets
     ]
 
-    return formatted_pets
-
 def elicit_slot_with_list(session_attributes, intent_name, slot_to_elicit, message, options):
     """
     Cria uma resposta do Amazon Lex para solicitar um slot ao usuário, apresentando uma lista de opções.
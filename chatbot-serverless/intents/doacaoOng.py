@@ -5,6 +5,15 @@ from services.polly_service import text_to_speech
 
 S3_BUCKET = os.getenv('S3_BUCKET_NAME')
 
+# Mensagem formatada para texto e áudio
+DONATION_MESSAGE = (
+    "Você pode realizar sua doação para a ONG através do QRCODE de PIX acima! <3 \n"
+    "Agradecemos sua iniciativa para a doação, qualquer valor será bem-vindo! \n\n"
+)
+
+# frases fixas sintetizadas com antecedência (services.warmup_service)
+STATIC_AUDIO_PHRASES = (DONATION_MESSAGE,)
+
 def doacaoOng(event):
     """
     Processa a intenção de doação para a ONG, fornecendo um QR Code de PIX e mensagens de agradecimento.
@@ -24,11 +33,7 @@ def doacaoOng(event):
         # URL da imagem do QR Code armazenada no S3
         pix_image_url = f'https://{S3_BUCKET}.s3.amazonaws.com/images/Projeto_Compass.png'
 
-        # Mensagem formatada para texto e áudio
-        formatted_message = (
-            "Você pode realizar sua doação para a ONG através do QRCODE de PIX acima! <3 \n"
-            "Agradecemos sua iniciativa para a doação, qualquer valor será bem-vindo! \n\n"
-        )
+        formatted_message = DONATION_MESSAGE
         audio_message = text_to_speech(formatted_message)
 
         # Conteúdo da imagem para payload customizado
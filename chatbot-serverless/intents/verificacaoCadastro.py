@@ -1,4 +1,5 @@
-from services.dynamo.user import search_by_phone, insert_user
+from services.dynamo.user import search_by_phone, insert_user, user_session_attributes
+from utils.phone_utils import to_e164
 from utils.lex_utils import generate_lex_response
 
 def verifcacaoCadastro(sessionState, sessionAttributes, slots, intentName):
@@ -6,6 +7,10 @@ def verifcacaoCadastro(sessionState, sessionAttributes, slots, intentName):
     Verifica o cadastro de um usuário com base no telefone fornecido e retorna as informações do cadastro,
     caso encontrado.
 
+    Se o usuário já foi identificado pelo número do WhatsApp (o webhook preenche `userId`
+    e `telefone` na sessão) e informou esse mesmo telefone, o cadastro é confirmado sem
+    consultar o banco.
+
     Args:
         sessionState (dict): O estado atual da sessão.
         sessionAttributes (dict): Atributos da sessão, utilizados para manter o contexto.
@@ -29,7 +34,18 @@ def verifcacaoCadastro(sessionState, sessionAttributes, slots, intentName):
             showOptions=False
         )
 
+    result = None
     try:
+        if sessionAttributes.get('userId') and to_e164(phone) == sessionAttributes.get('telefone'):
+            return generate_lex_response(
+                intentName=intentName,
+                sessionState=sessionState,
+                sessionAttributes=sessionAttributes,
+                message="Cadastro encontrado com sucesso.",
+                state="Fulfilled",
+                showOptions=True
+            )
+
         # Busca o usuário no banco de dados com base no telefone
         result = search_by_phone(phone)
 
@@ -46,13 +62,7 @@ def verifcacaoCadastro(sessionState, sessionAttributes, slots, intentName):
             })
 
             # Atualiza os atributos da sessão
-            sessionAttributes.update({
-                'nome': user.get('name'),
-                'e-mail': user.get('email'),
-                'telefone': user.get('phone'),
-                'idade': user.get('age'),
-                'userId': user.get('id')
-            })
+            sessionAttributes.update(user_session_attributes(user))
 
             # Atualiza os slots no sessionState
             sessionState['intent']['slots'] = slots
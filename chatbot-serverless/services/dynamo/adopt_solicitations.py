@@ -1,22 +1,86 @@
-import boto3
 import os
 from datetime import datetime
 import uuid
 
-from services.dynamo.pets import get_pet_by_id
+from services.dynamo.pets import get_pet_by_id, invalidate_pets_cache
 from services.dynamo.user import get_user_by_id
+from services.storage import get_storage
+from services.storage.base import TRANSITION_APPLIED, UnprocessedKeysError
+from utils.metrics_utils import emit_metrics
 
-DYNAMODB_TABLE_REQUEST_ADOPT = os.getenv('DYNAMODB_TABLE_REQUEST_ADOPT')
+# 'reference' grava apenas os IDs e uma pequena projeção do pet e do usuário;
+# 'embedded' mantém o formato antigo, com os itens completos copiados na solicitação
+ADOPT_SOLICITATION_STORAGE = os.getenv('ADOPT_SOLICITATION_STORAGE', 'reference')
+
+# Transições de status permitidas: status de destino -> status de origem aceitos e,
+# quando a transição muda o pet, o novo valor de 'disponivel'
+SOLICITATION_TRANSITIONS = {
+    'Aprovada': {'from': ('Pendente',), 'disponivel': False},
+    'Rejeitada': {'from': ('Pendente',)},
+    'Cancelada': {'from': ('Aprovada',), 'disponivel': True},
+}
+
+# Máximo de solicitações por chamada de `transition_adopt_solicitations`
+BULK_TRANSITION_MAX_ITEMS = int(os.getenv('BULK_TRANSITION_MAX_ITEMS', '5000'))
+
+# Atributos copiados na projeção gravada junto com a solicitação
+PET_PROJECTION = ('id', 'nome', 'especie', 'raça')
+USER_PROJECTION = ('id', 'name', 'phone')
+
+
+def project(item, attributes):
+    """
+    Retorna apenas os atributos informados de um item.
+
+    Args:
+        item (dict): Item completo do DynamoDB.
+        attributes (tuple): Atributos que devem ser mantidos.
+
+    Returns:
+        dict: Projeção do item.
+    """
+    return {key: item[key] for key in attributes if key in item}
+
+
+def build_solicitation_item(pet, user, storage=None):
+    """
+    Monta o item de solicitação de adoção no formato de armazenamento configurado.
+
+    Args:
+        pet (dict): Item do pet.
+        user (dict): Item do usuário.
+        storage (str, opcional): 'reference' ou 'embedded' (default: ADOPT_SOLICITATION_STORAGE).
+
+    Returns:
+        dict: Item pronto para ser gravado na tabela de solicitações.
+    """
+    storage = storage or ADOPT_SOLICITATION_STORAGE
+
+    item = {
+        'id': str(uuid.uuid4()),  # Gera um UUID único para a solicitação
+        'dataCriacao': datetime.now().isoformat(),  # Registra a data de criação da solicitação
+        'status': 'Pendente',  # Status inicial da solicitação
+    }
+
+    if storage == 'reference':
+        item['petId'] = pet['id']
+        item['userId'] = user['id']
+        item['pet'] = project(pet, PET_PROJECTION)
+        item['user'] = project(user, USER_PROJECTION)
+    else:
+        item['pet'] = pet
+        item['user'] = user
+
+    return item
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(DYNAMODB_TABLE_REQUEST_ADOPT)
 
 def insert_adopt_solicitation(id_pet, phone, id_user):
     """
     Insere uma solicitação de adoção de animal no banco de dados.
-    
+
     Verifica se o animal e o usuário existem, e, caso existam, cria uma nova solicitação
-    de adoção com um status 'Pendente'.
+    de adoção com um status 'Pendente'. No modo 'reference' a solicitação guarda apenas
+    os IDs e uma projeção com os dados usados na listagem.
 
     Args:
         id_pet (str): O ID do pet que está sendo adotado.
@@ -24,9 +88,9 @@ def insert_adopt_solicitation(id_pet, phone, id_user):
         id_user (str): O ID do usuário que está fazendo a solicitação.
 
     Returns:
-        dict: Resposta da operação de inserção no banco de dados ou None se falhar.
+        dict: O item da solicitação inserida ou None se falhar.
     """
-    
+
     # Recupera o pet e o usuário a partir dos seus respectivos IDs
     pet = get_pet_by_id(id_pet)
     user = get_user_by_id(id_user)
@@ -36,31 +100,215 @@ def insert_adopt_solicitation(id_pet, phone, id_user):
         return None  # Retorna None caso pet ou usuário não existam
 
     # Insere a solicitação de adoção na tabela
-    response = table.put_item(Item={
-        'id': str(uuid.uuid4()),  # Gera um UUID único para a solicitação
-        'pet': pet,
-        'user': user,
-        'dataCriacao': datetime.now().isoformat(),  # Registra a data de criação da solicitação
-        'status': 'Pendente',  # Status inicial da solicitação
-    })
-    
-    # Retorna a resposta da inserção
-    return response
+    return get_storage().solicitations.put(build_solicitation_item(pet, user))
+
+
+def hydrate_solicitations(solicitations, cache=None):
+    """
+    Atualiza as projeções das solicitações em modo 'reference' com os itens atuais.
+
+    Os IDs de pets e usuários da página são deduplicados e buscados em lote
+    (`BatchGetItem` no DynamoDB). Dos itens atuais são mantidos apenas os atributos
+    de PET_PROJECTION e USER_PROJECTION, como na projeção gravada, para que a
+    resposta continue pequena.
+    O `cache` pode ser compartilhado entre páginas da mesma invocação para evitar
+    buscar o mesmo pet ou usuário mais de uma vez. Solicitações no formato antigo
+    ('embedded') são retornadas sem alteração.
+
+    Args:
+        solicitations (list): Solicitações lidas da tabela.
+        cache (dict, opcional): Cache da invocação, indexado por (tabela, id).
+
+    Returns:
+        list: As solicitações com as projeções de pet e usuário atualizadas.
+
+    Raises:
+        UnprocessedKeysError: Se pets ou usuários ficaram sem leitura (limite de vazão);
+            a página não é retornada com projeções desatualizadas.
+    """
+    if cache is None:
+        cache = {}
+
+    references = [s for s in solicitations if 'petId' in s or 'userId' in s]
+    if not references:
+        return solicitations
+
+    storage = get_storage()
+    pets = storage.pets.batch_get([s.get('petId') for s in references], cache)
+    users = storage.users.batch_get([s.get('userId') for s in references], cache)
+
+    for solicitation in references:
+        # Mantém a projeção gravada caso o item original tenha sido removido
+        pet = pets.get(solicitation.get('petId'))
+        user = users.get(solicitation.get('userId'))
+        solicitation['pet'] = project(pet, PET_PROJECTION) if pet else solicitation.get('pet')
+        solicitation['user'] = project(user, USER_PROJECTION) if user else solicitation.get('user')
+
+    return solicitations
+
+
+def get_adopt_solicitations_page(limit=None, start_key=None, hydrate=True, cache=None):
+    """
+    Recupera uma página de solicitações de adoção.
+
+    Args:
+        limit (int, opcional): Quantidade máxima de itens lidos na página.
+        start_key (dict, opcional): `LastEvaluatedKey` da página anterior.
+        hydrate (bool): Se True, atualiza as projeções com os itens atuais de pet e usuário.
+        cache (dict, opcional): Cache da invocação usado na hidratação.
+
+    Returns:
+        tuple: (lista de solicitações, `LastEvaluatedKey` ou None se for a última página).
+    """
+    items, last_key = get_storage().solicitations.scan_page(limit, start_key)
+
+    if hydrate:
+        items = hydrate_solicitations(items, cache)
+
+    return items, last_key
 
 
 def get_adopt_solicitations():
     """
     Recupera todas as solicitações de adoção do banco de dados.
 
-    Realiza uma busca completa na tabela de solicitações e retorna os itens encontrados.
+    Percorre todas as páginas da tabela de solicitações, hidratando cada página
+    com um cache compartilhado, e retorna os itens encontrados.
 
     Returns:
         list: Lista de itens de solicitação de adoção ou None se não houver solicitações.
     """
-    
-    # Realiza a varredura completa na tabela para obter as solicitações
-    response = table.scan()
+    cache = {}
+    solicitations = []
+    start_key = None
+
+    # Percorre todas as páginas da tabela para obter as solicitações
+    while True:
+        items, start_key = get_adopt_solicitations_page(start_key=start_key, cache=cache)
+        solicitations.extend(items)
+        if not start_key:
+            break
 
     # Retorna a lista de solicitações ou None caso não haja resultados
-    return response.get('Items', None)
+    return solicitations or None
+
+
+def scan_segment(segment, total_segments, page_size=None):
+    """
+    Percorre um segmento de uma varredura paralela da tabela de solicitações.
+
+    Cada segmento pode ser lido em uma thread própria; no DynamoDB é usado o client
+    do recurso (thread-safe) com `Segment`/`TotalSegments`.
+
+    Args:
+        segment (int): Número do segmento (0 a total_segments - 1).
+        total_segments (int): Quantidade total de segmentos da varredura.
+        page_size (int, opcional): Quantidade máxima de itens por página.
+
+    Returns:
+        iterator: Cada página (lista) de solicitações do segmento.
+    """
+    return get_storage().solicitations.scan_segment(segment, total_segments, page_size)
+
+
+def transition_adopt_solicitations(changes, reason=None):
+    """
+    Move várias solicitações de adoção entre status, informando o resultado de cada uma.
+
+    As solicitações são lidas em lote para validar as transições (SOLICITATION_TRANSITIONS)
+    e as válidas são gravadas pelo backend de armazenamento; no DynamoDB, em transações
+    (`TransactWriteItems`) com até 50 solicitações, em que cada solicitação muda de status
+    junto com o campo 'disponivel' do seu pet. Cada gravação é condicional ao status lido,
+    então uma solicitação alterada por outra chamada nesse meio tempo não é sobrescrita,
+    e duas aprovações do mesmo pet não são aceitas.
+
+    Args:
+        changes (list): Dicionários com 'id', 'status' (destino) e 'motivo' (opcional).
+        reason (str, opcional): Motivo gravado nas solicitações sem 'motivo' próprio.
+
+    Returns:
+        list: Um resultado por item de `changes`, na mesma ordem, com 'id', 'status',
+            'previousStatus' (quando lido) e 'outcome': 'applied', 'unchanged' (já estava
+            no status), 'not_found', 'invalid_status', 'invalid_transition', 'duplicate',
+            'pet_not_found', 'status_changed' (alterada durante a chamada),
+            'pet_unavailable', 'throttled' (não lida por limite de vazão; pode ser
+            repetida) ou o código de erro do DynamoDB.
+    """
+    results = []
+    valid = []
+    seen = set()
+    for change in changes:
+        solicitation_id = change.get('id')
+        status = change.get('status')
+        result = {'id': solicitation_id, 'status': status}
+        results.append(result)
+
+        if not isinstance(solicitation_id, str) or not solicitation_id:
+            result['outcome'] = 'not_found'
+        elif solicitation_id in seen:
+            result['outcome'] = 'duplicate'
+        elif status not in SOLICITATION_TRANSITIONS:
+            result['outcome'] = 'invalid_status'
+        else:
+            seen.add(solicitation_id)
+            valid.append((result, change))
+
+    storage = get_storage()
+    throttled = set()
+    try:
+        current = storage.solicitations.batch_get([result['id'] for result, _ in valid]) if valid else {}
+    except UnprocessedKeysError as e:
+        current = e.found
+        throttled = set(e.unprocessed)
+
+    now = datetime.now().isoformat()
+    transitions = []
+    pending = {}
+    for result, change in valid:
+        solicitation = current.get(result['id'])
+        if solicitation is None:
+            result['outcome'] = 'throttled' if result['id'] in throttled else 'not_found'
+            continue
+
+        rule = SOLICITATION_TRANSITIONS[result['status']]
+        previous = solicitation.get('status')
+        result['previousStatus'] = previous
+        if previous == result['status']:
+            # repetir uma chamada (ex.: após um timeout) não é um erro
+            result['outcome'] = 'unchanged'
+            continue
+        if previous not in rule['from']:
+            result['outcome'] = 'invalid_transition'
+            continue
+
+        transition = {'id': result['id'], 'from': previous, 'to': result['status'], 'updatedAt': now}
+        if change.get('motivo') or reason:
+            transition['reason'] = change.get('motivo') or reason
+        if 'disponivel' in rule:
+            # solicitações no formato antigo ('embedded') guardam o pet completo
+            pet_id = solicitation.get('petId') or (solicitation.get('pet') or {}).get('id')
+            if not pet_id:
+                result['outcome'] = 'pet_not_found'
+                continue
+            transition['petId'] = pet_id
+            transition['disponivel'] = rule['disponivel']
+        transitions.append(transition)
+        pending[result['id']] = result
+
+    outcomes = storage.solicitations.apply_transitions(transitions) if transitions else {}
+    for solicitation_id, outcome in outcomes.items():
+        pending[solicitation_id]['outcome'] = outcome
+
+    applied = [t for t in transitions if outcomes.get(t['id']) == TRANSITION_APPLIED]
+    if any('disponivel' in t for t in applied):
+        # a lista de adoção não pode oferecer um pet aprovado para outra pessoa
+        invalidate_pets_cache()
 
+    emit_metrics(
+        {
+            'SolicitationTransitionsApplied': len(applied),
+            'SolicitationTransitionsRejected': len(results) - len(applied),
+        },
+        properties={'requested': len(results), 'attempted': len(transitions)}
+    )
+    return results
@@ -1,69 +1,193 @@
-import boto3
 import logging
-import json
 import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.storage import get_storage
+from services.storage.base import ConflictError
 
-LEX_SESSIONS_TABLE = os.getenv('DYNAMODB_TABLE_LEX_SESSIONS')
 logger = logging.getLogger()
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(LEX_SESSIONS_TABLE) 
 
-def get_session(user_id):
+# sessões mantidas na memória do container (usuário -> atributos e versão)
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '1000'))
+# após esse tempo a sessão é relida: outro container pode ter atendido o usuário
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '300'))
+# tentativas de gravação quando outras mensagens do usuário salvam a sessão ao mesmo tempo
+SESSION_SAVE_ATTEMPTS = 3
+# atributos que identificam o usuário cadastrado (services.dynamo.user.user_session_attributes):
+# vêm do mesmo cadastro em qualquer mensagem, então o valor deste turno pode ser aplicado mesmo
+# que a outra mensagem também o tenha alterado. Os demais são estado do diálogo (etapa, pet
+# escolhido...): se as duas mensagens os alteraram, prevalece o valor já salvo pela outra.
+MERGEABLE_SESSION_KEYS = frozenset(('userId', 'nome', 'e-mail', 'telefone', 'idade'))
+
+_session_cache = OrderedDict()  # user_id -> (expira em, atributos, versão)
+_session_cache_lock = threading.Lock()
+
+
+def _cache_get(user_id):
+    with _session_cache_lock:
+        entry = _session_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _session_cache[user_id]
+            return None
+        _session_cache.move_to_end(user_id)
+        return dict(entry[1]), entry[2]
+
+
+def _cache_put(user_id, session_attributes, version):
+    if SESSION_CACHE_SIZE <= 0:
+        return
+    with _session_cache_lock:
+        _session_cache[user_id] = (time.monotonic() + SESSION_CACHE_TTL, dict(session_attributes), version)
+        _session_cache.move_to_end(user_id)
+        while len(_session_cache) > SESSION_CACHE_SIZE:
+            _session_cache.popitem(last=False)
+
+
+def invalidate_session(user_id=None):
+    """Remove a sessão do usuário do cache do container (ou todas, sem `user_id`)."""
+    with _session_cache_lock:
+        if user_id is None:
+            _session_cache.clear()
+        else:
+            _session_cache.pop(user_id, None)
+
+
+def get_session(user_id, consistent=False):
     """
-    Carrega o estado da sessão para o usuário a partir do DynamoDB.
+    Carrega o estado da sessão para o usuário, do cache do container ou do backend de armazenamento.
 
-    A função tenta recuperar os atributos da sessão associados a um `user_id` no DynamoDB.
-    Caso a sessão seja encontrada, ela retorna os atributos salvos. Caso contrário, 
-    retorna um dicionário vazio.
+    Mensagens seguidas de uma conversa costumam cair no mesmo container, então a
+    sessão salva no turno anterior é reaproveitada sem leitura. O cache é seguro
+    porque a sessão tem uma versão: `save_session` só grava se a versão armazenada
+    ainda é a lida, e uma sessão alterada por outro container resulta em ConflictError.
 
     Args:
         user_id (str): O ID do usuário para o qual os dados de sessão devem ser recuperados.
+        consistent (bool): Ignora o cache e faz uma leitura fortemente consistente
+            (usado após um conflito).
 
     Returns:
-        dict: Um dicionário com os atributos da sessão do usuário ou um dicionário vazio se não encontrado.
+        tuple: (atributos da sessão, versão). Sem sessão salva: ({}, 0); se a leitura
+            falhar: ({}, None), e a próxima gravação não é condicional.
     """
+    if not consistent:
+        cached = _cache_get(user_id)
+        if cached is not None:
+            logger.info(f"Sessão do usuário {user_id} carregada do cache (versão {cached[1]})")
+            return cached
+
     try:
-        # Recupera o item do DynamoDB usando o user_id como chave primária
-        response = table.get_item(Key={'id': user_id})
+        # Recupera a sessão usando o user_id como chave primária
+        session_attributes, version = get_storage().sessions.get(user_id, consistent=consistent)
 
-        if 'Item' in response:
+        if session_attributes is not None:
             # Se a sessão existir, retorna os atributos da sessão
-            logger.info(f"Sessão carregada para o usuário {user_id}: {response['Item']}")
-            return response['Item'].get('sessionAttributes', {})
+            logger.info(f"Sessão carregada para o usuário {user_id}: {session_attributes}")
         else:
             # Caso não exista sessão associada ao usuário, retorna um dicionário vazio
             logger.info(f"Nenhuma sessão existente encontrada para o usuário {user_id}.")
-            return {}
+            session_attributes = {}
+
+        _cache_put(user_id, session_attributes, version)
+        return dict(session_attributes), version
 
     except Exception as e:
         # Caso ocorra um erro ao tentar carregar a sessão, registra o erro
-        logger.error(f"Erro ao carregar a sessão do DynamoDB: {str(e)}")
-        return {}
+        logger.error(f"Erro ao carregar a sessão: {str(e)}")
+        return {}, None
 
 
-def save_session(user_id, session_attributes):
+def save_session(user_id, session_attributes, version=None):
     """
-    Salva o estado da sessão para o usuário no DynamoDB.
+    Salva o estado da sessão para o usuário no backend de armazenamento.
+
+    A gravação é condicional à versão lida por `get_session`: se outra mensagem do
+    mesmo usuário salvou a sessão nesse meio tempo, nada é gravado e ConflictError
+    é lançado, em vez de sobrescrever silenciosamente a sessão da outra mensagem.
 
-    A função armazena os atributos da sessão associados a um `user_id` no DynamoDB. 
-    Caso a operação de inserção seja bem-sucedida, registra a operação com sucesso.
-    
     Args:
         user_id (str): O ID do usuário para o qual os dados de sessão devem ser salvos.
         session_attributes (dict): Um dicionário contendo os atributos da sessão que devem ser salvos.
-    
+        version (int, optional): Versão retornada por `get_session` (None: gravação incondicional).
+
     Returns:
-        None
+        int: A nova versão da sessão, ou None se a gravação falhou.
+
+    Raises:
+        ConflictError: Se a sessão mudou desde a leitura.
     """
     try:
-        # Salva ou atualiza os atributos da sessão no DynamoDB
-        table.put_item(Item={
-            'id': user_id,
-            'sessionAttributes': session_attributes
-        })
+        # Salva ou atualiza os atributos da sessão
+        new_version = get_storage().sessions.put(user_id, session_attributes, expected_version=version)
+        _cache_put(user_id, session_attributes, new_version)
         # Registra que a sessão foi salva com sucesso
-        logger.info(f"Sessão salva para o usuário {user_id}: {session_attributes}")
+        logger.info(f"Sessão salva para o usuário {user_id} (versão {new_version}): {session_attributes}")
+        return new_version
 
+    except ConflictError:
+        invalidate_session(user_id)
+        raise
     except Exception as e:
         # Caso ocorra um erro ao tentar salvar a sessão, registra o erro
-        logger.error(f"Erro ao salvar a sessão no DynamoDB: {str(e)}")
+        invalidate_session(user_id)
+        logger.error(f"Erro ao salvar a sessão: {str(e)}")
+        return None
+
+
+def save_session_changes(user_id, original_attributes, session_attributes, version):
+    """
+    Salva a sessão de um turno, aplicando sobre a versão atual as alterações feitas por ele.
+
+    Se outra mensagem do usuário salvou a sessão depois da leitura (ConflictError),
+    a sessão atual é relida e só os atributos que este turno incluiu, alterou ou
+    removeu em relação a `original_attributes` são aplicados sobre ela; os demais
+    ficam como a outra mensagem os deixou. A chamada ao Lex não é repetida.
+
+    Um atributo alterado (ou removido) pelas duas mensagens só recebe o valor deste
+    turno se estiver em MERGEABLE_SESSION_KEYS. Para os atributos do diálogo o merge
+    desse atributo falha: fica o valor da outra mensagem, que já foi salvo e já foi
+    usado na resposta dela, e os atributos descartados são registrados no log.
+
+    Args:
+        user_id (str): O ID do usuário.
+        original_attributes (dict): Atributos lidos no início do turno.
+        session_attributes (dict): Atributos ao final do turno (retornados pelo Lex).
+        version (int): Versão lida no início do turno.
+
+    Returns:
+        int: A nova versão da sessão, ou None se não foi possível salvar.
+    """
+    changed = {key: value for key, value in session_attributes.items() if original_attributes.get(key) != value}
+    removed = [key for key in original_attributes if key not in session_attributes]
+
+    for _ in range(SESSION_SAVE_ATTEMPTS):
+        try:
+            return save_session(user_id, session_attributes, version)
+        except ConflictError:
+            logger.info(f"Sessão do usuário {user_id} alterada por outra mensagem, aplicando as alterações do turno")
+            current, version = get_session(user_id, consistent=True)
+            if version is None:
+                return None
+            # atributos do diálogo que as duas mensagens alteraram: prevalece o valor da outra
+            conflicting = [
+                key for key in (*changed, *removed)
+                if key not in MERGEABLE_SESSION_KEYS
+                and current.get(key) != original_attributes.get(key)
+                and current.get(key) != session_attributes.get(key)
+            ]
+            if conflicting:
+                logger.warning(
+                    f"Atributos alterados pelas duas mensagens do usuário {user_id}, "
+                    f"mantido o valor da outra mensagem: {conflicting}"
+                )
+            session_attributes = {
+                key: value for key, value in current.items() if key not in removed or key in conflicting
+            }
+            session_attributes.update({key: value for key, value in changed.items() if key not in conflicting})
+
+    logger.error(f"Sessão do usuário {user_id} não foi salva após {SESSION_SAVE_ATTEMPTS} conflitos")
+    return None
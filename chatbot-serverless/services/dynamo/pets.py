@@ -1,34 +1,109 @@
-import boto3
+import logging
 import os
+import threading
+import time
 from datetime import datetime
 import uuid
 
-TABLE_DYNAMO_PETS = os.getenv('DYNAMODB_TABLE_PETS')
+from services.storage import get_storage
+
+logger = logging.getLogger()
+
+# segundos em que o catálogo lido fica na memória do container (0 desativa); é também
+# o atraso máximo para um animal cadastrado pelo apiPostPets, que roda em outra Lambda
+# e não alcança este cache, aparecer no GET /pets e na lista de adoção
+PETS_CACHE_TTL = float(os.getenv('PETS_CACHE_TTL', '15'))
+
+_catalog = None  # (backend, expira em, animais)
+_catalog_lock = threading.Lock()
+# funções chamadas com cada animal cadastrado e quando o catálogo é descartado (ex.: o índice de busca)
+_catalog_listeners = []
+_invalidation_listeners = []
+
+
+def _copy_pets(pets):
+    # quem chama pode alterar os itens (ex.: apiGetPets inclui a imagemUrl)
+    return [dict(pet) for pet in pets]
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(TABLE_DYNAMO_PETS)
 
 def get_pets():
     """
-    Recupera todos os animais disponíveis na tabela do DynamoDB.
+    Recupera todos os animais disponíveis no backend de armazenamento configurado.
 
     Realiza uma varredura completa na tabela e retorna todos os itens (animais) encontrados.
+    O resultado fica na memória do container por PETS_CACHE_TTL segundos, então a
+    lista de adoção e o catálogo da API não repetem a varredura a cada chamada
+    (e o aquecimento do container já deixa o catálogo carregado).
+
+    O cache troca atualidade por leituras: `insert_pet` só atualiza o catálogo do
+    container que o executa, e o apiPostPets é outra Lambda, então um animal novo
+    pode faltar nas demais por até PETS_CACHE_TTL segundos.
     Se nenhum animal for encontrado, retorna `None`.
 
     Returns:
         list: Lista de animais encontrados ou `None` caso não haja animais.
     """
+    global _catalog
     try:
-        response = table.scan()  # Realiza uma varredura na tabela
-        return response.get('Items', None)  # Retorna os animais ou None se não houver resultados
+        storage = get_storage()
+        catalog = _catalog
+        if catalog is not None and catalog[0] is storage and catalog[1] > time.monotonic():
+            return _copy_pets(catalog[2]) or None
+
+        pets = storage.pets.list_all()  # Realiza uma varredura na tabela
+        if PETS_CACHE_TTL > 0:
+            with _catalog_lock:
+                _catalog = (storage, time.monotonic() + PETS_CACHE_TTL, _copy_pets(pets))
+        return pets or None  # Retorna os animais ou None se não houver resultados
     except Exception as e:
         logger.error(f"Erro ao recuperar animais: {str(e)}")
         return None
 
 
+def add_catalog_listener(listener, on_invalidate=None):
+    """
+    Registra uma função chamada com cada animal inserido por `insert_pet`.
+
+    `on_invalidate`, se informada, é chamada sem argumentos por `invalidate_pets_cache`.
+    """
+    if listener not in _catalog_listeners:
+        _catalog_listeners.append(listener)
+    if on_invalidate is not None and on_invalidate not in _invalidation_listeners:
+        _invalidation_listeners.append(on_invalidate)
+
+
+def catalog_expiry(storage):
+    """
+    Retorna o instante (`time.monotonic`) em que o catálogo de `storage` mantido no container
+    expira, ou None se não há catálogo em cache (ex.: PETS_CACHE_TTL=0).
+
+    Quem deriva dados do catálogo (o índice de busca) usa o mesmo prazo, para não
+    estender a validade de um catálogo já lido há algum tempo.
+    """
+    catalog = _catalog
+    if catalog is None or catalog[0] is not storage:
+        return None
+    return catalog[1]
+
+
+def invalidate_pets_cache():
+    """
+    Descarta o catálogo mantido na memória do container (ex.: após mudar a disponibilidade de animais).
+
+    Só o container que chama é afetado: os demais continuam com o catálogo que leram
+    até ele expirar, então uma mudança de disponibilidade leva até PETS_CACHE_TTL
+    segundos para aparecer neles.
+    """
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+    for listener in _invalidation_listeners:
+        listener()
+
+
 def get_pet_by_id(id):
     """
-    Recupera um animal específico pelo seu ID a partir do DynamoDB.
+    Recupera um animal específico pelo seu ID.
 
     A função busca um animal na tabela utilizando o ID fornecido.
     Se o animal for encontrado, retorna o item correspondente. Caso contrário, retorna `None`.
@@ -41,8 +116,7 @@ def get_pet_by_id(id):
     """
     try:
         # Recupera o animal pela chave primária 'id'
-        response = table.get_item(Key={'id': id})
-        return response.get('Item', None)  # Retorna o item do animal ou None
+        return get_storage().pets.get(id)  # Retorna o item do animal ou None
     except Exception as e:
         logger.error(f"Erro ao buscar animal com ID {id}: {str(e)}")
         return None
@@ -63,13 +137,10 @@ def get_pet_by_name_and_breed(name, breed):
     """
     try:
         # Realiza uma consulta no índice secundário para buscar pelo nome do animal
-        response = table.query(
-            IndexName='NameIndex',  # Usando índice secundário de nome
-            KeyConditionExpression=boto3.dynamodb.conditions.Key('nome').eq(name)
-        )
-        
+        pets = get_storage().pets.find_by_name(name)
+
         # Itera sobre os itens retornados e filtra pela raça
-        for pet in response.get('Items', []):
+        for pet in pets:
             if pet.get('raça') == breed:
                 return pet  # Retorna o pet encontrado
         
@@ -79,9 +150,9 @@ def get_pet_by_name_and_breed(name, breed):
         return None
 
 
-def insert_pet(name, specie, breed, age):
+def insert_pet(name, specie, breed, age, image=None):
     """
-    Insere um novo animal na tabela do DynamoDB.
+    Insere um novo animal na tabela de pets.
 
     A função gera um ID único para o novo animal, preenche os dados do animal, e os insere na tabela.
     O status do animal é definido como "disponível" por padrão.
@@ -91,21 +162,38 @@ def insert_pet(name, specie, breed, age):
         specie (str): A espécie do animal.
         breed (str): A raça do animal.
         age (int): A idade do animal.
+        image (str, opcional): Chave da foto do animal no bucket S3.
 
     Returns:
-        dict: A resposta da operação de inserção no DynamoDB.
+        dict: O item do animal inserido ou `None` em caso de erro.
     """
     try:
         # Gera um UUID para o novo animal e insere os dados na tabela
-        response = table.put_item(Item={
+        pet = {
             'id': str(uuid.uuid4()),  # Gera um ID único para o animal
             'nome': name,
             'especie': specie,
             'raça': breed,
             'idade': age,
             'disponivel': True,  # O animal é marcado como disponível por padrão
-        })
-        return response  # Retorna a resposta da operação de inserção
+        }
+        if image:
+            pet['imagem'] = image
+        stored = get_storage().pets.put(pet)
+        _add_to_catalog(stored)
+        return stored
     except Exception as e:
         logger.error(f"Erro ao inserir animal {name}: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def _add_to_catalog(pet):
+    # o animal cadastrado por este container aparece no catálogo sem esperar o TTL
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None and _catalog[0] is get_storage():
+            _catalog = (_catalog[0], _catalog[1], _catalog[2] + [dict(pet)])
+    for listener in _catalog_listeners:
+        try:
+            listener(pet)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar o catálogo com o animal {pet.get('id')}: {str(e)}")
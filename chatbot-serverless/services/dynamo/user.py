@@ -1,40 +1,145 @@
-import boto3
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 import uuid
 
+from services.storage import get_storage
 from utils.dynamo_utils import format_phone_number
+from utils.phone_utils import to_e164, legacy_phone_variants
 
-TABLE_DYNAMO_USERS = os.getenv('DYNAMODB_TABLE_USERS')
+logger = logging.getLogger()
+
+# busca também os formatos de telefone gravados antes do E.164 (desativar após migrar a base)
+PHONE_LEGACY_LOOKUP = os.getenv('PHONE_LEGACY_LOOKUP', 'true').lower() != 'false'
+
+# usuários por telefone mantidos na memória do container (telefone -> usuário, ou None se não cadastrado)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1000'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '300'))
+
+_user_cache = OrderedDict()  # telefone E.164 -> (expira em, usuário ou None)
+_user_cache_lock = threading.Lock()
+
+_MISSING = object()
+
+
+def _cache_get(phone):
+    with _user_cache_lock:
+        entry = _user_cache.get(phone)
+        if entry is None:
+            return _MISSING
+        if entry[0] < time.monotonic():
+            del _user_cache[phone]
+            return _MISSING
+        _user_cache.move_to_end(phone)
+        return entry[1]
+
+
+def _cache_put(phone, user):
+    if USER_CACHE_SIZE <= 0 or not phone:
+        return
+    with _user_cache_lock:
+        _user_cache[phone] = (time.monotonic() + USER_CACHE_TTL, user)
+        _user_cache.move_to_end(phone)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+
+def invalidate_user_cache():
+    """Descarta os usuários mantidos na memória do container."""
+    with _user_cache_lock:
+        _user_cache.clear()
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(TABLE_DYNAMO_USERS)
 
 def search_by_phone(phone):
+    """
+    Busca os usuários cadastrados com o telefone, em qualquer formato em que foi digitado.
+
+    O telefone é convertido para E.164 e buscado no índice PhoneIndex. Se nada for
+    encontrado e PHONE_LEGACY_LOOKUP estiver ativo, são buscados os formatos gravados
+    antes da padronização (utils.phone_utils.legacy_phone_variants), uma consulta por
+    formato. A busca não grava nada: os telefones antigos são convertidos pela
+    migração (tools.migrate_user_phones), após a qual PHONE_LEGACY_LOOKUP=false
+    deixa uma consulta só por busca.
+
+    Args:
+        phone (str): Telefone digitado pelo usuário ou remetente do WhatsApp.
+
+    Returns:
+        list: Usuários encontrados (lista vazia se nenhum).
+    """
     formPhone = format_phone_number(phone)
-    response = table.query(
-        IndexName='PhoneIndex',
-        KeyConditionExpression=boto3.dynamodb.conditions.Key('phone').eq(formPhone)
-    )
-    return response.get('Items', None)
+    users = get_storage().users
+    result = users.find_by_phone(formPhone)
+    if result or not PHONE_LEGACY_LOOKUP or not to_e164(phone):
+        return result
+
+    for variant in legacy_phone_variants(phone):
+        result = users.find_by_phone(variant)
+        if result:
+            logger.info(f"Usuário {result[0].get('id')} encontrado pelo telefone no formato antigo '{variant}'")
+            return result
+    return []
+
+
+def get_user_by_phone(phone):
+    """
+    Retorna o usuário cadastrado com o telefone, consultando o cache do container antes do banco.
+
+    Telefones sem cadastro também ficam no cache (por USER_CACHE_TTL segundos), para
+    que as mensagens de quem ainda não se cadastrou não repitam as buscas.
+
+    Returns:
+        dict: O usuário, ou None se não houver cadastro ou a busca falhar.
+    """
+    canonical = to_e164(phone)
+    if not canonical:
+        return None
+
+    cached = _cache_get(canonical)
+    if cached is not _MISSING:
+        return cached
+
+    try:
+        result = search_by_phone(canonical)
+    except Exception as e:
+        logger.error(f"Erro ao buscar usuário pelo telefone {canonical}: {str(e)}")
+        return None
+    user = result[0] if result else None
+    _cache_put(canonical, user)
+    return user
+
+
+def user_session_attributes(user):
+    """Atributos de sessão que identificam o usuário nas intents (valores em texto, como o Lex exige)."""
+    attributes = {
+        'userId': user.get('id'),
+        'nome': user.get('name'),
+        'e-mail': user.get('email'),
+        'telefone': user.get('phone'),
+        'idade': user.get('age'),
+    }
+    return {key: str(value) for key, value in attributes.items() if value is not None}
+
 
 def insert_user(name, email, phone, age):
     formPhone = format_phone_number(phone)
 
-    response = table.put_item(Item={
+    # Retorna o item gravado, para que o chamador tenha acesso ao id gerado
+    user = get_storage().users.put({
         'id': str(uuid.uuid4()),  # Gera um UUID para o id
         'name': name,
         'email': email,
         'phone': formPhone,
         'age': age
     })
-    return response
+    _cache_put(to_e164(phone), user)
+    return user
 
 def get_user_by_id(id):
     print("ID", id)
-    response = table.get_item(Key={'id': id})
-    print("Response", response)
-    return response.get('Item', None)
-
-
-
+    user = get_storage().users.get(id)
+    print("User", user)
+    return user
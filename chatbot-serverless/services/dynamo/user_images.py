@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from services.storage import get_storage
+
+def insert_user_image(user_id, sha256, original_key, derivative_key, content_type, size):
+    """
+    Registra que o usuário enviou a imagem com este conteúdo.
+
+    As imagens são gravadas no S3 pelo hash do conteúdo, então a mesma foto enviada
+    por vários usuários (ou reenviada) é um único objeto; esta referência guarda
+    quem enviou o quê. Reenvios do mesmo usuário apenas atualizam a referência.
+
+    Args:
+        user_id (str): Telefone do usuário (From do Twilio, sem o prefixo).
+        sha256 (str): Hash SHA-256 do arquivo original.
+        original_key (str): Chave do original no S3.
+        derivative_key (str): Chave do derivado (JPEG reduzido) no S3.
+        content_type (str): Tipo real do original.
+        size (int): Tamanho do original em bytes.
+
+    Returns:
+        dict: A referência gravada.
+    """
+    return get_storage().images.put({
+        'id': f"{user_id}#{sha256}",
+        'userId': user_id,
+        'sha256': sha256,
+        'originalKey': original_key,
+        'derivativeKey': derivative_key,
+        'contentType': content_type,
+        'size': size,
+        'sentAt': datetime.now().isoformat(),
+    })
+
+def get_user_images(user_id):
+    """Retorna as referências das imagens enviadas pelo usuário."""
+    return get_storage().images.find_by_user(user_id)
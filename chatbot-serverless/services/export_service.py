@@ -0,0 +1,233 @@
+import csv
+import io
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from services.dynamo.adopt_solicitations import scan_segment, hydrate_solicitations
+from services.s3_service import S3MultipartWriter
+from utils.json_utils import dumps_bytes
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_COLUMNS = [
+    'id', 'status', 'dataCriacao',
+    'petId', 'petNome', 'petEspecie', 'petRaca',
+    'userId', 'userName', 'userPhone',
+]
+
+# Lambda proxy responses are limited to 6 MB; larger exports must go to S3. This caps
+# the raw rows while they are written; escaped into the proxy response they grow, so
+# the handler also checks the serialized response (utils.http_utils.response_size)
+RESPONSE_MAX_BYTES = 5 * 1024 * 1024
+
+# pages kept in flight between the scan workers and the writer
+QUEUE_MAX_PAGES = 16
+
+_SEGMENT_DONE = object()
+
+
+def iter_parallel_scan(total_segments=4, page_size=None, hydrate=True):
+    """
+    Iterates over every adoption solicitation using a DynamoDB parallel scan.
+
+    Each segment is scanned by its own worker thread. Pages are handed over through
+    a bounded queue, so a slow consumer applies back-pressure to the scan and at most
+    `QUEUE_MAX_PAGES` pages are held in memory at any time.
+
+    Args:
+        total_segments (int): Number of scan segments (and worker threads).
+        page_size (int, optional): Maximum number of items read per scan page.
+        hydrate (bool): Whether to refresh the pet/user projections from the current items.
+
+    Yields:
+        dict: Each adoption solicitation.
+    """
+    pages = queue.Queue(maxsize=QUEUE_MAX_PAGES)
+    stop = threading.Event()
+    cache = {}
+
+    def hand_over(value):
+        # gives up when the consumer stops early, so the workers never block forever
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_worker(segment):
+        try:
+            for page in scan_segment(segment, total_segments, page_size):
+                if not hand_over(page):
+                    return
+        except Exception as e:
+            hand_over(e)
+        finally:
+            hand_over(_SEGMENT_DONE)
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        for segment in range(total_segments):
+            executor.submit(scan_worker, segment)
+
+        try:
+            pending = total_segments
+            while pending:
+                page = pages.get()
+                if page is _SEGMENT_DONE:
+                    pending -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+
+                if hydrate:
+                    page = hydrate_solicitations(page, cache)
+                yield from page
+        finally:
+            stop.set()
+
+
+def _csv_row(solicitation):
+    pet = solicitation.get('pet') or {}
+    user = solicitation.get('user') or {}
+    return [
+        solicitation.get('id'),
+        solicitation.get('status'),
+        solicitation.get('dataCriacao'),
+        solicitation.get('petId', pet.get('id')),
+        pet.get('nome'),
+        pet.get('especie'),
+        pet.get('raça'),
+        solicitation.get('userId', user.get('id')),
+        user.get('name'),
+        user.get('phone'),
+    ]
+
+
+def iter_export_chunks(solicitations, export_format='ndjson'):
+    """
+    Serializes solicitations one by one in the requested export format.
+
+    Args:
+        solicitations (iterable): Solicitations to serialize.
+        export_format (str): 'ndjson' or 'csv'.
+
+    Yields:
+        bytes: Encoded chunks (the CSV header first, then one chunk per row).
+    """
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for solicitation in solicitations:
+            writer.writerow(_csv_row(solicitation))
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+        return
+
+    for solicitation in solicitations:
+        yield dumps_bytes(solicitation) + b'\n'
+
+
+def export_solicitations(output, export_format='ndjson', total_segments=4, page_size=None):
+    """
+    Streams every adoption solicitation to a writable binary output.
+
+    Args:
+        output: Object with a `write(bytes)` method (file, stdout buffer, S3MultipartWriter...).
+        export_format (str): 'ndjson' or 'csv'.
+        total_segments (int): Number of parallel scan segments.
+        page_size (int, optional): Maximum number of items read per scan page.
+
+    Returns:
+        dict: Throughput report with items, bytes, seconds and items_per_second.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    started = time.perf_counter()
+    counter = {'items': 0}
+
+    def counted(solicitations):
+        for solicitation in solicitations:
+            counter['items'] += 1
+            yield solicitation
+
+    bytes_written = 0
+    rows = counted(iter_parallel_scan(total_segments, page_size))
+    for chunk in iter_export_chunks(rows, export_format):
+        output.write(chunk)
+        bytes_written += len(chunk)
+
+    seconds = time.perf_counter() - started
+    return {
+        'format': export_format,
+        'segments': total_segments,
+        'items': counter['items'],
+        'bytes': bytes_written,
+        'seconds': round(seconds, 3),
+        'items_per_second': round(counter['items'] / seconds, 1) if seconds else 0.0,
+    }
+
+
+class ExportTooLargeError(Exception):
+    """Raised when an export does not fit in an API Gateway response body."""
+
+
+class _BoundedBuffer(io.BytesIO):
+    def __init__(self, max_bytes):
+        super().__init__()
+        self.max_bytes = max_bytes
+
+    def write(self, data):
+        if self.tell() + len(data) > self.max_bytes:
+            raise ExportTooLargeError(f"Export exceeds {self.max_bytes} bytes, use destination=s3")
+        return super().write(data)
+
+
+def export_solicitations_to_body(export_format='ndjson', total_segments=4, page_size=None, max_bytes=RESPONSE_MAX_BYTES):
+    """
+    Exports every adoption solicitation into a response body.
+
+    Raises:
+        ExportTooLargeError: If the export grows beyond `max_bytes`.
+
+    Returns:
+        tuple: (body as str, throughput report).
+    """
+    buffer = _BoundedBuffer(max_bytes)
+    report = export_solicitations(buffer, export_format, total_segments, page_size)
+    return buffer.getvalue().decode('utf-8'), report
+
+
+def export_solicitations_to_s3(export_format='ndjson', total_segments=4, page_size=None, key=None):
+    """
+    Streams every adoption solicitation to an S3 object through a multipart upload.
+
+    Args:
+        export_format (str): 'ndjson' or 'csv'.
+        total_segments (int): Number of parallel scan segments.
+        page_size (int, optional): Maximum number of items read per scan page.
+        key (str, optional): Destination key (default: exports/adopt-solicitations-<timestamp>.<format>).
+
+    Returns:
+        dict: Throughput report, including the `key` of the exported object.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    key = key or f"exports/adopt-solicitations-{datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    with S3MultipartWriter(key, EXPORT_FORMATS[export_format]) as writer:
+        report = export_solicitations(writer, export_format, total_segments, page_size)
+
+    report['key'] = key
+    return report
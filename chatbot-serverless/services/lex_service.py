@@ -1,18 +1,29 @@
+import logging
 
 from utils.lex_utils import generate_lex_response
+from utils.profiling_utils import instrument_intent
 from intents.verificacaoCadastro import verifcacaoCadastro
 from intents.novoCadastro import novoCadastro
 from intents.adotarPet import adotarPet
 from intents.doacaoOng import doacaoOng
 from intents.identificarCachorro import identificarCachorro
 
+logger = logging.getLogger()
+
+# intents that ask whether the user is registered and verify the phone; a sender
+# already identified by the webhook (userId in the session) skips them
+REGISTRATION_INTENTS = ("saudacaoCadastro", "verificacaoCadastro")
+
 def lex_response(intentName, event):
     try:
-        # call the function that corresponds to the intent
-        response = select_intent(intentName, event)
+        # call the function that corresponds to the intent, measuring latency,
+        # downstream calls and (when enabled) a profile of the fulfillment
+        with instrument_intent(intentName):
+            response = select_intent(intentName, event)
         return response
     except Exception as e:
-        # return an error message if an exception occurs
+        # log the traceback and return an error message to the user
+        logger.exception(f"Erro na intent {intentName}: {str(e)}")
         return {
             "sessionState": {
                 "dialogAction": {
@@ -32,11 +43,15 @@ def lex_response(intentName, event):
 
 def select_intent(intentName, event):
     # get session attributes, state, intent and slots from event
-    sessionAttributes = event.get('sessionAttributes', {})
+    # (Lex V2 sends the attributes inside sessionState, e.g. those seeded by the webhook)
     sessionState = event.get('sessionState', {})
+    sessionAttributes = sessionState.get('sessionAttributes') or event.get('sessionAttributes', {})
     intent = sessionState.get('intent', {})
     slots = intent.get('slots', {})
 
+    if intentName in REGISTRATION_INTENTS and event.get('invocationSource') == 'DialogCodeHook':
+        return registration_dialog(intentName, sessionState, sessionAttributes)
+
     # redirects to the "verificacaoCadastro" intent
     if intentName == "verificacaoCadastro":
         return verifcacaoCadastro(sessionState, sessionAttributes, slots, intentName)
@@ -72,3 +87,31 @@ def select_intent(intentName, event):
             }
         ]
     }
+
+
+def registration_dialog(intentName, sessionState, sessionAttributes):
+    """
+    Dialog code hook of the registration intents.
+
+    When the webhook already identified the sender by the WhatsApp number, the
+    session carries `userId` and the intent is closed right away with the menu,
+    instead of asking "Você já possui cadastro?" and then the phone. Otherwise
+    Lex goes on with the bot's own prompts (Delegate).
+
+    Only runs when the dialog code hook is enabled on the intent in the bot
+    definition ("Use a Lambda function for initialization and validation").
+    """
+    if sessionAttributes.get('userId'):
+        logger.info(f"Usuário {sessionAttributes['userId']} já identificado, pulando a intent {intentName}")
+        return generate_lex_response(
+            intentName=intentName,
+            sessionState=sessionState,
+            sessionAttributes=sessionAttributes,
+            message="Cadastro encontrado com sucesso.",
+            state="Fulfilled",
+            showOptions=True
+        )
+
+    sessionState['sessionAttributes'] = sessionAttributes
+    sessionState['dialogAction'] = {"type": "Delegate"}
+    return {"sessionState": sessionState}
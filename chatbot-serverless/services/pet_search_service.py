@@ -0,0 +1,147 @@
+"""
+Free-text search over the pet catalog, answered from memory.
+
+The pets of services.dynamo.pets are indexed (utils.search_index) by name,
+breed, species and age band ("filhote", "jovem", "adulto", "idoso"), with
+accents folded, so "rex labrador", "passaro", "gato filhote" or a misspelled
+"labrdor" find the pets with no storage call. The index is built from the
+catalog cached by services.dynamo.pets and expires with it, so it is never
+older than PETS_CACHE_TTL; it is dropped when the catalog is invalidated, and
+pets created by insert_pet are added to it right away. As with the catalog,
+changes made by other containers show up here within PETS_CACHE_TTL.
+"""
+import threading
+import time
+
+from services.dynamo import pets as pets_service
+from services.storage import get_storage
+from utils.search_index import SearchIndex, tokenize
+
+NAME_WEIGHT = 3.0
+BREED_WEIGHT = 2.0
+SPECIES_WEIGHT = 1.5
+AGE_WEIGHT = 1.0
+
+# upper age (years, exclusive) of each band
+AGE_BANDS = ((1, 'filhote'), (3, 'jovem'), (8, 'adulto'), (float('inf'), 'idoso'))
+
+STOPWORDS = ('a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'um', 'uma', 'com',
+             'ano', 'anos', 'quero', 'adotar', 'sem', 'raca', 'especifica')
+
+_index = None  # (backend, expires at, SearchIndex)
+_index_lock = threading.Lock()
+
+
+def age_band(age):
+    try:
+        age = float(age)
+    except (TypeError, ValueError):
+        return None
+    for limit, band in AGE_BANDS:
+        if age < limit:
+            return band
+    return None
+
+
+def _fields(pet):
+    fields = [
+        (pet.get('nome', ''), NAME_WEIGHT),
+        (pet.get('raça', ''), BREED_WEIGHT),
+        (pet.get('especie', ''), SPECIES_WEIGHT),
+    ]
+    band = age_band(pet.get('idade'))
+    if band:
+        fields.append((band, AGE_WEIGHT))
+    return fields
+
+
+def build_index(pets):
+    index = SearchIndex(stopwords=STOPWORDS)
+    for pet in pets:
+        if pet.get('id') is not None:
+            index.add(pet['id'], dict(pet), _fields(pet))
+    return index
+
+
+def get_index():
+    """Returns the index of the current catalog, rebuilding it when the catalog cache expired."""
+    global _index
+    storage = get_storage()
+    current = _index
+    if current is not None and current[0] is storage and current[1] > time.monotonic():
+        return current[2]
+
+    with _index_lock:
+        current = _index
+        if current is not None and current[0] is storage and current[1] > time.monotonic():
+            return current[2]
+        index = build_index(pets_service.get_pets() or [])
+        # same deadline as the catalog it was built from (none cached: rebuilt on the next call)
+        expires = pets_service.catalog_expiry(storage)
+        _index = (storage, time.monotonic() if expires is None else expires, index)
+        return index
+
+
+def invalidate_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def index_pet(pet):
+    """Adds a pet to the index already built (catalog listener of services.dynamo.pets)."""
+    current = _index
+    if current is not None and current[0] is get_storage() and pet.get('id') is not None:
+        current[2].add(pet['id'], dict(pet), _fields(pet))
+
+
+pets_service.add_catalog_listener(index_pet, on_invalidate=invalidate_index)
+
+
+def _is_available(pet):
+    return pet.get('disponivel', True)
+
+
+def search_pets(query, limit=10, available_only=False):
+    """
+    Searches the pets by free text.
+
+    Args:
+        query (str): Words of the name, breed, species or age band, in any order.
+        limit (int): Maximum number of pets.
+        available_only (bool): Skips pets that are not available for adoption.
+
+    Returns:
+        list: Copies of the matching pets, best first, each with its 'score'.
+    """
+    results = get_index().search(query, limit=limit, predicate=_is_available if available_only else None)
+    return [dict(pet, score=score) for _, score, pet in results]
+
+
+def resolve_pet(text, candidates=5):
+    """
+    Resolves what the user typed for a pet slot to an available pet.
+
+    Only an exact answer resolves the slot: the text has every word of the pet's
+    name and its other words are exactly the breed, species or age band of that
+    pet ("thor", "thor poodle"), and a single available pet answers it that way.
+    Prefix, misspelled or species-only answers ("tho", "thro", "cachorro") never
+    pick a pet on their own: the closest pets come back as options for the user
+    to confirm, since the slot files an adoption solicitation.
+
+    Returns:
+        tuple: (pet, options). `pet` is set when exactly one pet is named;
+            otherwise `options` lists the closest pets (may be empty).
+    """
+    results = get_index().search(text, limit=candidates, predicate=_is_available)
+    tokens = set(tokenize(text, STOPWORDS))
+    exact = [pet for _, _, pet in results if _names_exactly(pet, tokens)]
+    if len(exact) == 1:
+        return dict(exact[0]), []
+    return None, [dict(pet) for _, _, pet in results]
+
+
+def _names_exactly(pet, tokens):
+    name = set(tokenize(pet.get('nome', ''), STOPWORDS))
+    described = set().union(*(tokenize(field, STOPWORDS) for field, _ in _fields(pet)))
+    return bool(name) and name <= tokens <= described
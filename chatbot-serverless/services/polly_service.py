@@ -1,36 +1,238 @@
-import boto3
+import contextvars
 import hashlib
 import os
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-def text_to_speech(text):
+from utils.client_utils import get_client
+from utils.circuit_breaker import CircuitOpenError
+from utils.metrics_utils import emit_metrics
+from utils.polly_utils import get_profile, synthesis_profile, synthesize_kwargs, split_text, chunk_chars
+
+# chunks of a long text synthesized at the same time
+POLLY_MAX_WORKERS = int(os.getenv('POLLY_MAX_WORKERS', '4'))
+
+# audio keys known to exist in S3 (key -> size), so a reply synthesized before skips the HEAD
+AUDIO_KEY_CACHE_SIZE = 4096
+_known_audio = OrderedDict()
+_known_audio_lock = threading.Lock()
+
+def _audio_key(text, profile):
+    # the profile is part of the key: the same text in another voice/format is another object
+    return f"audio/{profile['id']}/{hashlib.md5(text.encode()).hexdigest()}.{profile['extension']}"
+
+def _manifest_key(profile):
+    return f"audio/{profile['id']}/manifest.json"
+
+def _remember_audio(key, size):
+    with _known_audio_lock:
+        _known_audio[key] = size
+        _known_audio.move_to_end(key)
+        while len(_known_audio) > AUDIO_KEY_CACHE_SIZE:
+            _known_audio.popitem(last=False)
+
+def _existing_size(s3, bucket_name, key):
+    with _known_audio_lock:
+        if key in _known_audio:
+            return _known_audio[key]
+    try:
+        size = s3.head_object(Bucket=bucket_name, Key=key)['ContentLength']
+    except Exception:
+        return None
+    _remember_audio(key, size)
+    return size
+
+def _synthesize(polly, profile, text):
+    return polly.synthesize_speech(**synthesize_kwargs(profile, text))['AudioStream'].read()
+
+def _synthesize_chunks(polly, profile, chunks):
+    """
+    Synthesizes the chunks in parallel and concatenates the audio, in order.
+
+    Only for profiles whose audio concatenates (MP3 frames, PCM samples, see
+    utils.polly_utils.is_concatenable): OGG files would become chained streams.
+    The audio of a reply is small (tens to hundreds of KB), far below the 5 MiB
+    minimum part of an S3 multipart upload, so it is stored with one put_object.
+
+    Returns:
+        bytes: The audio of the whole text.
+    """
+    with ThreadPoolExecutor(max_workers=min(POLLY_MAX_WORKERS, len(chunks))) as executor:
+        # each worker runs in a copy of the caller's context, so its Polly calls are counted in the caller's scopes
+        futures = [
+            executor.submit(contextvars.copy_context().run, _synthesize, polly, profile, chunk)
+            for chunk in chunks
+        ]
+        try:
+            return b''.join(future.result() for future in futures)
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+def text_to_speech(text, profile=None):
+    """
+    Converts the text to speech with Polly and stores the audio in S3.
+
+    TTS is not essential to the reply: the Polly client uses short timeouts and
+    no retries, and while its circuit breaker is open the call fails fast and
+    None is returned, so the user still gets the text message.
+
+    The audio is stored under a key derived from the text and the output profile
+    (utils.polly_utils), so a reply already synthesized with the same profile is
+    found with a HEAD and not synthesized again; keys seen by the container (and
+    the static phrases of `load_audio_manifest`) skip the HEAD too. The size of every reply is
+    reported as the TtsAudioBytes metric, per profile.
+
+    Texts longer than POLLY_CHUNK_CHARS (e.g. the pet list of a large shelter,
+    which may also exceed Polly's 3000-character limit) are split at sentence
+    boundaries and the chunks are synthesized concurrently, so the time to audio
+    follows the longest chunk rather than the whole text. OGG profiles are not
+    split: up to 3000 characters they use one Polly call, and longer texts are
+    synthesized as MP3 (utils.polly_utils.synthesis_profile).
+
+    Args:
+        text (str): Text to synthesize.
+        profile (str, optional): Output profile name (default: POLLY_PROFILE).
+
+    Returns:
+        str: Public URL of the audio file, or None if the audio could not be generated.
+    """
     try:
-        polly = boto3.client('polly')
-        s3 = boto3.client('s3')
+        profile = synthesis_profile(get_profile(profile), text)
+        polly = get_client('polly')
+        s3 = get_client('s3')
         bucket_name = os.environ['BUCKET_NAME']
         
         # create a unique file name
-        file_name = hashlib.md5(text.encode()).hexdigest() + '.mp3'
-        
-        # synthesizes the text into speech
-        response = polly.synthesize_speech(
-            Text=text,
-            OutputFormat='mp3',
-            VoiceId='Vitoria'  # Voz bem robotico considerar mudar e olhar os valores das vozes neurais
-        )
-        
-        # upload the file to S3
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=file_name,
-            Body=response['AudioStream'].read(),
-            ContentType='audio/mpeg'
+        file_name = _audio_key(text, profile)
+
+        started = time.perf_counter()
+        audio_bytes = _existing_size(s3, bucket_name, file_name)
+        cached = audio_bytes is not None
+        chunks = 0
+        if not cached:
+            text_chunks = split_text(text, chunk_chars(profile))
+            chunks = len(text_chunks)
+            if chunks > 1:
+                audio = _synthesize_chunks(polly, profile, text_chunks)
+            else:
+                # synthesizes the text into speech
+                audio = _synthesize(polly, profile, text)
+            audio_bytes = len(audio)
+
+            # upload the file to S3
+            s3.put_object(
+                Bucket=bucket_name,
+                Key=file_name,
+                Body=audio,
+                ContentType=profile['content_type']
+            )
+            _remember_audio(file_name, audio_bytes)
+
+        emit_metrics(
+            {
+                'TtsAudioBytes': audio_bytes,
+                'TtsCharacters': len(text),
+                'TtsChunks': chunks,
+                'TtsMilliseconds': round((time.perf_counter() - started) * 1000, 1),
+            },
+            dimensions={'Profile': profile['name']},
+            units={'TtsAudioBytes': 'Bytes', 'TtsMilliseconds': 'Milliseconds'},
+            properties={'cached': cached, 'audioKey': file_name, 'outputFormat': profile['output_format']}
         )
         
         # generate the URL of the file
         url = f"https://{bucket_name}.s3.amazonaws.com/{file_name}"
         
         return url
+    except CircuitOpenError as e:
+        print(f"TTS ignorado: {e}")
+        return None
     except Exception as e:
         print(f"Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def load_audio_manifest(profile=None):
+    """
+    Loads the manifest of pre-synthesized phrases of a profile into the container.
+
+    The manifest (audio/<profile id>/manifest.json, written by `build_audio_manifest`)
+    lists the audio keys of the static phrases of the bot and their sizes; once
+    loaded, `text_to_speech` answers those phrases with no S3 or Polly call.
+
+    Args:
+        profile (str, optional): Output profile name (default: POLLY_PROFILE).
+
+    Returns:
+        int: Number of phrases loaded, or None if the manifest does not exist.
+    """
+    profile = get_profile(profile)
+    try:
+        response = get_client('s3').get_object(Bucket=os.environ['BUCKET_NAME'], Key=_manifest_key(profile))
+    except Exception as e:
+        print(f"Audio manifest not loaded: {e}")
+        return None
+    manifest = json.loads(response['Body'].read())
+    for key, size in manifest.items():
+        _remember_audio(key, size)
+    return len(manifest)
+
+def build_audio_manifest(phrases, profile=None):
+    """
+    Synthesizes the phrases that are not in S3 yet and writes the manifest of the profile.
+
+    Args:
+        phrases (iterable): Static texts of the bot.
+        profile (str, optional): Output profile name (default: POLLY_PROFILE).
+
+    Returns:
+        dict: Audio key -> size of every phrase that has audio.
+    """
+    profile = get_profile(profile)
+    phrases = list(phrases)
+    for phrase in phrases:
+        text_to_speech(phrase, profile['name'])
+
+    manifest = {}
+    for phrase in phrases:
+        key = _audio_key(phrase, profile)
+        with _known_audio_lock:
+            if key in _known_audio:
+                manifest[key] = _known_audio[key]
+
+    get_client('s3').put_object(
+        Bucket=os.environ['BUCKET_NAME'],
+        Key=_manifest_key(profile),
+        Body=json.dumps(manifest).encode('utf-8'),
+        ContentType='application/json'
+    )
+    return manifest
+
+def prepare_static_audio(phrases, profile=None):
+    """
+    Makes the static phrases answerable with no S3 or Polly call in this container.
+
+    Loads the manifest of the profile; when it is missing or lacks a phrase (e.g.
+    a message changed in a deploy), the missing audio is synthesized and the
+    manifest rewritten, so this cost is paid by a warmup invocation, not a user.
+
+    Args:
+        phrases (iterable): Static texts of the bot.
+        profile (str, optional): Output profile name (default: POLLY_PROFILE).
+
+    Returns:
+        dict: phrases (how many are ready) and rebuilt (whether the manifest was written).
+    """
+    profile = get_profile(profile)
+    phrases = list(dict.fromkeys(phrases))
+    load_audio_manifest(profile['name'])
+
+    with _known_audio_lock:
+        missing = [phrase for phrase in phrases if _audio_key(phrase, profile) not in _known_audio]
+    if not missing:
+        return {'phrases': len(phrases), 'rebuilt': False}
+    return {'phrases': len(build_audio_manifest(phrases, profile['name'])), 'rebuilt': True}
@@ -1,12 +1,23 @@
-import boto3
 import json
 import os
 from services.s3_service import get_image
+from utils.client_utils import get_client
+from utils.circuit_breaker import CircuitOpenError
 
-rekognition = boto3.client('rekognition')
+rekognition = get_client('rekognition')
 S3_BUCKET = os.getenv('S3_BUCKET_NAME')
+# limite do Rekognition para imagens enviadas como bytes
+REKOGNITION_MAX_IMAGE_BYTES = 5 * 1024 * 1024
 
-def detect_pet_in_image(image_name):
+def detect_pet_in_image(image_name, image_bytes=None):
+    """
+    Detecta cachorros e suas raças em uma imagem.
+
+    Args:
+        image_name (str): Chave da imagem no bucket S3.
+        image_bytes (bytes, opcional): Conteúdo da imagem (até 5 MB). Quando informado
+            é enviado direto ao Rekognition, que não precisa ler o objeto do S3.
+    """
     try:
         if not image_name:
             return {
@@ -14,14 +25,19 @@ def detect_pet_in_image(image_name):
                 'message': 'Nome da imagem não fornecido'
             }
 
-        # Detecção padrão de labels
-        response = rekognition.detect_labels(
-            Image={
+        if image_bytes and len(image_bytes) <= REKOGNITION_MAX_IMAGE_BYTES:
+            image = {'Bytes': image_bytes}
+        else:
+            image = {
                 'S3Object': {
                     'Bucket': S3_BUCKET,
                     'Name': image_name
                 }
-            },
+            }
+
+        # Detecção padrão de labels
+        response = rekognition.detect_labels(
+            Image=image,
             MaxLabels=100,
             MinConfidence=70
         )
@@ -102,6 +118,12 @@ def detect_pet_in_image(image_name):
             }
         }
 
+    except CircuitOpenError as e:
+        print(f"Rekognition indisponível: {str(e)}")
+        return {
+            'success': False,
+            'message': 'O reconhecimento de imagens está temporariamente indisponível'
+        }
     except Exception as e:
         print(f"Erro: {str(e)}")
         return {
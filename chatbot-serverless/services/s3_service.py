@@ -1,18 +1,69 @@
-import boto3
-import requests
-from requests.auth import HTTPBasicAuth
 import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.client_utils import (
+    get_client, get_twilio_session, get_http_pool_stats,
+    TWILIO_CONNECT_TIMEOUT, TWILIO_READ_TIMEOUT, TWILIO_DOWNLOAD_CHUNK_SIZE
+)
+from utils.circuit_breaker import get_breaker, CircuitOpenError
+from utils.metrics_utils import emit_metrics, record_dependency_call
 
 S3_BUCKET = os.getenv('S3_BUCKET_NAME')
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
+TWILIO_AUTH = (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+# seconds before expiry after which a cached pre-signed URL is signed again
+PRESIGNED_URL_SAFETY_MARGIN = int(os.getenv('PRESIGNED_URL_SAFETY_MARGIN', '300'))
+PRESIGNED_URL_CACHE_SIZE = int(os.getenv('PRESIGNED_URL_CACHE_SIZE', '2048'))
+# longest reuse of a cached URL. A URL dies with the temporary credentials that signed it,
+# whatever its ExpiresIn, and botocore refreshes them while they still have 10 minutes of
+# life: reusing for at most 5 minutes keeps the safety margin with any credentials.
+PRESIGNED_URL_CACHE_MAX_TTL = int(os.getenv('PRESIGNED_URL_CACHE_MAX_TTL', '300'))
+
+s3 = get_client('s3')
+twilio_breaker = get_breaker('twilio')
 
-s3 = boto3.client('s3')
+# (key, expiration) -> (url, reuse until), least recently used first
+_url_cache = OrderedDict()
+_url_cache_lock = threading.Lock()
+
+def _presigned_url_ttl(expiration):
+    # how long a signed URL is handed out: the rest of its life is the margin the client has to use it
+    ttl = expiration - min(PRESIGNED_URL_SAFETY_MARGIN, expiration // 2)
+    return min(ttl, PRESIGNED_URL_CACHE_MAX_TTL)
+
+def _cached_url(cache_key, now):
+    with _url_cache_lock:
+        cached = _url_cache.get(cache_key)
+        if cached is None:
+            return None
+        url, reuse_until = cached
+        if now >= reuse_until:
+            del _url_cache[cache_key]
+            return None
+        _url_cache.move_to_end(cache_key)
+        return url
+
+def _store_url(cache_key, url, reuse_until):
+    with _url_cache_lock:
+        _url_cache[cache_key] = (url, reuse_until)
+        _url_cache.move_to_end(cache_key)
+        while len(_url_cache) > PRESIGNED_URL_CACHE_SIZE:
+            _url_cache.popitem(last=False)
 
 def get_image(file_name, expiration=3600):
     """
     Generates a pre-signed URL to access an object stored in S3.
 
+    URLs are cached per (key, expiration) and reused until PRESIGNED_URL_SAFETY_MARGIN
+    seconds before they expire (at most half of their life), so repeated calls skip
+    the signing and return the same URL, which also keeps the ETag of the JSON
+    responses that embed it stable. The reuse never exceeds PRESIGNED_URL_CACHE_MAX_TTL,
+    shorter than what is left of the signing credentials when botocore refreshes them.
+
     Args:
         file_name (str): The name of the file in the S3 bucket.
         expiration (int): Expiration time for the pre-signed URL in seconds (default: 3600).
@@ -25,6 +76,12 @@ def get_image(file_name, expiration=3600):
         print("Erro: O nome do bucket S3 não foi configurado. Verifique a variável de ambiente 'S3_BUCKET_NAME'.")
         return None
 
+    now = time.time()
+    cache_key = (file_name, expiration)
+    url = _cached_url(cache_key, now)
+    if url is not None:
+        return url
+
     try:
         url = s3.generate_presigned_url(
             ClientMethod='get_object',
@@ -34,11 +91,110 @@ def get_image(file_name, expiration=3600):
             },
             ExpiresIn=expiration
         )
-        return url
     except Exception as e:
         print(f"Erro ao gerar URL para o arquivo '{file_name}' no bucket '{S3_BUCKET}': {e}")
         return None
 
+    ttl = _presigned_url_ttl(expiration)
+    if ttl > 0:
+        _store_url(cache_key, url, now + ttl)
+    return url
+
+def get_images(file_names, expiration=3600):
+    """
+    Returns pre-signed URLs for many objects (e.g. the photos of a catalog page).
+
+    A convenience wrapper over `get_image`: duplicate and empty names are dropped,
+    keys already signed come from its cache and the others are signed one by one
+    (signing is a local computation, S3 has no bulk signing call).
+
+    Args:
+        file_names (iterable): Names of the files in the S3 bucket (empty values are ignored).
+        expiration (int): Expiration time for the pre-signed URLs in seconds (default: 3600).
+
+    Returns:
+        dict: file name -> pre-signed URL, for the URLs that could be generated.
+    """
+    urls = {}
+    for file_name in dict.fromkeys(name for name in file_names if name):
+        url = get_image(file_name, expiration)
+        if url is not None:
+            urls[file_name] = url
+    return urls
+
+def clear_presigned_url_cache():
+    """Drops every cached URL (e.g. after the credentials were rotated)."""
+    with _url_cache_lock:
+        _url_cache.clear()
+
+def open_url_stream(url):
+    """
+    Abre o download de uma mídia do Twilio em modo streaming, passando pelo circuit breaker.
+
+    O download usa a sessão do container (utils.client_utils.get_twilio_session): as
+    conexões ficam abertas e as próximas mídias do mesmo container não repetem o
+    handshake TCP/TLS. Cada download publica quantas conexões abriu e reaproveitou.
+
+    :param url: URL do arquivo para download.
+    :return: A resposta do requests (use como context manager e leia com iter_content).
+    :raises CircuitOpenError: Quando o breaker do Twilio está aberto.
+    :raises requests.exceptions.RequestException: Em falhas de conexão ou status de erro.
+    """
+    # importado aqui: só o webhook baixa mídia e requests pesa no cold start das outras funções
+    import requests
+
+    if not twilio_breaker.allow_request():
+        raise CircuitOpenError('twilio')
+
+    record_dependency_call('twilio')
+    session = get_twilio_session()
+    pool_before = get_http_pool_stats(session)
+    started = time.perf_counter()
+    try:
+        response = session.get(
+            url,
+            auth=TWILIO_AUTH,
+            stream=True,
+            timeout=(TWILIO_CONNECT_TIMEOUT, TWILIO_READ_TIMEOUT)
+        )
+        if response.status_code >= 500:
+            twilio_breaker.record_failure()
+        else:
+            twilio_breaker.record_success()
+    except requests.exceptions.RequestException:
+        twilio_breaker.record_failure()
+        raise
+    finally:
+        _emit_pool_metrics(session, pool_before, started)
+
+    if response.status_code >= 400:
+        response.close()
+    response.raise_for_status()  # Verifica erros no request
+    return response
+
+def _emit_pool_metrics(session, before, started):
+    # requests sent (redirects included) and connections opened by this download
+    after = get_http_pool_stats(session)
+    sent = after['requests'] - before['requests']
+    opened = after['connections'] - before['connections']
+    emit_metrics(
+        {
+            'HttpRequests': sent,
+            'HttpConnectionsOpened': opened,
+            'HttpConnectionsReused': max(sent - opened, 0),
+            'HttpResponseTime': round((time.perf_counter() - started) * 1000, 2),
+        },
+        {'Dependency': 'twilio'},
+        units={'HttpResponseTime': 'Milliseconds'}
+    )
+
+def _media_transfer_config():
+    # media stays under the multipart threshold: one PutObject read in TWILIO_DOWNLOAD_CHUNK_SIZE
+    # blocks, without the thread pool upload_fileobj would otherwise start on every call
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(use_threads=False, io_chunksize=TWILIO_DOWNLOAD_CHUNK_SIZE)
+
 def upload_from_url_to_s3(url, object_name, prefix="assets/"):
     """
     Faz download de um arquivo de uma URL e faz upload diretamente para o S3.
@@ -47,19 +203,150 @@ def upload_from_url_to_s3(url, object_name, prefix="assets/"):
     :param object_name: Nome do arquivo no S3.
     :param prefix: Prefixo padrão para o caminho no bucket (default: 'assets/').
     """
+    import requests
+
     try:
         object_full_name = f"{prefix}{object_name}"
-        # opening the stream of the URL
-        with requests.get(url, auth=HTTPBasicAuth(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN), stream=True) as response:
-            response.raise_for_status()  # Verifica erros no request
 
-            # direct upload to S3
-            s3.upload_fileobj(response.raw, S3_BUCKET, object_full_name)
+        # opening the stream of the URL
+        with open_url_stream(url) as response:
+            # direct upload to S3 (raw is read as sent: decode any Content-Encoding first)
+            response.raw.decode_content = True
+            s3.upload_fileobj(response.raw, S3_BUCKET, object_full_name, Config=_media_transfer_config())
             
             #return the full path of the object in the bucket
             return object_full_name
 
+    except CircuitOpenError as e:
+        print(f"Download ignorado: {e}")
     except requests.exceptions.RequestException as e:
         print(f"Erro ao acessar a URL: {e}")
     except Exception as e:
         print(f"Erro ao fazer upload: {e}")
+
+def object_exists(key):
+    """
+    Verifica com um HEAD se o objeto já existe no bucket.
+
+    :param key: Chave do objeto.
+    :return: True se existe; False se não existe ou se a verificação falhar (o upload segue normalmente).
+    """
+    try:
+        s3.head_object(Bucket=S3_BUCKET, Key=key)
+        return True
+    except Exception as e:
+        code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+        if code not in ('404', 'NoSuchKey', 'NotFound'):
+            print(f"Erro ao verificar o objeto '{key}': {e}")
+        return False
+
+def upload_bytes_to_s3(data, object_name, content_type, prefix="assets/"):
+    """
+    Faz upload de um conteúdo já em memória para o S3.
+
+    :param data: Conteúdo do arquivo.
+    :param object_name: Nome do arquivo no S3.
+    :param content_type: Content-Type gravado no objeto.
+    :param prefix: Prefixo padrão para o caminho no bucket (default: 'assets/').
+    :return: O caminho completo do objeto no bucket, ou None em caso de erro.
+    """
+    object_full_name = f"{prefix}{object_name}"
+    try:
+        s3.put_object(Bucket=S3_BUCKET, Key=object_full_name, Body=data, ContentType=content_type)
+        return object_full_name
+    except Exception as e:
+        print(f"Erro ao fazer upload de '{object_full_name}': {e}")
+        return None
+
+# S3 requires every part of a multipart upload, except the last one, to be at least 5 MiB
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter:
+    """
+    File-like writer that streams data to an S3 object through a multipart upload.
+
+    Data is buffered until a full part is available, so memory use is bounded by
+    `part_size` regardless of the total object size. S3 parts (except the last) must
+    have at least 5 MiB, so the multipart upload only starts once a full part is
+    buffered: objects smaller than one part fall back to a single `put_object` when
+    the writer is closed. Meant for outputs that can grow past that (exports).
+
+    Usage:
+        with S3MultipartWriter('exports/file.ndjson', 'application/x-ndjson') as writer:
+            writer.write(b'...')
+    """
+
+    def __init__(self, key, content_type='application/octet-stream', part_size=MULTIPART_MIN_PART_SIZE, bucket=None):
+        self.key = key
+        self.bucket = bucket or S3_BUCKET
+        self.content_type = content_type
+        self.part_size = max(part_size, MULTIPART_MIN_PART_SIZE)
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        if self._upload_id is None:
+            response = s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, ContentType=self.content_type)
+            self._upload_id = response['UploadId']
+
+        part_number = len(self._parts) + 1
+        response = s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+    def close(self):
+        """
+        Uploads the remaining buffer and completes the upload.
+
+        Returns:
+            str: The key of the object written to S3.
+        """
+        if self._upload_id is None:
+            s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), ContentType=self.content_type)
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': self._parts}
+            )
+        self._buffer = bytearray()
+        return self.key
+
+    def abort(self):
+        """Discards the parts already uploaded."""
+        if self._upload_id is not None:
+            s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+        self._buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
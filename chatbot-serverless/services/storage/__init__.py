@@ -0,0 +1,51 @@
+"""
+Storage backend selection.
+
+`STORAGE_BACKEND` picks the implementation of the repositories:
+  - dynamodb (default): the DynamoDB tables configured in serverless.yml;
+  - memory: process-local dicts, for local runs and load tests;
+  - sqlite: a SQLite database at `SQLITE_PATH` (default: in memory).
+
+The backend is created on first use and reused by the whole container.
+"""
+import os
+import threading
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'dynamodb').lower()
+
+_storage = None
+_lock = threading.Lock()
+
+
+def create_storage(name=None):
+    """Creates a new backend by name (default: STORAGE_BACKEND)."""
+    name = (name or STORAGE_BACKEND).lower()
+
+    if name == 'dynamodb':
+        from services.storage.dynamodb_backend import create_backend
+    elif name == 'memory':
+        from services.storage.memory_backend import create_backend
+    elif name == 'sqlite':
+        from services.storage.sqlite_backend import create_backend
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+
+    return create_backend()
+
+
+def get_storage():
+    """Returns the backend shared by the container, creating it on first use."""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage):
+    """Replaces the shared backend (a StorageBackend or a backend name); used by local tools."""
+    global _storage
+    with _lock:
+        _storage = create_storage(storage) if isinstance(storage, str) else storage
+    return _storage
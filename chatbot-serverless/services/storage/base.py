@@ -0,0 +1,182 @@
+"""
+Repository interfaces of the storage backends.
+
+The functions in `services/dynamo/*` (used by the intents and handlers) talk to
+these interfaces only, so the same intent logic runs against DynamoDB, an
+in-memory store or SQLite. Items are plain dicts in the same shape DynamoDB
+returns them, and every repository is keyed by the 'id' attribute.
+"""
+from abc import ABC, abstractmethod
+
+
+class PetRepository(ABC):
+
+    @abstractmethod
+    def list_all(self):
+        """Returns every pet (list of dicts)."""
+
+    @abstractmethod
+    def get(self, pet_id):
+        """Returns the pet with the given ID, or None."""
+
+    @abstractmethod
+    def find_by_name(self, name):
+        """Returns the pets with exactly this name (list of dicts)."""
+
+    @abstractmethod
+    def put(self, item):
+        """Creates or replaces a pet and returns the stored item."""
+
+    @abstractmethod
+    def batch_get(self, pet_ids, cache=None):
+        """
+        Returns id -> pet for the IDs found, reusing and filling the invocation `cache`.
+
+        Raises UnprocessedKeysError when some IDs could not be read (throttling).
+        """
+
+
+class UserRepository(ABC):
+
+    @abstractmethod
+    def get(self, user_id):
+        """Returns the user with the given ID, or None."""
+
+    @abstractmethod
+    def find_by_phone(self, phone):
+        """Returns the users registered with this (already formatted) phone (list of dicts)."""
+
+    @abstractmethod
+    def put(self, item):
+        """Creates or replaces a user and returns the stored item."""
+
+    @abstractmethod
+    def batch_get(self, user_ids, cache=None):
+        """
+        Returns id -> user for the IDs found, reusing and filling the invocation `cache`.
+
+        Raises UnprocessedKeysError when some IDs could not be read (throttling).
+        """
+
+
+class AdoptSolicitationRepository(ABC):
+
+    @abstractmethod
+    def put(self, item):
+        """Creates or replaces a solicitation and returns the stored item."""
+
+    @abstractmethod
+    def scan_page(self, limit=None, start_key=None):
+        """Returns (items, last_key) for one page; last_key is None on the last page."""
+
+    @abstractmethod
+    def scan_segment(self, segment, total_segments, page_size=None):
+        """Yields the pages of one segment of a parallel scan. Must be safe to call from worker threads."""
+
+    @abstractmethod
+    def batch_get(self, solicitation_ids, cache=None):
+        """
+        Returns id -> solicitation for the IDs found, reusing and filling the invocation `cache`.
+
+        Raises UnprocessedKeysError when some IDs could not be read (throttling).
+        """
+
+    @abstractmethod
+    def apply_transitions(self, transitions):
+        """
+        Moves solicitations between statuses, each one atomically with its pet's availability.
+
+        Every transition is a dict with 'id', 'from', 'to', 'updatedAt', optional
+        'reason' and, when the pet changes, 'petId' and 'disponivel'. It is applied
+        only if the solicitation is still in 'from' and, when it makes the pet
+        unavailable, the pet is still available; otherwise nothing of it is written.
+
+        Returns:
+            dict: id -> TRANSITION_APPLIED, TRANSITION_STATUS_CHANGED,
+                TRANSITION_PET_UNAVAILABLE or an error code.
+        """
+
+
+# outcomes of AdoptSolicitationRepository.apply_transitions
+TRANSITION_APPLIED = 'applied'
+TRANSITION_STATUS_CHANGED = 'status_changed'
+TRANSITION_PET_UNAVAILABLE = 'pet_unavailable'
+
+
+def transition_outcome(solicitation, pet, transition):
+    """Checks a transition against the current items; returns the failure outcome, or None if it applies."""
+    if solicitation is None or solicitation.get('status') != transition['from']:
+        return TRANSITION_STATUS_CHANGED
+    if 'disponivel' in transition:
+        if pet is None or (transition['disponivel'] is False and pet.get('disponivel', True) is False):
+            return TRANSITION_PET_UNAVAILABLE
+    return None
+
+
+def apply_transition(solicitation, pet, transition):
+    """Applies a checked transition to the items (in place)."""
+    solicitation['status'] = transition['to']
+    solicitation['dataAtualizacao'] = transition['updatedAt']
+    if transition.get('reason'):
+        solicitation['motivo'] = transition['reason']
+    if 'disponivel' in transition:
+        pet['disponivel'] = transition['disponivel']
+
+
+class ConflictError(Exception):
+    """A conditional write found the item changed since it was read."""
+
+
+class UnprocessedKeysError(Exception):
+    """
+    A batch read left keys unread after its retries (throttling).
+
+    `found` has the items that were read (id -> item) and `unprocessed` the IDs
+    that were not, so callers can tell "throttled" apart from "does not exist".
+    """
+
+    def __init__(self, found, unprocessed):
+        super().__init__(f"{len(unprocessed)} keys not read after retries")
+        self.found = found
+        self.unprocessed = unprocessed
+
+
+class LexSessionRepository(ABC):
+    """Sessions carry a `version`, incremented on every write (optimistic concurrency)."""
+
+    @abstractmethod
+    def get(self, user_id, consistent=False):
+        """Returns (session attributes, version) of the user; (None, 0) when there is no session."""
+
+    @abstractmethod
+    def put(self, user_id, session_attributes, expected_version=None):
+        """
+        Stores the session attributes and returns the new version.
+
+        With `expected_version` (0: no session yet) the write only happens if the
+        stored version is still that one, otherwise ConflictError is raised.
+        """
+
+
+class UserImageRepository(ABC):
+    """References from users to the images they sent; the id is '<user_id>#<sha256>'."""
+
+    @abstractmethod
+    def put(self, item):
+        """Creates or replaces a reference and returns the stored item."""
+
+    @abstractmethod
+    def find_by_user(self, user_id):
+        """Returns the references of the user (list of dicts)."""
+
+
+class StorageBackend:
+    """Groups the repositories of one backend."""
+
+    def __init__(self, name, pets, users, solicitations, sessions, images):
+        self.name = name
+        self.pets = pets
+        self.users = users
+        self.solicitations = solicitations
+        self.sessions = sessions
+        self.images = images
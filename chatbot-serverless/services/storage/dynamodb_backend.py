@@ -0,0 +1,237 @@
+import os
+
+from boto3.dynamodb.conditions import Key
+
+from services.storage.base import (
+    PetRepository, UserRepository, AdoptSolicitationRepository, LexSessionRepository, UserImageRepository,
+    StorageBackend, ConflictError, TRANSITION_APPLIED, TRANSITION_STATUS_CHANGED, TRANSITION_PET_UNAVAILABLE
+)
+from utils.client_utils import get_resource
+from utils.dynamo_utils import batch_get_items, transact_write_groups
+
+
+class DynamoTable:
+    """Binds the boto3 `Table` on first use instead of at import time."""
+
+    def __init__(self, table_env):
+        self.table_name = os.getenv(table_env)
+        self._table = None
+
+    @property
+    def dynamodb(self):
+        return get_resource('dynamodb')
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = self.dynamodb.Table(self.table_name)
+        return self._table
+
+
+class DynamoPetRepository(DynamoTable, PetRepository):
+
+    def __init__(self):
+        super().__init__('DYNAMODB_TABLE_PETS')
+
+    def list_all(self):
+        response = self.table.scan()
+        items = response.get('Items', [])
+        while 'LastEvaluatedKey' in response:
+            response = self.table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+            items.extend(response.get('Items', []))
+        return items
+
+    def get(self, pet_id):
+        return self.table.get_item(Key={'id': pet_id}).get('Item')
+
+    def find_by_name(self, name):
+        response = self.table.query(
+            IndexName='NameIndex',  # Usando índice secundário de nome
+            KeyConditionExpression=Key('nome').eq(name)
+        )
+        return response.get('Items', [])
+
+    def put(self, item):
+        self.table.put_item(Item=item)
+        return item
+
+    def batch_get(self, pet_ids, cache=None):
+        return batch_get_items(self.dynamodb, self.table_name, pet_ids, cache)
+
+
+class DynamoUserRepository(DynamoTable, UserRepository):
+
+    def __init__(self):
+        super().__init__('DYNAMODB_TABLE_USERS')
+
+    def get(self, user_id):
+        return self.table.get_item(Key={'id': user_id}).get('Item')
+
+    def find_by_phone(self, phone):
+        response = self.table.query(
+            IndexName='PhoneIndex',
+            KeyConditionExpression=Key('phone').eq(phone)
+        )
+        return response.get('Items', [])
+
+    def put(self, item):
+        self.table.put_item(Item=item)
+        return item
+
+    def batch_get(self, user_ids, cache=None):
+        return batch_get_items(self.dynamodb, self.table_name, user_ids, cache)
+
+
+class DynamoAdoptSolicitationRepository(DynamoTable, AdoptSolicitationRepository):
+
+    def __init__(self):
+        super().__init__('DYNAMODB_TABLE_REQUEST_ADOPT')
+        self.pets_table_name = os.getenv('DYNAMODB_TABLE_PETS')
+
+    def put(self, item):
+        self.table.put_item(Item=item)
+        return item
+
+    def batch_get(self, solicitation_ids, cache=None):
+        return batch_get_items(self.dynamodb, self.table_name, solicitation_ids, cache)
+
+    def _transition_actions(self, transition):
+        update = 'SET #status = :to, dataAtualizacao = :updatedAt'
+        values = {':to': transition['to'], ':from': transition['from'], ':updatedAt': transition['updatedAt']}
+        if transition.get('reason'):
+            update += ', motivo = :reason'
+            values[':reason'] = transition['reason']
+        actions = [{
+            'Update': {
+                'TableName': self.table_name,
+                'Key': {'id': transition['id']},
+                'UpdateExpression': update,
+                'ConditionExpression': '#status = :from',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': values,
+            }
+        }]
+
+        if 'disponivel' in transition:
+            condition = 'attribute_exists(id)'
+            values = {':disponivel': transition['disponivel']}
+            if transition['disponivel'] is False:
+                # pets without the flag count as available, like in the adoption list
+                condition += ' AND (attribute_not_exists(disponivel) OR disponivel = :true)'
+                values[':true'] = True
+            actions.append({
+                'Update': {
+                    'TableName': self.pets_table_name,
+                    'Key': {'id': transition['petId']},
+                    'UpdateExpression': 'SET disponivel = :disponivel',
+                    'ConditionExpression': condition,
+                    'ExpressionAttributeValues': values,
+                }
+            })
+        return actions
+
+    def apply_transitions(self, transitions):
+        groups = [(transition['id'], self._transition_actions(transition)) for transition in transitions]
+        outcomes = {}
+        # the solicitation update is action 0 of its group, the pet update action 1
+        for solicitation_id, failure in transact_write_groups(self.table.meta.client, groups).items():
+            if failure is None:
+                outcomes[solicitation_id] = TRANSITION_APPLIED
+            elif failure == (0, 'ConditionalCheckFailed'):
+                outcomes[solicitation_id] = TRANSITION_STATUS_CHANGED
+            elif failure == (1, 'ConditionalCheckFailed'):
+                outcomes[solicitation_id] = TRANSITION_PET_UNAVAILABLE
+            else:
+                outcomes[solicitation_id] = failure[1]
+        return outcomes
+
+    def scan_page(self, limit=None, start_key=None):
+        scan_kwargs = {}
+        if limit:
+            scan_kwargs['Limit'] = limit
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+
+        response = self.table.scan(**scan_kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    def scan_segment(self, segment, total_segments, page_size=None):
+        # the resource's client is thread-safe and already converts the DynamoDB types
+        client = self.table.meta.client
+        scan_kwargs = {
+            'TableName': self.table_name,
+            'Segment': segment,
+            'TotalSegments': total_segments,
+        }
+        if page_size:
+            scan_kwargs['Limit'] = page_size
+
+        while True:
+            response = client.scan(**scan_kwargs)
+            yield response.get('Items', [])
+
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+class DynamoLexSessionRepository(DynamoTable, LexSessionRepository):
+
+    def __init__(self):
+        super().__init__('DYNAMODB_TABLE_LEX_SESSIONS')
+
+    def get(self, user_id, consistent=False):
+        item = self.table.get_item(Key={'id': user_id}, ConsistentRead=consistent).get('Item')
+        if not item:
+            return None, 0
+        return item.get('sessionAttributes', {}), int(item.get('version', 0))
+
+    def put(self, user_id, session_attributes, expected_version=None):
+        values = {':attributes': session_attributes, ':one': 1}
+        kwargs = {}
+        # sessions written before versioning have no version attribute and count as 0
+        if expected_version == 0:
+            kwargs['ConditionExpression'] = 'attribute_not_exists(#version)'
+        elif expected_version is not None:
+            kwargs['ConditionExpression'] = '#version = :expected'
+            values[':expected'] = expected_version
+        try:
+            response = self.table.update_item(
+                Key={'id': user_id},
+                UpdateExpression='SET sessionAttributes = :attributes ADD #version :one',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues=values,
+                ReturnValues='UPDATED_NEW',
+                **kwargs
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            raise ConflictError(f"Session of {user_id} changed since version {expected_version}")
+        return int(response['Attributes']['version'])
+
+
+class DynamoUserImageRepository(DynamoTable, UserImageRepository):
+
+    def __init__(self):
+        super().__init__('DYNAMODB_TABLE_USER_IMAGES')
+
+    def put(self, item):
+        self.table.put_item(Item=item)
+        return item
+
+    def find_by_user(self, user_id):
+        response = self.table.query(
+            IndexName='UserIndex',
+            KeyConditionExpression=Key('userId').eq(user_id)
+        )
+        return response.get('Items', [])
+
+
+def create_backend():
+    return StorageBackend(
+        'dynamodb',
+        pets=DynamoPetRepository(),
+        users=DynamoUserRepository(),
+        solicitations=DynamoAdoptSolicitationRepository(),
+        sessions=DynamoLexSessionRepository(),
+        images=DynamoUserImageRepository(),
+    )
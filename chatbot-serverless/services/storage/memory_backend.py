@@ -0,0 +1,170 @@
+"""
+In-memory storage backend.
+
+Keeps every table in process memory, so the intent logic can run (and be load
+tested) without AWS. Items are deep-copied on the way in and out to behave like
+a real store: callers never share mutable state with the backend.
+"""
+import bisect
+import copy
+import threading
+import zlib
+
+from services.storage.base import (
+    PetRepository, UserRepository, AdoptSolicitationRepository, LexSessionRepository, UserImageRepository,
+    StorageBackend, ConflictError, TRANSITION_APPLIED, transition_outcome, apply_transition
+)
+
+
+class MemoryTable:
+
+    def __init__(self):
+        self.items = {}
+        self.lock = threading.RLock()
+
+    def _get(self, item_id):
+        with self.lock:
+            item = self.items.get(item_id)
+            return copy.deepcopy(item) if item is not None else None
+
+    def _put(self, item):
+        with self.lock:
+            self.items[item['id']] = copy.deepcopy(item)
+        return item
+
+    def _filter(self, predicate):
+        with self.lock:
+            return [copy.deepcopy(item) for item in self.items.values() if predicate(item)]
+
+    def _batch_get(self, ids, cache=None):
+        cache = {} if cache is None else cache
+        found = {}
+        for item_id in dict.fromkeys(i for i in ids if i):
+            key = (id(self), item_id)
+            if key not in cache:
+                item = self._get(item_id)
+                if item is None:
+                    continue
+                cache[key] = item
+            found[item_id] = cache[key]
+        return found
+
+    def _page(self, limit=None, start_key=None):
+        # pages follow the id order and resume after the cursor value, so a cursor
+        # item deleted between pages neither restarts nor cuts the scan
+        with self.lock:
+            ids = sorted(self.items)
+            start = bisect.bisect_right(ids, start_key['id']) if start_key else 0
+            end = start + limit if limit else len(ids)
+            page = [copy.deepcopy(self.items[item_id]) for item_id in ids[start:end]]
+            last_key = {'id': ids[end - 1]} if end < len(ids) else None
+        return page, last_key
+
+
+class MemoryPetRepository(MemoryTable, PetRepository):
+
+    def list_all(self):
+        return self._filter(lambda item: True)
+
+    def get(self, pet_id):
+        return self._get(pet_id)
+
+    def find_by_name(self, name):
+        return self._filter(lambda item: item.get('nome') == name)
+
+    def put(self, item):
+        return self._put(item)
+
+    def batch_get(self, pet_ids, cache=None):
+        return self._batch_get(pet_ids, cache)
+
+
+class MemoryUserRepository(MemoryTable, UserRepository):
+
+    def get(self, user_id):
+        return self._get(user_id)
+
+    def find_by_phone(self, phone):
+        return self._filter(lambda item: item.get('phone') == phone)
+
+    def put(self, item):
+        return self._put(item)
+
+    def batch_get(self, user_ids, cache=None):
+        return self._batch_get(user_ids, cache)
+
+
+class MemoryAdoptSolicitationRepository(MemoryTable, AdoptSolicitationRepository):
+
+    def __init__(self, pets):
+        super().__init__()
+        self.pets = pets
+
+    def put(self, item):
+        return self._put(item)
+
+    def batch_get(self, solicitation_ids, cache=None):
+        return self._batch_get(solicitation_ids, cache)
+
+    def apply_transitions(self, transitions):
+        outcomes = {}
+        for transition in transitions:
+            # both tables locked: the solicitation and its pet change together
+            with self.lock, self.pets.lock:
+                solicitation = self.items.get(transition['id'])
+                pet = self.pets.items.get(transition.get('petId'))
+                outcome = transition_outcome(solicitation, pet, transition)
+                if outcome is None:
+                    apply_transition(solicitation, pet, transition)
+                    outcome = TRANSITION_APPLIED
+            outcomes[transition['id']] = outcome
+        return outcomes
+
+    def scan_page(self, limit=None, start_key=None):
+        return self._page(limit, start_key)
+
+    def scan_segment(self, segment, total_segments, page_size=None):
+        items = self._filter(lambda item: zlib.crc32(item['id'].encode()) % total_segments == segment)
+        page_size = page_size or len(items) or 1
+        for start in range(0, len(items), page_size):
+            yield items[start:start + page_size]
+        if not items:
+            yield []
+
+
+class MemoryLexSessionRepository(MemoryTable, LexSessionRepository):
+
+    def get(self, user_id, consistent=False):
+        item = self._get(user_id)
+        if not item:
+            return None, 0
+        return item.get('sessionAttributes', {}), int(item.get('version', 0))
+
+    def put(self, user_id, session_attributes, expected_version=None):
+        with self.lock:
+            _, version = self.get(user_id)
+            if expected_version is not None and version != expected_version:
+                raise ConflictError(f"Session of {user_id} changed since version {expected_version}")
+            self._put({'id': user_id, 'sessionAttributes': session_attributes, 'version': version + 1})
+        return version + 1
+
+
+class MemoryUserImageRepository(MemoryTable, UserImageRepository):
+
+    def put(self, item):
+        return self._put(item)
+
+    def find_by_user(self, user_id):
+        return self._filter(lambda item: item.get('userId') == user_id)
+
+
+def create_backend():
+    pets = MemoryPetRepository()
+    return StorageBackend(
+        'memory',
+        pets=pets,
+        users=MemoryUserRepository(),
+        solicitations=MemoryAdoptSolicitationRepository(pets),
+        sessions=MemoryLexSessionRepository(),
+        images=MemoryUserImageRepository(),
+    )
@@ -0,0 +1,267 @@
+"""
+SQLite storage backend.
+
+Each table stores the item as JSON next to the columns used by the lookups
+(pet name, user phone, image owner), which are indexed like the DynamoDB GSIs. Numbers are
+read back as Decimal, as DynamoDB returns them. The database path comes from
+`SQLITE_PATH` (default: a private in-memory database).
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from decimal import Decimal
+
+from services.storage.base import (
+    PetRepository, UserRepository, AdoptSolicitationRepository, LexSessionRepository, UserImageRepository,
+    StorageBackend, ConflictError, TRANSITION_APPLIED, transition_outcome, apply_transition
+)
+
+SQLITE_PATH = os.getenv('SQLITE_PATH', ':memory:')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pets (id TEXT PRIMARY KEY, nome TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS pets_nome ON pets (nome);
+CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, phone TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS users_phone ON users (phone);
+CREATE TABLE IF NOT EXISTS adopt_solicitations (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS lex_sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS user_images (id TEXT PRIMARY KEY, userId TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS user_images_user ON user_images (userId);
+"""
+
+
+def _encode_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode(item):
+    return json.dumps(item, ensure_ascii=False, default=_encode_default)
+
+
+def _decode(data):
+    return json.loads(data, parse_float=Decimal, parse_int=Decimal)
+
+
+class SQLiteDatabase:
+    """One connection shared by the repositories, serialized by a lock."""
+
+    def __init__(self, path=SQLITE_PATH):
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.RLock()
+
+    def fetch(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            self.connection.execute(sql, params)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Runs the statements of the block in one SQLite transaction."""
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+
+class SQLiteTable:
+    table_name = None
+    index_column = None
+
+    def __init__(self, database):
+        self.db = database
+
+    def _get(self, item_id):
+        rows = self.db.fetch(f"SELECT data FROM {self.table_name} WHERE id = ?", (item_id,))
+        return _decode(rows[0][0]) if rows else None
+
+    def _put(self, item):
+        if self.index_column:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {self.table_name} (id, {self.index_column}, data) VALUES (?, ?, ?)",
+                (item['id'], item.get(self.index_column), _encode(item))
+            )
+        else:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO {self.table_name} (id, data) VALUES (?, ?)",
+                (item['id'], _encode(item))
+            )
+        return item
+
+    def _find(self, value):
+        rows = self.db.fetch(f"SELECT data FROM {self.table_name} WHERE {self.index_column} = ?", (value,))
+        return [_decode(row[0]) for row in rows]
+
+    def _all(self):
+        return [_decode(row[0]) for row in self.db.fetch(f"SELECT data FROM {self.table_name} ORDER BY rowid")]
+
+    def _batch_get(self, ids, cache=None):
+        cache = {} if cache is None else cache
+        found = {}
+        missing = []
+        for item_id in dict.fromkeys(i for i in ids if i):
+            key = (self.table_name, item_id)
+            if key in cache:
+                found[item_id] = cache[key]
+            else:
+                missing.append(item_id)
+
+        if missing:
+            placeholders = ', '.join('?' * len(missing))
+            rows = self.db.fetch(f"SELECT data FROM {self.table_name} WHERE id IN ({placeholders})", missing)
+            for row in rows:
+                item = _decode(row[0])
+                cache[(self.table_name, item['id'])] = item
+                found[item['id']] = item
+        return found
+
+
+class SQLitePetRepository(SQLiteTable, PetRepository):
+    table_name = 'pets'
+    index_column = 'nome'
+
+    def list_all(self):
+        return self._all()
+
+    def get(self, pet_id):
+        return self._get(pet_id)
+
+    def find_by_name(self, name):
+        return self._find(name)
+
+    def put(self, item):
+        return self._put(item)
+
+    def batch_get(self, pet_ids, cache=None):
+        return self._batch_get(pet_ids, cache)
+
+
+class SQLiteUserRepository(SQLiteTable, UserRepository):
+    table_name = 'users'
+    index_column = 'phone'
+
+    def get(self, user_id):
+        return self._get(user_id)
+
+    def find_by_phone(self, phone):
+        return self._find(phone)
+
+    def put(self, item):
+        return self._put(item)
+
+    def batch_get(self, user_ids, cache=None):
+        return self._batch_get(user_ids, cache)
+
+
+class SQLiteAdoptSolicitationRepository(SQLiteTable, AdoptSolicitationRepository):
+    table_name = 'adopt_solicitations'
+
+    def __init__(self, database, pets):
+        super().__init__(database)
+        self.pets = pets
+
+    def put(self, item):
+        return self._put(item)
+
+    def batch_get(self, solicitation_ids, cache=None):
+        return self._batch_get(solicitation_ids, cache)
+
+    def apply_transitions(self, transitions):
+        outcomes = {}
+        for transition in transitions:
+            with self.db.transaction():
+                solicitation = self._get(transition['id'])
+                pet = self.pets.get(transition['petId']) if 'petId' in transition else None
+                outcome = transition_outcome(solicitation, pet, transition)
+                if outcome is None:
+                    apply_transition(solicitation, pet, transition)
+                    self._put(solicitation)
+                    if pet is not None:
+                        self.pets.put(pet)
+                    outcome = TRANSITION_APPLIED
+            outcomes[transition['id']] = outcome
+        return outcomes
+
+    def scan_page(self, limit=None, start_key=None):
+        params = []
+        # pages follow the primary key and resume after the cursor value (not its rowid):
+        # a cursor item deleted or replaced between pages keeps the scan going
+        sql = f"SELECT id, data FROM {self.table_name}"
+        if start_key:
+            sql += " WHERE id > ?"
+            params.append(start_key['id'])
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit + 1)  # one extra row tells whether there is a next page
+
+        rows = self.db.fetch(sql, params)
+        has_more = bool(limit) and len(rows) > limit
+        rows = rows[:limit] if limit else rows
+        last_key = {'id': rows[-1][0]} if has_more else None
+        return [_decode(row[1]) for row in rows], last_key
+
+    def scan_segment(self, segment, total_segments, page_size=None):
+        items = [item for item in self._all() if zlib.crc32(item['id'].encode()) % total_segments == segment]
+        page_size = page_size or len(items) or 1
+        for start in range(0, len(items), page_size):
+            yield items[start:start + page_size]
+        if not items:
+            yield []
+
+
+class SQLiteLexSessionRepository(SQLiteTable, LexSessionRepository):
+    table_name = 'lex_sessions'
+
+    def get(self, user_id, consistent=False):
+        item = self._get(user_id)
+        if not item:
+            return None, 0
+        return item.get('sessionAttributes', {}), int(item.get('version', 0))
+
+    def put(self, user_id, session_attributes, expected_version=None):
+        with self.db.lock:
+            _, version = self.get(user_id)
+            if expected_version is not None and version != expected_version:
+                raise ConflictError(f"Session of {user_id} changed since version {expected_version}")
+            self._put({'id': user_id, 'sessionAttributes': session_attributes, 'version': version + 1})
+        return version + 1
+
+
+class SQLiteUserImageRepository(SQLiteTable, UserImageRepository):
+    table_name = 'user_images'
+    index_column = 'userId'
+
+    def put(self, item):
+        return self._put(item)
+
+    def find_by_user(self, user_id):
+        return self._find(user_id)
+
+
+def create_backend(path=SQLITE_PATH):
+    database = SQLiteDatabase(path)
+    pets = SQLitePetRepository(database)
+    return StorageBackend(
+        'sqlite',
+        pets=pets,
+        users=SQLiteUserRepository(database),
+        solicitations=SQLiteAdoptSolicitationRepository(database, pets),
+        sessions=SQLiteLexSessionRepository(database),
+        images=SQLiteUserImageRepository(database),
+    )
@@ -0,0 +1,161 @@
+"""
+Warmup plans of the Lambda entry points (see utils.warmup_utils).
+
+Each plan lists what the first real request of the function would pay for in a
+new container: the modules it imports, the boto3 clients and resources it
+creates (the pooled Twilio session included), and the data it loads (the
+DynamoDB tables, the pet catalog and its search index, the manifest of the
+static phrases' audio). A warmup invocation does all of it, so the next request
+finds the container ready.
+"""
+import importlib
+
+from utils.warmup_utils import run_steps
+
+# intent modules that declare STATIC_AUDIO_PHRASES
+STATIC_PHRASE_MODULES = ('intents.adotarPet', 'intents.doacaoOng')
+
+WARMUP_PLANS = {
+    'lex_handler': {
+        'modules': ('services.lex_service',),
+        'clients': ('s3', 'polly'),
+        'resources': ('dynamodb',),
+        'steps': ('storage', 'pet_catalog', 'pet_search', 'static_audio'),
+    },
+    'webhook_handler': {
+        # image turns also need S3, Rekognition and the image preprocessing
+        'modules': ('services.webhook_service', 'services.s3_service', 'services.rekogntion_service',
+                    'services.dynamo.user_images', 'utils.image_utils'),
+        'clients': ('lexv2-runtime', 's3', 'rekognition'),
+        'resources': ('dynamodb',),
+        'steps': ('storage', 'twilio_session'),
+    },
+    'polly_handler': {
+        'modules': ('services.polly_service',),
+        'clients': ('polly', 's3'),
+        'steps': ('static_audio',),
+    },
+    'apiGetPets': {
+        'modules': ('services.dynamo.pets', 'services.s3_service'),
+        'clients': ('s3',),
+        'resources': ('dynamodb',),
+        'steps': ('storage', 'pet_catalog'),
+    },
+    'apiSearchPets': {
+        'modules': ('services.pet_search_service',),
+        'resources': ('dynamodb',),
+        'steps': ('storage', 'pet_search'),
+    },
+    'apiPostPets': {
+        'modules': ('services.dynamo.pets',),
+        'resources': ('dynamodb',),
+        'steps': ('storage',),
+    },
+    'apiGetAdoptSolicitations': {
+        'modules': ('services.dynamo.adopt_solicitations', 'utils.dynamo_utils'),
+        'resources': ('dynamodb',),
+        'steps': ('storage',),
+    },
+    'apiTransitionAdoptSolicitations': {
+        'modules': ('services.dynamo.adopt_solicitations', 'utils.dynamo_utils'),
+        'resources': ('dynamodb',),
+        'steps': ('storage',),
+    },
+    'apiExportAdoptSolicitations': {
+        'modules': ('services.export_service', 'services.s3_service'),
+        'clients': ('s3',),
+        'resources': ('dynamodb',),
+        'steps': ('storage',),
+    },
+    'apiDetectPet': {
+        'modules': ('services.rekogntion_service',),
+        'clients': ('rekognition', 's3'),
+    },
+}
+
+
+def import_modules(modules):
+    for module in modules:
+        importlib.import_module(module)
+
+
+def create_clients(clients, resources):
+    from utils.client_utils import get_client, get_resource
+
+    for service in clients:
+        get_client(service)
+    for service in resources:
+        get_resource(service)
+
+
+def bind_storage():
+    """Creates the storage backend and binds its DynamoDB tables (loads the resource models)."""
+    from services.storage import get_storage
+
+    storage = get_storage()
+    for repository in (storage.pets, storage.users, storage.solicitations, storage.sessions, storage.images):
+        getattr(repository, 'table', None)
+    return storage.name
+
+
+def create_twilio_session():
+    """Creates the pooled session of the media downloads (imports requests); returns its pool size."""
+    from utils.client_utils import get_twilio_session, TWILIO_POOL_SIZE
+
+    get_twilio_session()
+    return TWILIO_POOL_SIZE
+
+
+def prefetch_pet_catalog():
+    """Scans the pets into the catalog cache of services.dynamo.pets; returns how many."""
+    from services.dynamo.pets import get_pets
+
+    return len(get_pets() or [])
+
+
+def build_pet_search_index():
+    """Builds the search index of services.pet_search_service; returns how many pets it holds."""
+    from services.pet_search_service import get_index
+
+    return len(get_index())
+
+
+def get_static_phrases():
+    phrases = []
+    for module in STATIC_PHRASE_MODULES:
+        phrases.extend(getattr(importlib.import_module(module), 'STATIC_AUDIO_PHRASES', ()))
+    return phrases
+
+
+def prepare_static_audio():
+    from services.polly_service import prepare_static_audio as prepare
+
+    return prepare(get_static_phrases())
+
+
+STEPS = {
+    'storage': bind_storage,
+    'pet_catalog': prefetch_pet_catalog,
+    'pet_search': build_pet_search_index,
+    'static_audio': prepare_static_audio,
+    'twilio_session': create_twilio_session,
+}
+
+
+def warmup(function_name):
+    """
+    Runs the warmup plan of a function.
+
+    Args:
+        function_name (str): Name of the entry point in handler.py.
+
+    Returns:
+        dict: The report of utils.warmup_utils.run_steps.
+    """
+    plan = WARMUP_PLANS.get(function_name, {})
+    steps = [
+        ('imports', lambda: import_modules(plan.get('modules', ()))),
+        ('clients', lambda: create_clients(plan.get('clients', ()), plan.get('resources', ()))),
+    ]
+    steps += [(name, STEPS[name]) for name in plan.get('steps', ())]
+    return run_steps(steps)
@@ -1,34 +1,54 @@
-import boto3
 import os
-import json
 import logging
 import time
-from urllib.parse import parse_qs, urlencode
-from twilio.twiml.messaging_response import MessagingResponse
-from services.dynamo.lex_sessions import get_session, save_session
+from services.dynamo.lex_sessions import get_session, save_session_changes
+from services.dynamo.user import get_user_by_phone, user_session_attributes
 from utils.webhook_utils import process_request_media
+from utils.json_utils import dumps
+from utils.twiml_utils import render_lex_messages, render_twiml
+from utils.client_utils import get_client
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limiter import check_webhook_limits
+from utils.twilio_utils import WebhookRejected, parse_webhook_request
+from utils.metrics_utils import emit_metrics
+from utils.phone_utils import to_e164
 
 # log config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
 # lex v2 client
-lex_v2_client = boto3.client('lexv2-runtime')
+lex_v2_client = get_client('lexv2-runtime')
 
 # Config vars lex v2
 BOT_ID = os.getenv('BOT_ID')
 BOT_ALIAS_ID = os.getenv('BOT_ALIAS_ID')
 LOCALE_ID = 'pt_BR'
 
+# reply sent while the Lex circuit breaker is open
+LEX_UNAVAILABLE_MESSAGE = "Estamos com instabilidade no momento. Por favor, tente novamente em alguns minutos."
+
+# canned replies of the rate limits (utils.rate_limiter), sent without calling S3, Rekognition or Lex
+RATE_LIMITED_MESSAGES = {
+    'user-messages': "Você enviou muitas mensagens em pouco tempo. Aguarde um instante e tente novamente.",
+    'user-images': "Você enviou muitas imagens em pouco tempo. Tente novamente mais tarde.",
+}
+RATE_LIMITED_DEFAULT_MESSAGE = "Estamos recebendo muitas mensagens no momento. Por favor, tente novamente em alguns minutos."
+
+def twiml_response(twiml):
+    return {
+        "statusCode": 200,
+        "headers": {
+            "Content-Type": "text/xml"  # Especificar que a resposta é em XML
+        },
+        "body": twiml
+    }
+
 def webhook_service(event, context):
     """Handler principal do webhook."""
     try:
-        body = event.get('body', '')
-        if isinstance(body, (bytes, bytearray)):
-            body = body.decode('utf-8')  # decode the request body
-
-        # decode to application/x-www-form-urlencoded format
-        params = parse_qs(body)
+        # size, required fields and Twilio signature, checked before any AWS call
+        params = parse_webhook_request(event)
 
         user_msg = params.get('Body', [''])[0]  # user's message
         user_id = params.get('From', [''])[0]   # user's phone number
@@ -37,22 +57,39 @@ def webhook_service(event, context):
         if not user_id:
             return {
                 "statusCode": 400,
-                "body": json.dumps({"message": "Entrada inválida: falta Body ou From"})
+                "body": dumps({"message": "Entrada inválida: falta Body ou From"})
             }
 
-        user_id = user_id.replace('whatsapp:+', '')  # remove the prefix from the phone number
+        # sender in E.164 ('whatsapp:+5511...' -> '+5511...'); the digits are the user/session id
+        phone = to_e164(user_id)
+        user_id = phone[1:] if phone else user_id.replace('whatsapp:+', '')
+
+        # over-limit messages get a canned reply before any downstream call
+        exceeded_limit = check_webhook_limits(user_id, mediaType.startswith('image/'))
+        if exceeded_limit:
+            logger.warning(f"Limite '{exceeded_limit}' excedido pelo usuário {user_id}")
+            return twiml_response(render_twiml([
+                ('text', RATE_LIMITED_MESSAGES.get(exceeded_limit, RATE_LIMITED_DEFAULT_MESSAGE))
+            ]))
+
         print(f"Requisição decodificada {params}")
-        request_msg_processed = process_request_media(mediaType, mediaUrl, user_msg)
+        request_msg_processed = process_request_media(mediaType, mediaUrl, user_msg, user_id)
         print (f"Request Processed: {request_msg_processed}")
 
         
 
 
-        # get session from DynamoDB
-        session_attributes = get_session(user_id)
-        if not session_attributes:
-            session_attributes = {}
+        # get session (from the container cache when this container served the previous turn)
+        session_attributes, session_version = get_session(user_id)
         print("Session Attributes: ", session_attributes)
+
+        # a registered sender is identified before Lex, so the bot does not ask for the phone
+        turn_attributes = session_attributes
+        if phone and not session_attributes.get('userId'):
+            user = get_user_by_phone(phone)
+            if user:
+                logger.info(f"Usuário {user.get('id')} identificado pelo número do remetente")
+                turn_attributes = {**session_attributes, **user_session_attributes(user)}
         print("Antes do Lex")
         # using Lex V2 to recognize the text
         resposta_lex = lex_v2_client.recognize_text(
@@ -62,7 +99,7 @@ def webhook_service(event, context):
             sessionId=user_id,
             text=request_msg_processed,
             sessionState={
-                'sessionAttributes': session_attributes
+                'sessionAttributes': turn_attributes
             }
         )
 
@@ -70,51 +107,34 @@ def webhook_service(event, context):
         session_updated = resposta_lex.get('sessionState', {})
         new_session_attributes = session_updated.get('sessionAttributes', {})
 
-        # save session at dynamo
-        save_session(user_id, new_session_attributes)
+        # save session at dynamo; if another message of the user saved it meanwhile,
+        # only the attributes this turn changed are applied over that session
+        save_session_changes(user_id, session_attributes, new_session_attributes, session_version)
 
         # extract messages from Lex response
         bot_msg = resposta_lex.get('messages', [])
 
-        twilio_response = MessagingResponse()
-
-        for msg in bot_msg:
-            if 'content' in msg:
-                content = msg['content']
-                try:
-                    # convert the content to a dictionary
-                    content_dict = json.loads(content)
-                    if 'image' in content_dict:
-                        print(f"Imagem: {content_dict['image']}")
-                        twilio_response.message().media(content_dict['image'])
-                    if 'audio' in content_dict:
-                        print(f"Audio: {content_dict['audio']}")
-                        twilio_response.message().media(content_dict['audio'])
-                    if 'text' in content_dict:
-                        print(f"Texto: {content_dict['text']}")
-                        twilio_response.message(content_dict['text'])
-                    
-                except (json.JSONDecodeError, TypeError):
-                    # Se a conversão falhar, tratar como string
-                    print(f"Texto: {content}")
-                    twilio_response.message(content)
-
-            
-
-        print(f"Resposta TwiML: {twilio_response}")
+        # render the TwiML reply (image/audio payloads become media messages)
+        twiml = render_lex_messages(bot_msg)
+
+        print(f"Resposta TwiML: {twiml}")
         
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Content-Type": "text/xml"  # Especificar que a resposta é em XML
-            },
-            "body": str(twilio_response)  # Converter a resposta TwiML para string
-        }
+        return twiml_response(twiml)
         
 
+    except WebhookRejected as e:
+        logger.warning(f"Requisição rejeitada: {e.reason}")
+        emit_metrics({'WebhookRejected': 1}, {'Reason': e.reason})
+        return {
+            "statusCode": e.status_code,
+            "body": dumps({"message": f"Requisição rejeitada: {e.reason}"})
+        }
+    except CircuitOpenError as e:
+        logger.warning(f"Dependência indisponível: {str(e)}")
+        return twiml_response(render_twiml([('text', LEX_UNAVAILABLE_MESSAGE)]))
     except Exception as e:
         logger.error(f"Erro ao processar a requisição: {str(e)}")
         return {
             "statusCode": 500,
-            "body": json.dumps({"message": f"Erro interno no servidor: {str(e)}"})
+            "body": dumps({"message": f"Erro interno no servidor: {str(e)}"})
         }
\ No newline at end of file
@@ -0,0 +1,58 @@
+import pytest
+
+from services.dynamo import adopt_solicitations
+from services.storage import set_storage
+from services.storage.base import UnprocessedKeysError
+
+
+@pytest.fixture
+def storage():
+    storage = set_storage('memory')
+    storage.pets.put({'id': 'p1', 'nome': 'Rex', 'disponivel': True})
+    storage.users.put({'id': 'u1', 'name': 'Ana', 'phone': '+5511987654321'})
+    for solicitation_id in ('s1', 's2'):
+        storage.solicitations.put({'id': solicitation_id, 'status': 'Pendente', 'petId': 'p1', 'userId': 'u1'})
+    return storage
+
+
+def test_throttled_reads_are_not_reported_as_not_found(storage, monkeypatch):
+    batch_get = storage.solicitations.batch_get
+
+    def throttled_batch_get(ids, cache=None):
+        found = batch_get(ids, cache)
+        raise UnprocessedKeysError({'s1': found['s1']}, ['s2'])
+
+    monkeypatch.setattr(storage.solicitations, 'batch_get', throttled_batch_get)
+
+    results = adopt_solicitations.transition_adopt_solicitations(
+        [{'id': 's1', 'status': 'Rejeitada'}, {'id': 's2', 'status': 'Rejeitada'}, {'id': 's3', 'status': 'Rejeitada'}]
+    )
+
+    assert [result['outcome'] for result in results] == ['applied', 'throttled', 'not_found']
+
+
+def test_hydration_fails_instead_of_serving_stale_projections(storage, monkeypatch):
+    def throttled_batch_get(ids, cache=None):
+        raise UnprocessedKeysError({}, list(ids))
+
+    monkeypatch.setattr(storage.users, 'batch_get', throttled_batch_get)
+
+    with pytest.raises(UnprocessedKeysError):
+        adopt_solicitations.get_adopt_solicitations_page(limit=10)
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_scan_continues_after_the_cursor_item_is_deleted(backend):
+    storage = set_storage(backend)
+    for solicitation_id in ('s1', 's2', 's3', 's4', 's5'):
+        storage.solicitations.put({'id': solicitation_id, 'status': 'Pendente'})
+
+    first, last_key = storage.solicitations.scan_page(limit=2)
+    if backend == 'memory':
+        del storage.solicitations.items[last_key['id']]
+    else:
+        storage.solicitations.db.execute("DELETE FROM adopt_solicitations WHERE id = ?", (last_key['id'],))
+    rest, last_key = storage.solicitations.scan_page(limit=10, start_key=last_key)
+
+    assert [item['id'] for item in first + rest] == ['s1', 's2', 's3', 's4', 's5']
+    assert last_key is None
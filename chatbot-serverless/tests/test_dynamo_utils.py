@@ -0,0 +1,149 @@
+import pytest
+
+from utils import dynamo_utils
+from utils.dynamo_utils import plan_transaction_chunks, transact_write_groups
+
+
+def update(table, item_id):
+    return {'Update': {'TableName': table, 'Key': {'id': item_id}, 'UpdateExpression': 'SET x = :x'}}
+
+
+def transition(solicitation_id, pet_id):
+    return solicitation_id, [update('adopt', solicitation_id), update('pets', pet_id)]
+
+
+def keys(levels):
+    return [[[key for key, _ in chunk] for chunk in chunks] for chunks in levels]
+
+
+def test_independent_groups_share_one_transaction():
+    levels = plan_transaction_chunks([transition('s1', 'p1'), transition('s2', 'p2'), transition('s3', 'p3')])
+
+    assert keys(levels) == [[['s1', 's2', 's3']]]
+
+
+def test_groups_on_the_same_pet_run_in_request_order():
+    groups = [transition('s1', 'p1'), transition('s2', 'p2'), transition('s3', 'p1'), transition('s4', 'p1')]
+
+    levels = plan_transaction_chunks(groups)
+
+    assert keys(levels) == [[['s1', 's2']], [['s3']], [['s4']]]
+
+
+def test_full_transactions_split_into_parallel_chunks():
+    groups = [transition(f's{i}', f'p{i}') for i in range(5)]
+
+    levels = plan_transaction_chunks(groups, max_actions=4)
+
+    # sem itens em comum, as transações ficam no mesmo nível
+    assert keys(levels) == [[['s0', 's1'], ['s2', 's3'], ['s4']]]
+
+
+def test_later_group_fills_earlier_chunk_when_it_shares_no_item():
+    groups = [transition('s1', 'p1'), transition('s2', 'p1'), transition('s3', 'p3')]
+
+    levels = plan_transaction_chunks(groups, max_actions=4)
+
+    assert keys(levels) == [[['s1', 's3']], [['s2']]]
+
+
+class TransactionCanceledException(Exception):
+
+    def __init__(self, codes):
+        super().__init__('Transaction cancelled')
+        self.response = {
+            'Error': {'Code': 'TransactionCanceledException'},
+            'CancellationReasons': [{'Code': code} for code in codes],
+        }
+
+
+class FakeClient:
+    """Cancela cada chamada com os códigos da fila, um por ação enviada."""
+
+    class exceptions:
+        TransactionCanceledException = TransactionCanceledException
+
+        class TransactionInProgressException(Exception):
+            pass
+
+        class ProvisionedThroughputExceededException(Exception):
+            pass
+
+    def __init__(self, *cancellations):
+        self.cancellations = list(cancellations)
+        self.calls = []
+
+    def transact_write_items(self, TransactItems, ClientRequestToken):
+        self.calls.append([action['Update']['Key']['id'] for action in TransactItems])
+        if self.cancellations:
+            codes = self.cancellations.pop(0)
+            assert len(codes) == len(TransactItems)
+            raise TransactionCanceledException(codes)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(dynamo_utils.time, 'sleep', lambda seconds: None)
+
+
+def test_cancellation_reasons_map_to_the_failing_group_and_action():
+    client = FakeClient(['None', 'None', 'ConditionalCheckFailed', 'None', 'None', 'ConditionalCheckFailed'])
+
+    outcomes = transact_write_groups(client, [transition('s1', 'p1'), transition('s2', 'p2'), transition('s3', 'p3')])
+
+    assert outcomes == {'s1': None, 's2': (0, 'ConditionalCheckFailed'), 's3': (1, 'ConditionalCheckFailed')}
+    # os grupos que falharam não são reenviados
+    assert client.calls == [['s1', 'p1', 's2', 'p2', 's3', 'p3'], ['s1', 'p1']]
+
+
+def test_conflicts_are_retried_with_the_whole_transaction():
+    client = FakeClient(['TransactionConflict', 'None', 'None', 'None'])
+
+    outcomes = transact_write_groups(client, [transition('s1', 'p1'), transition('s2', 'p2')])
+
+    assert outcomes == {'s1': None, 's2': None}
+    assert len(client.calls) == 2
+
+
+def test_groups_still_conflicting_after_all_attempts_are_reported():
+    client = FakeClient(*[['TransactionConflict', 'None']] * dynamo_utils.TRANSACT_MAX_ATTEMPTS)
+
+    outcomes = transact_write_groups(client, [transition('s1', 'p1')])
+
+    assert outcomes == {'s1': (None, 'TransactionConflict')}
+
+
+class ThrottlingDynamoDB:
+    """Devolve sempre as chaves de `throttled` como UnprocessedKeys."""
+
+    def __init__(self, items, throttled):
+        self.items = items
+        self.throttled = throttled
+        self.calls = 0
+
+    def batch_get_item(self, RequestItems):
+        self.calls += 1
+        (table, request), = RequestItems.items()
+        ids = [key['id'] for key in request['Keys']]
+        response = {'Responses': {table: [self.items[i] for i in ids if i in self.items and i not in self.throttled]}}
+        unprocessed = [{'id': i} for i in ids if i in self.throttled]
+        if unprocessed:
+            response['UnprocessedKeys'] = {table: {'Keys': unprocessed}}
+        return response
+
+
+def test_batch_get_reports_keys_left_unprocessed():
+    dynamodb = ThrottlingDynamoDB({'a': {'id': 'a'}, 'b': {'id': 'b'}}, throttled={'b'})
+
+    with pytest.raises(dynamo_utils.UnprocessedKeysError) as error:
+        dynamo_utils.batch_get_items(dynamodb, 'pets', ['a', 'b', 'missing'])
+
+    assert error.value.found == {'a': {'id': 'a'}}
+    assert error.value.unprocessed == ['b']
+    assert dynamodb.calls == dynamo_utils.BATCH_GET_MAX_RETRIES + 1
+
+
+def test_batch_get_without_throttling_returns_found_items():
+    dynamodb = ThrottlingDynamoDB({'a': {'id': 'a'}}, throttled=set())
+
+    assert dynamo_utils.batch_get_items(dynamodb, 'pets', ['a', 'missing']) == {'a': {'id': 'a'}}
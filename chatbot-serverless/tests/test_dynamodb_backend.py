@@ -0,0 +1,53 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from services.storage.base import TRANSITION_APPLIED, TRANSITION_STATUS_CHANGED, TRANSITION_PET_UNAVAILABLE
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    monkeypatch.setenv('DYNAMODB_TABLE_REQUEST_ADOPT', 'adopt')
+    monkeypatch.setenv('DYNAMODB_TABLE_PETS', 'pets')
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        for name in ('adopt', 'pets'):
+            dynamodb.create_table(
+                TableName=name, BillingMode='PAY_PER_REQUEST',
+                AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+                KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            )
+        monkeypatch.setattr('services.storage.dynamodb_backend.get_resource', lambda name: dynamodb)
+        yield dynamodb.Table('adopt'), dynamodb.Table('pets')
+
+
+def approve(solicitation_id, pet_id):
+    return {'id': solicitation_id, 'from': 'Pendente', 'to': 'Aprovada', 'updatedAt': '2024-01-01T00:00:00',
+            'petId': pet_id, 'disponivel': False}
+
+
+def test_cancellation_reasons_become_transition_outcomes(tables):
+    from services.storage.dynamodb_backend import DynamoAdoptSolicitationRepository
+
+    adopt, pets = tables
+    adopt.put_item(Item={'id': 's1', 'status': 'Pendente', 'petId': 'p1'})
+    adopt.put_item(Item={'id': 's2', 'status': 'Rejeitada', 'petId': 'p2'})
+    adopt.put_item(Item={'id': 's3', 'status': 'Pendente', 'petId': 'p3'})
+    pets.put_item(Item={'id': 'p1'})
+    pets.put_item(Item={'id': 'p2', 'disponivel': True})
+    pets.put_item(Item={'id': 'p3', 'disponivel': False})
+
+    outcomes = DynamoAdoptSolicitationRepository().apply_transitions(
+        [approve('s1', 'p1'), approve('s2', 'p2'), approve('s3', 'p3')]
+    )
+
+    assert outcomes == {
+        's1': TRANSITION_APPLIED,
+        's2': TRANSITION_STATUS_CHANGED,
+        's3': TRANSITION_PET_UNAVAILABLE,
+    }
+    assert adopt.get_item(Key={'id': 's1'})['Item']['status'] == 'Aprovada'
+    assert pets.get_item(Key={'id': 'p1'})['Item']['disponivel'] is False
+    # os grupos cancelados não gravaram nada
+    assert pets.get_item(Key={'id': 'p2'})['Item']['disponivel'] is True
+    assert adopt.get_item(Key={'id': 's3'})['Item']['status'] == 'Pendente'
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import handler
+from services.storage import set_storage
+from utils import http_utils
+
+
+@pytest.fixture(autouse=True)
+def storage():
+    storage = set_storage('memory')
+    storage.solicitations.put({'id': 's1', 'status': 'Pendente', 'pet': {'nome': 'Rex "o bravo"'},
+                               'user': {'name': 'Joana Conceição'}})
+    return storage
+
+
+def export(**params):
+    return handler.apiExportAdoptSolicitations({'queryStringParameters': params, 'headers': {}}, None)
+
+
+@pytest.mark.parametrize('params', [
+    {'segments': 'abc'}, {'segments': '0'}, {'segments': '17'}, {'format': 'xml'}, {'destination': 'ftp'},
+])
+def test_invalid_parameters_are_rejected(params):
+    response = export(**params)
+
+    assert response['statusCode'] == 400
+    assert 'error' in json.loads(response['body'])
+
+
+def test_exports_rows_in_the_body():
+    response = export(format='ndjson', segments='2')
+
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'].splitlines()[0])['id'] == 's1'
+
+
+def test_response_size_counts_the_escaping():
+    body = 'ç"' * 10
+    assert http_utils.response_size({'body': body}) > len(body.encode('utf-8')) + len('{"body": ""}')
+
+
+def test_response_over_the_lambda_limit_is_refused(monkeypatch):
+    # the rows fit in RESPONSE_MAX_BYTES, the serialized proxy response does not
+    monkeypatch.setattr(http_utils, 'LAMBDA_RESPONSE_MAX_BYTES', 150)
+
+    response = export()
+
+    assert response['statusCode'] == 413
+    assert 'destination=s3' in json.loads(response['body'])['error']
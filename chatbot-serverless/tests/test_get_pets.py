@@ -0,0 +1,51 @@
+import pytest
+
+import handler
+from services.dynamo import pets as pets_service
+from services.storage import set_storage
+
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch):
+    storage = set_storage('memory')
+    pets_service.invalidate_pets_cache()
+    monkeypatch.setattr(handler, '_pets_response', None)
+    storage.pets.put({'id': 'p1', 'nome': 'Rex', 'especie': 'Cachorro', 'raça': 'Labrador'})
+    yield storage
+    pets_service.invalidate_pets_cache()
+
+
+def get_pets(**headers):
+    return handler.apiGetPets({'headers': headers}, None)
+
+
+def test_conditional_get_skips_reading_and_serializing(storage, monkeypatch):
+    first = get_pets()
+    assert first['statusCode'] == 200
+
+    def fail():
+        raise AssertionError('the catalog must not be read again')
+
+    monkeypatch.setattr(pets_service, 'get_pets', fail)
+    second = get_pets(**{'If-None-Match': first['headers']['ETag']})
+
+    assert second['statusCode'] == 304
+    assert second['body'] == ''
+
+
+def test_new_catalog_renders_a_new_body(storage):
+    first = get_pets()
+    storage.pets.put({'id': 'p2', 'nome': 'Thor', 'especie': 'Cachorro', 'raça': 'Poodle'})
+    pets_service.invalidate_pets_cache()
+
+    second = get_pets(**{'If-None-Match': first['headers']['ETag']})
+
+    assert second['statusCode'] == 200
+    assert 'Thor' in second['body']
+
+
+def test_responses_are_plain_text_for_api_gateway_to_compress():
+    response = get_pets(**{'Accept-Encoding': 'gzip, br'})
+
+    assert 'isBase64Encoded' not in response
+    assert 'Content-Encoding' not in response['headers']
@@ -0,0 +1,59 @@
+import pytest
+
+from handler import lex_handler
+from services.lex_service import select_intent
+from tools.lex_simulator import LexSimulator, load_bot
+
+USER = {'userId': 'u1', 'nome': 'Ana', 'telefone': '+5511987654321'}
+
+
+def dialog_event(intent_name, attributes):
+    return {
+        'invocationSource': 'DialogCodeHook',
+        'sessionState': {
+            'sessionAttributes': dict(attributes),
+            'intent': {'name': intent_name, 'slots': {}, 'state': 'InProgress'},
+        },
+    }
+
+
+@pytest.mark.parametrize('intent_name', ['saudacaoCadastro', 'verificacaoCadastro'])
+def test_identified_sender_skips_registration_intents(intent_name):
+    response = select_intent(intent_name, dialog_event(intent_name, USER))
+
+    assert response['sessionState']['dialogAction'] == {'type': 'Close'}
+    assert response['sessionState']['intent']['state'] == 'Fulfilled'
+    assert response['sessionState']['sessionAttributes']['userId'] == 'u1'
+    assert 'Ana' in response['messages'][-1]['content']
+
+
+@pytest.mark.parametrize('intent_name', ['saudacaoCadastro', 'verificacaoCadastro'])
+def test_unidentified_sender_follows_the_bot_prompts(intent_name):
+    response = select_intent(intent_name, dialog_event(intent_name, {}))
+
+    assert response['sessionState']['dialogAction'] == {'type': 'Delegate'}
+    assert 'messages' not in response
+
+
+@pytest.fixture
+def simulator():
+    bot = load_bot()
+    # o export atual ainda não habilita o dialog code hook de saudacaoCadastro
+    bot.intents['saudacaoCadastro'].dialog_code_hook = True
+    return LexSimulator(bot, lex_handler)
+
+
+def test_greeting_goes_straight_to_the_menu_for_identified_sender(simulator):
+    reply = simulator.recognize_text('s1', 'oi', sessionState={'sessionAttributes': USER})
+
+    contents = [message['content'] for message in reply['messages']]
+    assert 'Cadastro encontrado com sucesso.' in contents
+    assert 'Ana' in contents[-1]
+    assert reply['sessionState']['dialogAction']['type'] == 'Close'
+
+
+def test_greeting_asks_about_registration_for_unknown_sender(simulator):
+    reply = simulator.recognize_text('s2', 'oi', sessionState={'sessionAttributes': {}})
+
+    assert reply['sessionState']['dialogAction']['type'] == 'ConfirmIntent'
+    assert 'cadastro' in reply['messages'][-1]['content']
@@ -0,0 +1,93 @@
+import pytest
+
+from services.dynamo import lex_sessions
+from services.storage import set_storage, get_storage
+
+
+@pytest.fixture(autouse=True)
+def storage():
+    lex_sessions.invalidate_session()
+    yield set_storage('memory')
+    lex_sessions.invalidate_session()
+
+
+def other_message_saves(user_id, **changes):
+    """Outra mensagem do usuário lê e salva a sessão no meio do turno."""
+    attributes, version = get_storage().sessions.get(user_id)
+    attributes = dict(attributes or {}, **changes)
+    get_storage().sessions.put(user_id, attributes, expected_version=version)
+
+
+def test_save_without_conflict_writes_turn_attributes():
+    original, version = lex_sessions.get_session('u1')
+    assert (original, version) == ({}, 0)
+
+    new_version = lex_sessions.save_session_changes('u1', original, {'petId': 'p1'}, version)
+
+    assert new_version == 1
+    assert get_storage().sessions.get('u1') == ({'petId': 'p1'}, 1)
+
+
+def test_conflict_applies_only_turn_changes_over_current_session():
+    lex_sessions.save_session('u1', {'petId': 'p1', 'step': 'nome', 'stale': 'x'}, 0)
+    original, version = lex_sessions.get_session('u1')
+
+    other_message_saves('u1', userName='Ana', step='raca')
+    # este turno altera petId, remove stale e não toca em userName nem step
+    turn = {'petId': 'p2', 'step': 'nome'}
+
+    new_version = lex_sessions.save_session_changes('u1', original, turn, version)
+
+    assert new_version == 3
+    attributes, _ = get_storage().sessions.get('u1')
+    assert attributes == {'petId': 'p2', 'step': 'raca', 'userName': 'Ana'}
+
+
+def test_conflict_on_same_dialog_attribute_keeps_other_message_value():
+    lex_sessions.save_session('u1', {'petId': 'p1', 'stale': 'x'}, 0)
+    original, version = lex_sessions.get_session('u1')
+
+    other_message_saves('u1', petId='p3', stale='y')
+    # este turno também altera petId, remove stale e inclui step
+    turn = {'petId': 'p2', 'step': 'nome'}
+
+    lex_sessions.save_session_changes('u1', original, turn, version)
+
+    assert get_storage().sessions.get('u1')[0] == {'petId': 'p3', 'stale': 'y', 'step': 'nome'}
+
+
+def test_conflict_on_same_identity_attribute_keeps_turn_value():
+    lex_sessions.save_session('u1', {'nome': 'Ana'}, 0)
+    original, version = lex_sessions.get_session('u1')
+
+    other_message_saves('u1', nome='Ana Maria')
+
+    lex_sessions.save_session_changes('u1', original, {'nome': 'Ana Souza', 'userId': 'x1'}, version)
+
+    assert get_storage().sessions.get('u1')[0] == {'nome': 'Ana Souza', 'userId': 'x1'}
+
+
+def test_gives_up_after_repeated_conflicts(monkeypatch):
+    original, version = lex_sessions.get_session('u1')
+    real_get_session = lex_sessions.get_session
+
+    def get_session_racing(user_id, consistent=False):
+        session = real_get_session(user_id, consistent)
+        other_message_saves(user_id, other='y')
+        return session
+
+    monkeypatch.setattr(lex_sessions, 'get_session', get_session_racing)
+    other_message_saves('u1', other='x')
+
+    assert lex_sessions.save_session_changes('u1', original, {'petId': 'p1'}, version) is None
+    assert 'petId' not in get_storage().sessions.get('u1')[0]
+
+
+def test_conflict_invalidates_container_cache():
+    lex_sessions.save_session('u1', {'petId': 'p1'}, 0)
+    other_message_saves('u1', petId='p9')
+
+    with pytest.raises(lex_sessions.ConflictError):
+        lex_sessions.save_session('u1', {'petId': 'p2'}, 1)
+
+    assert lex_sessions.get_session('u1') == ({'petId': 'p9'}, 2)
@@ -0,0 +1,51 @@
+import pytest
+
+from services.dynamo import pets as pets_service
+from services.storage import set_storage
+from utils.lex_utils import resolve_animal
+
+
+@pytest.fixture(autouse=True)
+def storage():
+    storage = set_storage('memory')
+    pets_service.invalidate_pets_cache()
+    yield storage
+    pets_service.invalidate_pets_cache()
+
+
+def add_pet(storage, pet_id, name, breed, available=True):
+    return storage.pets.put({
+        'id': pet_id, 'nome': name, 'especie': 'Cachorro', 'raça': breed, 'idade': 3, 'disponivel': available,
+    })
+
+
+def test_exact_answer_resolves_available_pet(storage):
+    add_pet(storage, 'p1', 'Rex', 'Labrador')
+
+    pet, options = resolve_animal('Rex - Cachorro - Labrador')
+
+    assert pet['id'] == 'p1'
+    assert options == []
+
+
+def test_exact_answer_rejects_adopted_pet(storage):
+    add_pet(storage, 'p1', 'Rex', 'Labrador', available=False)
+
+    assert resolve_animal('Rex - Cachorro - Labrador') == (None, [])
+
+
+def test_exact_answer_falls_back_to_available_pet_with_same_name(storage):
+    add_pet(storage, 'p1', 'Rex', 'Labrador', available=False)
+    add_pet(storage, 'p2', 'Rex', 'Labrador')
+
+    pet, _ = resolve_animal('Rex - Labrador')
+
+    assert pet['id'] == 'p2'
+
+
+def test_free_text_skips_adopted_pets(storage):
+    add_pet(storage, 'p1', 'Rex', 'Labrador', available=False)
+    add_pet(storage, 'p2', 'Thor', 'Poodle')
+
+    assert resolve_animal('rex labrdor') == (None, [])
+    assert resolve_animal('thor poodle')[0]['id'] == 'p2'
@@ -0,0 +1,87 @@
+import pytest
+
+from services import pet_search_service
+from services.dynamo import pets as pets_service
+from services.storage import set_storage
+
+
+@pytest.fixture(autouse=True)
+def storage():
+    storage = set_storage('memory')
+    pets_service.invalidate_pets_cache()
+    yield storage
+    pets_service.invalidate_pets_cache()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pets_service.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_index_expires_with_the_catalog_it_was_built_from(storage, clock, monkeypatch):
+    monkeypatch.setattr(pets_service, 'PETS_CACHE_TTL', 15.0)
+    storage.pets.put({'id': 'p1', 'nome': 'Rex', 'especie': 'Cachorro', 'raça': 'Labrador', 'idade': 3})
+    pets_service.get_pets()
+
+    # o índice é montado com o catálogo já lido há 10 s
+    clock[0] += 10
+    assert [pet['id'] for pet in pet_search_service.search_pets('rex')] == ['p1']
+
+    storage.pets.put({'id': 'p2', 'nome': 'Thor', 'especie': 'Cachorro', 'raça': 'Poodle', 'idade': 2})
+    clock[0] += 6
+    assert [pet['id'] for pet in pet_search_service.search_pets('thor')] == ['p2']
+
+
+def test_index_without_catalog_cache_is_rebuilt_on_every_call(storage, monkeypatch):
+    monkeypatch.setattr(pets_service, 'PETS_CACHE_TTL', 0.0)
+    storage.pets.put({'id': 'p1', 'nome': 'Rex', 'especie': 'Cachorro', 'raça': 'Labrador', 'idade': 3})
+    assert pet_search_service.search_pets('thor') == []
+
+    storage.pets.put({'id': 'p2', 'nome': 'Thor', 'especie': 'Cachorro', 'raça': 'Poodle', 'idade': 2})
+    assert [pet['id'] for pet in pet_search_service.search_pets('thor')] == ['p2']
+
+
+def test_invalidating_the_catalog_drops_the_index(storage):
+    storage.pets.put({'id': 'p1', 'nome': 'Rex', 'especie': 'Cachorro', 'raça': 'Labrador', 'idade': 3})
+    assert pet_search_service.search_pets('rex', available_only=True)
+
+    storage.pets.put({'id': 'p1', 'nome': 'Rex', 'especie': 'Cachorro', 'raça': 'Labrador', 'idade': 3,
+                      'disponivel': False})
+    pets_service.invalidate_pets_cache()
+
+    assert pet_search_service.search_pets('rex', available_only=True) == []
+
+
+def add_pet(storage, pet_id, name, breed, species='Cachorro'):
+    storage.pets.put({'id': pet_id, 'nome': name, 'especie': species, 'raça': breed, 'idade': 3})
+
+
+def test_resolve_pet_picks_the_pet_named_exactly(storage):
+    add_pet(storage, 'p1', 'Thor', 'Poodle')
+    add_pet(storage, 'p2', 'Rex', 'Labrador')
+
+    assert pet_search_service.resolve_pet('Thor')[0]['id'] == 'p1'
+    assert pet_search_service.resolve_pet('o thor poodle')[0]['id'] == 'p1'
+
+
+@pytest.mark.parametrize('text', ['tho', 'thorr', 'thor labrador', 'cachorro'])
+def test_resolve_pet_offers_prefix_fuzzy_and_species_matches(storage, text):
+    add_pet(storage, 'p1', 'Thor', 'Poodle')
+
+    pet, options = pet_search_service.resolve_pet(text)
+
+    assert pet is None
+    assert [option['id'] for option in options] == ['p1']
+
+
+def test_resolve_pet_offers_pets_with_the_same_name(storage):
+    add_pet(storage, 'p1', 'Thor', 'Poodle')
+    add_pet(storage, 'p2', 'Thor', 'Beagle')
+
+    pet, options = pet_search_service.resolve_pet('thor')
+
+    assert pet is None
+    assert sorted(option['id'] for option in options) == ['p1', 'p2']
+    assert pet_search_service.resolve_pet('thor beagle')[0]['id'] == 'p2'
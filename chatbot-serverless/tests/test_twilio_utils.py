@@ -0,0 +1,101 @@
+from urllib.parse import urlencode
+
+import pytest
+
+from utils import twilio_utils
+from utils.twilio_utils import WebhookRejected, compute_signature, parse_webhook_request, webhook_urls
+
+TOKEN = '12345'
+PARAMS = {'From': 'whatsapp:+5511987654321', 'AccountSid': 'AC1', 'Body': ''}
+URL = 'https://abc.execute-api.us-east-1.amazonaws.com/dev/webhook'
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(twilio_utils, 'TWILIO_AUTH_TOKEN', TOKEN)
+    monkeypatch.setattr(twilio_utils, 'TWILIO_ACCOUNT_SID', None)
+    monkeypatch.setattr(twilio_utils, 'TWILIO_VALIDATE_SIGNATURE', True)
+    monkeypatch.setattr(twilio_utils, 'WEBHOOK_PUBLIC_URL', None)
+
+
+def webhook_event(signature=None, host='abc.execute-api.us-east-1.amazonaws.com', query=None, **headers):
+    headers = {'Host': host, 'X-Forwarded-Proto': 'https',
+               'Content-Type': 'application/x-www-form-urlencoded', **headers}
+    if signature is not None:
+        headers['X-Twilio-Signature'] = signature
+    return {
+        'headers': headers,
+        'body': urlencode(PARAMS),
+        'path': '/webhook',
+        'requestContext': {'path': '/dev/webhook'},
+        'queryStringParameters': query,
+    }
+
+
+def signed(url):
+    return compute_signature(TOKEN, url, {name: [value] for name, value in PARAMS.items()})
+
+
+def test_compute_signature_matches_twilio_example():
+    params = {'CallSid': ['CA1234567890ABCDE'], 'Caller': ['+12349013030'], 'Digits': ['1234'],
+              'From': ['+12349013030'], 'To': ['+18005551212']}
+
+    signature = compute_signature(TOKEN, 'https://mycompany.com/myapp.php?foo=1&bar=2', params)
+
+    assert signature == '0/KCTR6DLpKmkAf8muzZqo1nDgQ='
+
+
+def test_url_is_rebuilt_with_stage_and_both_port_forms():
+    assert webhook_urls(webhook_event()) == [URL, URL.replace('.com/', '.com:443/')]
+
+
+def test_url_keeps_query_string():
+    urls = webhook_urls(webhook_event(query={'source': 'wa'}))
+
+    assert urls[0] == URL + '?source=wa'
+
+
+def test_public_url_overrides_the_event(monkeypatch):
+    monkeypatch.setattr(twilio_utils, 'WEBHOOK_PUBLIC_URL', 'https://bot.example.com/webhook')
+
+    assert webhook_urls(webhook_event(host='internal:8080')) == [
+        'https://bot.example.com/webhook', 'https://bot.example.com:443/webhook'
+    ]
+
+
+def test_accepts_request_signed_for_the_rebuilt_url():
+    params = parse_webhook_request(webhook_event(signed(URL)))
+
+    assert params['From'] == ['whatsapp:+5511987654321']
+    assert params['Body'] == ['']
+
+
+def test_accepts_request_signed_with_explicit_default_port():
+    assert parse_webhook_request(webhook_event(signed(URL.replace('.com/', '.com:443/'))))
+
+
+@pytest.mark.parametrize('signature', [None, 'AAAA', 'signed-without-stage'])
+def test_rejects_missing_or_wrong_signature(signature):
+    if signature == 'signed-without-stage':
+        signature = signed(URL.replace('/dev', ''))
+
+    with pytest.raises(WebhookRejected) as rejected:
+        parse_webhook_request(webhook_event(signature))
+
+    assert (rejected.value.status_code, rejected.value.reason) == (403, 'invalid signature')
+
+
+def test_fails_closed_without_auth_token(monkeypatch):
+    monkeypatch.setattr(twilio_utils, 'TWILIO_AUTH_TOKEN', '')
+
+    with pytest.raises(WebhookRejected) as rejected:
+        parse_webhook_request(webhook_event(signed(URL)))
+
+    assert (rejected.value.status_code, rejected.value.reason) == (403, 'auth token not configured')
+
+
+def test_validation_disabled_explicitly(monkeypatch):
+    monkeypatch.setattr(twilio_utils, 'TWILIO_AUTH_TOKEN', '')
+    monkeypatch.setattr(twilio_utils, 'TWILIO_VALIDATE_SIGNATURE', False)
+
+    assert parse_webhook_request(webhook_event())['AccountSid'] == ['AC1']
@@ -0,0 +1,52 @@
+import pytest
+
+from services.dynamo import user as user_service
+from services.storage import set_storage
+
+
+@pytest.fixture(autouse=True)
+def storage():
+    user_service.invalidate_user_cache()
+    yield set_storage('memory')
+    user_service.invalidate_user_cache()
+
+
+def test_finds_user_stored_in_e164(storage):
+    storage.users.put({'id': 'u1', 'phone': '+5511987654321'})
+
+    assert user_service.get_user_by_phone('whatsapp:+5511987654321')['id'] == 'u1'
+
+
+def test_legacy_lookup_finds_old_format_without_writing(storage, monkeypatch):
+    storage.users.put({'id': 'u1', 'phone': '11987654321', 'name': 'Ana'})
+    monkeypatch.setattr(user_service, 'PHONE_LEGACY_LOOKUP', True)
+    writes = []
+    monkeypatch.setattr(storage.users, 'put', lambda item: writes.append(item))
+
+    result = user_service.search_by_phone('whatsapp:+5511987654321')
+
+    assert [user['id'] for user in result] == ['u1']
+    assert writes == []
+    assert storage.users.get('u1')['phone'] == '11987654321'
+
+
+def test_legacy_lookup_disabled_queries_only_e164(storage, monkeypatch):
+    storage.users.put({'id': 'u1', 'phone': '11987654321'})
+    monkeypatch.setattr(user_service, 'PHONE_LEGACY_LOOKUP', False)
+    queried = []
+    find_by_phone = storage.users.find_by_phone
+    monkeypatch.setattr(storage.users, 'find_by_phone', lambda phone: queried.append(phone) or find_by_phone(phone))
+
+    assert user_service.search_by_phone('whatsapp:+5511987654321') == []
+    assert queried == ['+5511987654321']
+
+
+def test_unregistered_sender_is_cached(storage, monkeypatch):
+    queried = []
+    find_by_phone = storage.users.find_by_phone
+    monkeypatch.setattr(storage.users, 'find_by_phone', lambda phone: queried.append(phone) or find_by_phone(phone))
+
+    assert user_service.get_user_by_phone('whatsapp:+5511987654321') is None
+    calls = len(queried)
+    assert user_service.get_user_by_phone('whatsapp:+5511987654321') is None
+    assert len(queried) == calls
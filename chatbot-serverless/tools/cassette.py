@@ -0,0 +1,383 @@
+"""
+Record/replay cassettes of the calls made to AWS and to Twilio.
+
+In record mode every botocore call (Lex, DynamoDB, Polly, Rekognition, S3, ...)
+is captured at the HTTP level, with the response status, headers and body and
+how long the call took, and so is every request made with `requests` (the
+Twilio media download, redirects included). In replay mode the calls never
+leave the process: botocore calls are answered from the cassette through the
+`before-call` event, with the recorded response parsed by botocore itself, so
+resource deserialization, modeled errors, the circuit breaker hooks and the
+dependency call counters run as they do against AWS; `requests` calls get the
+recorded response from the transport adapter. A latency drawn from a
+distribution per service can be added to each replayed call.
+
+Calls are matched by service, operation and a digest of the request (path,
+query and body). Requests that differ from the recording (new ids, timestamps)
+get the next recorded response of the same operation on the same table (any
+table if that one was never called), in recording order, cycling through them
+once all were used, so a cassette can be replayed many times. Replays are
+exact when the recorded conversations are played again one at a time
+(`--concurrency 1`); other conversations get plausible, not consistent, replies.
+
+Cassettes hold whatever the services returned: record them against a test stage,
+not with production data. Like `tools.local_clients`, `install()` must run before
+the handler modules are imported, so the clients they create are hooked.
+
+Usage: see `python -m tools.loadgen --help` (--record-cassette / --cassette).
+"""
+import base64
+import gzip
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import threading
+import time
+
+# settings recorded with the cassette; the recorded requests were made with them
+ENVIRONMENT_KEYS = (
+    'AWS_DEFAULT_REGION', 'BOT_ID', 'BOT_ALIAS_ID', 'S3_BUCKET_NAME', 'BUCKET_NAME',
+    'DYNAMODB_TABLE_USERS', 'DYNAMODB_TABLE_PETS', 'DYNAMODB_TABLE_REQUEST_ADOPT',
+    'DYNAMODB_TABLE_LEX_SESSIONS', 'DYNAMODB_TABLE_USER_IMAGES', 'DYNAMODB_TABLE_RATE_LIMITS',
+)
+
+# the service name `requests` calls are recorded under (only the Twilio media download uses it)
+HTTP_SERVICE = 'twilio'
+
+# headers that no longer describe the stored body (kept whole and decoded)
+_HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode for a call whose operation was never recorded."""
+
+
+def request_digest(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray)):
+            digest.update(bytes(part))
+        elif isinstance(part, (str, int, float)) or part is None:
+            digest.update(str(part).encode('utf-8'))
+        elif isinstance(part, dict):
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        # streams (uploads) are left out, reading them would consume the caller's data
+        digest.update(b'\0')
+    return digest.hexdigest()[:20]
+
+
+def _botocore_key(params):
+    return request_digest(params.get('method'), params.get('url_path'), params.get('query_string'), params.get('body'))
+
+
+def _botocore_target(params):
+    # the table (and index) of JSON requests, so unmatched DynamoDB calls get a reply from the same table
+    body = params.get('body')
+    if isinstance(body, bytes) and body.startswith(b'{'):
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return ''
+        return '/'.join(filter(None, (request.get('TableName'), request.get('IndexName'))))
+    return ''
+
+
+def _http_key(request):
+    return request_digest(request.method, request.url, request.body)
+
+
+def _encode_body(body):
+    try:
+        return {'body': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'body_base64': base64.b64encode(body).decode('ascii')}
+
+
+def _decode_body(interaction):
+    if 'body_base64' in interaction:
+        return base64.b64decode(interaction['body_base64'])
+    return interaction.get('body', '').encode('utf-8')
+
+
+def parse_distribution(value):
+    """
+    Parses a latency distribution and returns a sampler `(rng, recorded_seconds) -> seconds`.
+
+    Forms (seconds): '0.05' or 'fixed:0.05', 'uniform:0.02:0.08', 'normal:0.05:0.01',
+    'lognormal:0.05:0.4' (median and sigma of the log), 'recorded' (the time the call
+    took when recorded) and 'recorded:0.5' (scaled).
+    """
+    kind, _, args = value.strip().partition(':')
+    try:
+        numbers = [float(arg) for arg in args.split(':')] if args else []
+        if kind == 'recorded':
+            scale = numbers[0] if numbers else 1.0
+            return lambda rng, recorded: recorded * scale
+        if kind == 'fixed':
+            seconds, = numbers
+        elif kind == 'uniform':
+            low, high = numbers
+            return lambda rng, recorded: rng.uniform(low, high)
+        elif kind == 'normal':
+            mean, deviation = numbers
+            return lambda rng, recorded: max(0.0, rng.gauss(mean, deviation))
+        elif kind == 'lognormal':
+            median, sigma = numbers
+            return lambda rng, recorded: rng.lognormvariate(math.log(median), sigma)
+        else:
+            seconds = float(kind)
+    except ValueError:
+        raise ValueError(f"Invalid latency distribution: {value!r}") from None
+    return lambda rng, recorded: seconds
+
+
+def parse_latency_spec(value):
+    """
+    Parses 'service=distribution,...' (e.g. 'lexv2-runtime=lognormal:0.08:0.3,dynamodb=recorded').
+
+    '*' sets the distribution of the services not listed.
+    """
+    latencies = {}
+    for entry in filter(None, (value or '').split(',')):
+        service, _, distribution = entry.partition('=')
+        latencies[service.strip()] = parse_distribution(distribution)
+    return latencies
+
+
+class Cassette:
+    """
+    The recorded interactions and the hooks that record or replay them.
+
+    Args:
+        mode (str): 'record' or 'replay'.
+        interactions (list, optional): Interactions to replay (see `load`).
+        latencies (dict, optional): service -> sampler, from `parse_latency_spec`.
+        seed (int, optional): Seed of the latency samples.
+        environment (dict, optional): Settings the interactions were recorded with.
+    """
+
+    def __init__(self, mode='record', interactions=None, latencies=None, seed=None, environment=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.interactions = list(interactions or [])
+        self.latencies = latencies or {}
+        self.environment = dict(environment or {})
+        self.replayed = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._by_operation = {}  # (service, operation) and (service, operation, target) -> [interaction indexes]
+        self._by_key = {}  # (service, operation, key) -> [interaction indexes]
+        self._cursor = {}  # key of _by_operation -> position of the next in-order reply
+        self._used = set()
+        self._installed = []
+        for index, interaction in enumerate(self.interactions):
+            self._index(index, interaction)
+
+    @classmethod
+    def load(cls, path, latencies=None, seed=None):
+        """Reads a cassette file (gzip-compressed when it ends with .gz) for replay."""
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as source:
+            data = json.load(source)
+        return cls('replay', data['interactions'], latencies, seed, data.get('environment'))
+
+    def save(self, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with self._lock:
+            data = {'version': 1, 'environment': self.environment, 'interactions': list(self.interactions)}
+        with opener(path, 'wt', encoding='utf-8') as target:
+            json.dump(data, target, ensure_ascii=False, indent=1)
+
+    def summary(self):
+        """Returns 'service.operation' -> interaction count."""
+        counts = {}
+        for interaction in self.interactions:
+            name = f"{interaction['service']}.{interaction['operation']}"
+            counts[name] = counts.get(name, 0) + 1
+        return dict(sorted(counts.items()))
+
+    def _index(self, index, interaction):
+        operation = (interaction['service'], interaction['operation'])
+        self._by_operation.setdefault(operation, []).append(index)
+        self._by_operation.setdefault(operation + (interaction.get('target', ''),), []).append(index)
+        self._by_key.setdefault(operation + (interaction['key'],), []).append(index)
+
+    def _add(self, service, operation, key, target, status, headers, body, elapsed):
+        interaction = {
+            'service': service,
+            'operation': operation,
+            'target': target,
+            'key': key,
+            'status': status,
+            'headers': {name: value for name, value in headers.items() if name.lower() not in _HOP_HEADERS},
+            'elapsed_ms': round(elapsed * 1000, 3),
+        }
+        interaction.update(_encode_body(body))
+        with self._lock:
+            self.interactions.append(interaction)
+            self._index(len(self.interactions) - 1, interaction)
+
+    def _next(self, service, operation, key, target=''):
+        """Picks the reply: an unused exact match, else the next of the operation in recording order."""
+        with self._lock:
+            for index in self._by_key.get((service, operation, key), ()):
+                if index not in self._used:
+                    break
+            else:
+                group = (service, operation, target)
+                if group not in self._by_operation:
+                    group = (service, operation)
+                indexes = self._by_operation.get(group)
+                if not indexes:
+                    raise CassetteMissError(f"No recorded {service}.{operation} call")
+                position = self._cursor.get(group, 0)
+                # skips the replies already used by exact matches, until every one was used once
+                for offset in range(len(indexes)):
+                    index = indexes[(position + offset) % len(indexes)]
+                    if index not in self._used:
+                        break
+                else:
+                    index = indexes[position % len(indexes)]
+                self._cursor[group] = indexes.index(index) + 1
+            self._used.add(index)
+            if len(self._used) == len(self.interactions):
+                self._used.clear()
+            self.replayed += 1
+            sampler = self.latencies.get(service, self.latencies.get('*'))
+            delay = sampler(self._rng, self.interactions[index]['elapsed_ms'] / 1000) if sampler else 0.0
+        if delay > 0:
+            time.sleep(delay)
+        return self.interactions[index]
+
+    # botocore
+
+    def _before_call(self, model, params, context, **kwargs):
+        service = model.service_model.service_name
+        if self.mode == 'record':
+            context['cassette'] = (_botocore_key(params), _botocore_target(params), time.perf_counter())
+            return None
+        interaction = self._next(service, model.name, _botocore_key(params), _botocore_target(params))
+        return _botocore_response(interaction, model)
+
+    def _after_call(self, http_response, parsed, model, context, **kwargs):
+        recorded = context.pop('cassette', None)
+        if self.mode != 'record' or recorded is None or http_response is None:
+            return
+        key, target, started = recorded
+        if http_response.status_code < 300 and model.has_streaming_output:
+            # the payload is still unread: it is read here and handed to the caller from memory
+            from botocore.response import StreamingBody
+
+            member = model.output_shape.serialization.get('payload')
+            body = parsed[member].read()
+            parsed[member] = StreamingBody(io.BytesIO(body), len(body))
+        else:
+            body = http_response.content
+        self._add(model.service_model.service_name, model.name, key, target, http_response.status_code,
+                  dict(http_response.headers.items()), body, time.perf_counter() - started)
+
+    # requests
+
+    def _send(self, original, adapter, request, **kwargs):
+        key = _http_key(request)
+        if self.mode == 'replay':
+            interaction = self._next(HTTP_SERVICE, request.method, key)
+            return adapter.build_response(request, _urllib3_response(
+                interaction['status'], interaction['headers'], _decode_body(interaction)))
+
+        started = time.perf_counter()
+        response = original(adapter, request, **kwargs)
+        body = response.content
+        elapsed = time.perf_counter() - started
+        headers = dict(response.headers.items())
+        self._add(HTTP_SERVICE, request.method, key, '', response.status_code, headers, body, elapsed)
+        # the caller streams the body: it gets a fresh response over the bytes already read
+        return adapter.build_response(request, _urllib3_response(
+            response.status_code, headers, body, response.reason))
+
+    def install(self):
+        """
+        Hooks the cassette into the default boto3 session (clients created from now on)
+        and into the `requests` transport adapter.
+        """
+        import boto3
+        from requests.adapters import HTTPAdapter
+
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        events = boto3.DEFAULT_SESSION.events
+        # registered last: the circuit breaker and call counters of each client run first
+        events.register_last('before-call', self._before_call, unique_id='cassette-before-call')
+        events.register_last('after-call', self._after_call, unique_id='cassette-after-call')
+
+        original = HTTPAdapter.send
+        cassette = self
+
+        def send(adapter, request, **kwargs):
+            return cassette._send(original, adapter, request, **kwargs)
+
+        HTTPAdapter.send = send
+        self._installed = [(events, original)]
+        if self.mode == 'record':
+            self.environment = {key: os.environ[key] for key in ENVIRONMENT_KEYS if os.environ.get(key)}
+        return self
+
+    def uninstall(self):
+        from requests.adapters import HTTPAdapter
+
+        for events, original in self._installed:
+            events.unregister('before-call', unique_id='cassette-before-call')
+            events.unregister('after-call', unique_id='cassette-after-call')
+            HTTPAdapter.send = original
+        self._installed = []
+
+
+class _RecordedBody(io.BytesIO):
+    # what botocore reads from AWSResponse.raw
+    def stream(self, **kwargs):
+        yield self.getvalue()
+
+
+def _botocore_response(interaction, model):
+    """Builds the (http_response, parsed) pair botocore expects from a `before-call` handler."""
+    from botocore.awsrequest import AWSResponse, HeadersDict
+    from botocore.parsers import create_parser
+    from botocore.response import StreamingBody
+
+    if model.has_event_stream_output:
+        raise CassetteMissError(f"Event stream operations cannot be replayed: {model.name}")
+
+    status = interaction['status']
+    body = _decode_body(interaction)
+    headers = HeadersDict(interaction['headers'])
+    headers['content-length'] = str(len(body))
+    http_response = AWSResponse('', status, headers, _RecordedBody(body))
+
+    response_dict = {'headers': headers, 'status_code': status, 'context': {'operation_name': model.name}}
+    if status < 300 and model.has_streaming_output:
+        response_dict['body'] = StreamingBody(io.BytesIO(body), len(body))
+    else:
+        response_dict['body'] = body
+
+    service_model = model.service_model
+    parser = create_parser(getattr(service_model, 'resolved_protocol', None) or service_model.protocol)
+    parsed = parser.parse(response_dict, model.output_shape)
+    if status >= 300:
+        # the modeled fields of errors (e.g. CancellationReasons), as botocore's endpoint adds them
+        error_shape = service_model.shape_for_error_code(parsed.get('Error', {}).get('Code'))
+        if error_shape is not None:
+            parsed.update(parser.parse(response_dict, error_shape))
+    return http_response, parsed
+
+
+def _urllib3_response(status, headers, body, reason=None):
+    from urllib3 import HTTPResponse
+
+    headers = dict(headers)
+    headers['Content-Length'] = str(len(body))
+    return HTTPResponse(body=io.BytesIO(body), headers=headers, status=status, reason=reason,
+                        preload_content=False, decode_content=False)
@@ -0,0 +1,179 @@
+"""
+First-request latency of the Lambda functions, with and without a warmup invocation.
+
+Every measurement runs in a new Python process, as a new container would: the
+handler module is imported (the init phase, not counted), then either the first
+request is sent right away (cold) or a warmup event ({"warmup": true}, see
+utils.warmup_utils) is sent first and the first request after it (warmed). The
+second request is reported too, as the steady state.
+
+Dependencies are the in-memory stand-ins of tools.local_clients with a fixed
+latency per call (--latency), storage is the memory backend seeded with sample
+pets, and S3 already holds what earlier containers left there (the audio and
+manifest of the static phrases). The stand-ins skip botocore client creation,
+so real cold starts pay somewhat more than the cold figures here.
+
+Usage (from the chatbot-serverless folder):
+    python -m tools.coldstart
+    python -m tools.coldstart --functions apiGetPets --runs 5 --latency dynamodb=0.02
+    python -m tools.coldstart --json
+"""
+import argparse
+import contextlib
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('S3_BUCKET_NAME', 'coldstart-bucket')
+os.environ.setdefault('BUCKET_NAME', 'coldstart-bucket')
+os.environ.setdefault('BOT_ID', 'COLDSTART')
+os.environ.setdefault('BOT_ALIAS_ID', 'COLDSTART')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+# round trips of the services from a Lambda in the same region, roughly
+DEFAULT_LATENCY = 'dynamodb=0.008,s3=0.025,polly=0.15,lexv2-runtime=0.08,rekognition=0.3'
+
+FUNCTIONS = ('lex_handler', 'webhook_handler', 'apiGetPets')
+
+
+def build_event(function):
+    """A representative first request of the function."""
+    if function == 'lex_handler':
+        # the donation intent answers with the audio of a static phrase
+        return {
+            'invocationSource': 'FulfillmentCodeHook',
+            'inputTranscript': '2',
+            'sessionState': {'intent': {'name': 'doacaoOng', 'slots': {}, 'state': 'ReadyForFulfillment'},
+                             'sessionAttributes': {}},
+        }
+    if function == 'webhook_handler':
+        from tools.loadgen import build_event as build_webhook_event, synthesize_body
+        return build_webhook_event(synthesize_body('5511900000001', text='Oi'))
+    if function == 'apiGetPets':
+        return {'httpMethod': 'GET', 'path': '/pets', 'headers': {}}
+    raise ValueError(f"No sample request for {function}")
+
+
+def install(latencies, s3_state=None):
+    from services.storage import set_storage
+    from tools.local_clients import count_storage_calls, install_local_clients, seed_storage
+
+    clients = install_local_clients(latencies)
+    if s3_state:
+        with open(s3_state, 'rb') as state:
+            clients['s3'].objects.update(pickle.load(state))
+    count_storage_calls(seed_storage(set_storage('memory')), latency=latencies.get('dynamodb', 0.0))
+    return clients
+
+
+def timed_call(function, event):
+    from utils.metrics_utils import count_dependency_calls
+
+    with count_dependency_calls() as calls:
+        started = time.perf_counter()
+        function(event, None)
+        elapsed = (time.perf_counter() - started) * 1000
+    return round(elapsed, 1), dict(sorted(calls.items()))
+
+
+def child(args):
+    """Runs inside the measured process; prints one JSON result."""
+    from tools.loadgen import parse_latencies
+
+    latencies = parse_latencies(args.latency)
+    clients = install(latencies, args.s3_state if args.mode != 'seed' else None)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import logging
+        logging.disable(logging.CRITICAL)
+        import handler
+
+        if args.mode == 'seed':
+            # what earlier containers left in S3: the static phrases' audio and manifest
+            handler.lex_handler({'warmup': True}, None)
+            with open(args.s3_state, 'wb') as state:
+                pickle.dump(clients['s3'].objects, state)
+            return 0
+
+        function = getattr(handler, args.function)
+        event = build_event(args.function)
+        result = {'function': args.function, 'mode': args.mode}
+        if args.mode == 'warmed':
+            result['warmup_ms'], result['warmup_calls'] = timed_call(function, {'warmup': True})
+        result['first_ms'], result['first_calls'] = timed_call(function, event)
+        result['second_ms'], result['second_calls'] = timed_call(function, event)
+
+    print(json.dumps(result))
+    return 0
+
+
+def run_child(mode, function, latency, s3_state):
+    command = [sys.executable, '-m', 'tools.coldstart', '--child', '--mode', mode, '--function', function,
+               '--latency', latency, '--s3-state', s3_state]
+    output = subprocess.run(command, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    return json.loads(output.strip().splitlines()[-1]) if mode != 'seed' else None
+
+
+def measure(functions, runs, latency):
+    with tempfile.TemporaryDirectory() as folder:
+        s3_state = os.path.join(folder, 's3.pickle')
+        run_child('seed', 'lex_handler', latency, s3_state)
+
+        report = {}
+        for function in functions:
+            results = {mode: [run_child(mode, function, latency, s3_state) for _ in range(runs)]
+                       for mode in ('cold', 'warmed')}
+            report[function] = {
+                'cold_first_ms': statistics.median(r['first_ms'] for r in results['cold']),
+                'warmed_first_ms': statistics.median(r['first_ms'] for r in results['warmed']),
+                'steady_ms': statistics.median(r['second_ms'] for r in results['cold']),
+                'warmup_ms': statistics.median(r['warmup_ms'] for r in results['warmed']),
+                'cold_first_calls': results['cold'][-1]['first_calls'],
+                'warmed_first_calls': results['warmed'][-1]['first_calls'],
+            }
+    return report
+
+
+def format_report(report, runs):
+    lines = [
+        f"Median of {runs} fresh processes per value (ms)",
+        f"{'function':<18}{'cold 1st':>10}{'warmed 1st':>12}{'steady':>9}{'warmup':>9}  calls cold -> warmed",
+    ]
+    for function, row in report.items():
+        lines.append(
+            f"{function:<18}{row['cold_first_ms']:>10.1f}{row['warmed_first_ms']:>12.1f}{row['steady_ms']:>9.1f}"
+            f"{row['warmup_ms']:>9.1f}  {row['cold_first_calls']} -> {row['warmed_first_calls']}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--functions', default=','.join(FUNCTIONS), help='Comma-separated handler names')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh processes per function and mode')
+    parser.add_argument('--latency', default=DEFAULT_LATENCY, help="Per-call latency in seconds, e.g. 'dynamodb=0.01'")
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=('seed', 'cold', 'warmed'), help=argparse.SUPPRESS)
+    parser.add_argument('--function', help=argparse.SUPPRESS)
+    parser.add_argument('--s3-state', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child(args)
+
+    report = measure([name.strip() for name in args.functions.split(',') if name.strip()], args.runs, args.latency)
+    print(json.dumps(report, indent=2) if args.json else format_report(report, args.runs))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
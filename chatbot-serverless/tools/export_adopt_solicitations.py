@@ -0,0 +1,47 @@
+"""
+Exporta todas as solicitações de adoção usando uma varredura paralela do DynamoDB.
+
+As linhas são escritas à medida que chegam dos segmentos, sem carregar a tabela
+inteira em memória. Ao final, o relatório de vazão (itens/s) é exibido no stderr.
+
+Uso (a partir da pasta chatbot-serverless):
+    python -m tools.export_adopt_solicitations --format ndjson > solicitacoes.ndjson
+    python -m tools.export_adopt_solicitations --format csv --output solicitacoes.csv
+    python -m tools.export_adopt_solicitations --format csv --s3 --segments 8
+"""
+import argparse
+import sys
+
+from services.export_service import export_solicitations, export_solicitations_to_s3, EXPORT_FORMATS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--segments', type=int, default=4, help='Segmentos da varredura paralela (threads)')
+    parser.add_argument('--page-size', type=int, default=None, help='Itens lidos por página em cada segmento')
+    parser.add_argument('--output', help='Arquivo de saída (default: stdout)')
+    parser.add_argument('--s3', action='store_true', help='Envia o export para o bucket via multipart upload')
+    parser.add_argument('--key', help='Chave do objeto no S3 (com --s3)')
+    args = parser.parse_args(argv)
+
+    if args.s3:
+        report = export_solicitations_to_s3(args.format, args.segments, args.page_size, args.key)
+    elif args.output:
+        with open(args.output, 'wb') as output:
+            report = export_solicitations(output, args.format, args.segments, args.page_size)
+    else:
+        report = export_solicitations(sys.stdout.buffer, args.format, args.segments, args.page_size)
+        sys.stdout.flush()
+
+    print(
+        f"{report['items']} itens, {report['bytes']} bytes em {report['seconds']}s "
+        f"({report['items_per_second']} itens/s, {report['segments']} segmentos)"
+        + (f" -> s3 {report['key']}" if 'key' in report else ""),
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Cold-start import profiling per Lambda function.
+
+For every function in serverless.yml, a fresh interpreter is started with
+`python -X importtime`, imports `handler` and then the modules that function
+imports in its own body (the imports the first invocation triggers), plus the
+configured storage backend when the graph reaches `services.storage`, since it
+is loaded on the first repository call. The importtime lines written after that
+point are parsed and summed, so the report shows the import milliseconds of each
+function, how many modules it loads and which packages weigh the most. The
+median of `--runs` runs is used.
+
+`--check` compares the medians with tools/importtime_budget.json and exits with
+status 1 when a function exceeds its budget by more than the tolerance;
+`--update-budget` rewrites the budget from the current measurement. Budgets are
+the measured medians themselves, the tolerance being the only allowance for
+noise, so a regression of that size fails the check. Rewrite them only in
+changes that are about import time (e.g. after removing an import), never to
+make room for a feature: a feature that needs more budget needs a lazy import.
+
+Usage (from the chatbot-serverless folder):
+    python -m tools.importtime
+    python -m tools.importtime --runs 7 --check
+    python -m tools.importtime --function webhook_handler --tree 20
+    python -m tools.importtime --update-budget
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'importtime_budget.json')
+MARKER = 'importtime-profile-start'
+# written by -X importtime as "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+
+
+def lambda_functions(path=os.path.join(ROOT, 'serverless.yml')):
+    """Returns the handler functions of serverless.yml (e.g. 'apiGetPets'), in file order."""
+    with open(path, encoding='utf-8') as file:
+        return re.findall(r'^\s+handler:\s*handler\.(\w+)\s*$', file.read(), re.MULTILINE)
+
+
+def function_imports(function, path=os.path.join(ROOT, 'handler.py')):
+    """Returns the modules imported inside the body of a function of handler.py."""
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == function:
+            modules = []
+            for child in ast.walk(node):
+                if isinstance(child, ast.ImportFrom) and child.module:
+                    modules.append(child.module)
+                elif isinstance(child, ast.Import):
+                    modules.extend(alias.name for alias in child.names)
+            return list(dict.fromkeys(modules))
+    raise ValueError(f"handler.py has no function '{function}'")
+
+
+def profile_code(function):
+    imports = ''.join(f'import {module}\n' for module in function_imports(function))
+    return (
+        'import sys\n'
+        f'sys.stderr.write("{MARKER}\\n"); sys.stderr.flush()\n'
+        'import handler\n'
+        f'{imports}'
+        'if "services.storage" in sys.modules:\n'
+        '    import services.storage\n'
+        '    __import__(f"services.storage.{services.storage.STORAGE_BACKEND}_backend")\n'
+        f'handler.{function}\n'
+    )
+
+
+def parse_importtime(stderr):
+    """
+    Parses the -X importtime output written after the start marker.
+
+    Returns:
+        list: (level, module, self_us, cumulative_us) tuples, in output order.
+    """
+    entries = []
+    started = False
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            started = True
+            continue
+        match = IMPORT_LINE.match(line)
+        if started and match:
+            self_us, cumulative_us, indent, module = match.groups()
+            # one space follows the '|', then two per nesting level
+            entries.append(((len(indent) - 1) // 2, module, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_function(function, env=None):
+    """Imports the graph of one function in a fresh interpreter and returns its parsed entries."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', profile_code(function)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {function} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def summarize(entries, top=3):
+    packages = {}
+    for _, module, self_us, _ in entries:
+        root = module.split('.')[0]
+        packages[root] = packages.get(root, 0) + self_us
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'ms': sum(cumulative for level, _, _, cumulative in entries if level == 0) / 1000,
+        'modules': len(entries),
+        'heaviest': [(package, round(us / 1000, 1)) for package, us in heaviest],
+    }
+
+
+def profile(functions, runs=5, env=None):
+    """
+    Measures every function `runs` times (after one warm-up run that compiles the bytecode).
+
+    Returns:
+        dict: function -> {'ms': median, 'runs': [...], 'modules': n, 'heaviest': [(package, ms)], 'entries': [...]}
+    """
+    report = {}
+    for function in functions:
+        measure_function(function, env)
+        samples = [measure_function(function, env) for _ in range(runs)]
+        summaries = [summarize(entries) for entries in samples]
+        median = statistics.median(summary['ms'] for summary in summaries)
+        closest = min(range(runs), key=lambda index: abs(summaries[index]['ms'] - median))
+        report[function] = dict(
+            summaries[closest], ms=round(median, 1),
+            runs=[round(summary['ms'], 1) for summary in summaries],
+            entries=samples[closest]
+        )
+    return report
+
+
+def load_budget(path=BUDGET_PATH):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def check_budget(report, budget):
+    """Returns the (function, ms, limit) of the functions over budget * (1 + tolerance)."""
+    tolerance = budget.get('tolerance', 0.0)
+    failures = []
+    for function, result in report.items():
+        limit = budget.get('functions', {}).get(function)
+        if limit is None:
+            continue
+        if result['ms'] > limit * (1 + tolerance):
+            failures.append((function, result['ms'], limit))
+    return failures
+
+
+def write_budget(report, path=BUDGET_PATH, tolerance=0.25):
+    budget = {
+        'tolerance': tolerance,
+        'functions': {function: round(result['ms']) for function, result in report.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(budget, file, indent=2)
+        file.write('\n')
+    return budget
+
+
+def print_report(report, budget=None):
+    limits = (budget or {}).get('functions', {})
+    print(f"{'function':<32}{'import ms':>10}{'budget':>8}{'modules':>9}  heaviest packages (self ms)")
+    for function, result in report.items():
+        heaviest = ', '.join(f"{package} {ms}" for package, ms in result['heaviest'])
+        limit = limits.get(function)
+        print(f"{function:<32}{result['ms']:>10.1f}{limit if limit is not None else '-':>8}{result['modules']:>9}  {heaviest}")
+
+
+def print_tree(function, entries, limit):
+    print(f"\n{function}: top {limit} imports by cumulative time")
+    print(f"{'cumulative ms':>14}{'self ms':>9}  module")
+    for level, module, self_us, cumulative_us in sorted(entries, key=lambda entry: entry[3], reverse=True)[:limit]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>9.1f}  {'  ' * level}{module}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--function', action='append', help='Only this function (repeatable; default: every function of serverless.yml)')
+    parser.add_argument('--runs', type=int, default=5, help='Measured runs per function; the median is reported')
+    parser.add_argument('--tree', type=int, default=0, metavar='N', help='Also list the N heaviest imports of each function')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 when a function exceeds its budget')
+    parser.add_argument('--update-budget', action='store_true', help=f'Rewrite {os.path.relpath(BUDGET_PATH, ROOT)} from this run')
+    parser.add_argument('--budget', default=BUDGET_PATH)
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    # the service modules create their boto3 clients at import time, which needs a region
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    report = profile(args.function or lambda_functions(), max(args.runs, 1), env)
+    budget = write_budget(report, args.budget) if args.update_budget else (
+        load_budget(args.budget) if os.path.exists(args.budget) else None)
+
+    if args.json:
+        print(json.dumps({function: {key: value for key, value in result.items() if key != 'entries'}
+                          for function, result in report.items()}, indent=2))
+    else:
+        print_report(report, budget)
+        for function, result in report.items():
+            if args.tree:
+                print_tree(function, result['entries'], args.tree)
+
+    if args.check:
+        if budget is None:
+            raise SystemExit(f"No budget file at {args.budget}: run with --update-budget first")
+        failures = check_budget(report, budget)
+        for function, ms, limit in failures:
+            print(f"REGRESSION {function}: {ms:.1f} ms > budget {limit} ms (+{budget.get('tolerance', 0):.0%} tolerance)",
+                  file=sys.stderr)
+        if failures:
+            raise SystemExit(1)
+        print('Import times within budget', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,591 @@
+"""
+Local simulator of the Aumigo Lex V2 bot.
+
+Loads the exported bot definition (aumigo/*-LexJson.zip, or the extracted
+folder), classifies each message into an intent from its sample utterances,
+elicits the required slots with the bot's own prompts, asks the confirmation
+prompts (following their StartIntent next steps) and calls the code hook
+(normally `handler.lex_handler`) as Lex would:
+  - DialogCodeHook on every turn of intents with `dialogCodeHook.enabled`;
+  - FulfillmentCodeHook once the required slots are filled.
+The visual conversation-flow code-hook steps are not simulated.
+
+`LexSimulator.recognize_text` accepts and returns the same shapes as the
+lexv2-runtime client, so it can replace Lex in `webhook_service` (see
+`tools.local_clients.install_local_clients(lex_bot=...)`).
+
+Usage (from the chatbot-serverless folder):
+    python -m tools.lex_simulator                      # interactive chat through the webhook
+    python -m tools.lex_simulator --script turns.txt   # one message per line
+    python -m tools.lex_simulator --direct             # talk to the simulator, without the webhook
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import unicodedata
+import zipfile
+from urllib.parse import urlencode
+
+DEFAULT_BOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'aumigo')
+DEFAULT_LOCALE = 'pt_BR'
+
+YES_WORDS = {'sim', 's', 'yes', 'claro', 'tenho', 'possuo', 'ja', 'isso', 'ok', 'positivo'}
+NO_WORDS = {'nao', 'n', 'no', 'nunca', 'negativo', 'ainda'}
+
+# prompts are repeated this many times before the intent fails (Lex default)
+DEFAULT_MAX_RETRIES = 2
+
+
+def normalize(text):
+    """Lowercase, accents removed, punctuation dropped (except inside numbers, e-mails and 'a - b')."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    text = re.sub(r'(?<!\d)[.,](?!\d)|[^\w\s.,@-]', ' ', text)
+    text = re.sub(r'(?:^|\s)-+(?:\s|$)', ' ', text)
+    return ' '.join(text.split())
+
+
+# ---------------------------------------------------------------------------
+# Bot definition
+# ---------------------------------------------------------------------------
+
+def _read_export(path):
+    """Returns {relative path: parsed JSON} of an exported bot (zip file or extracted folder)."""
+    if os.path.isdir(path):
+        zips = glob.glob(os.path.join(path, '*LexJson.zip'))
+        if zips:
+            path = zips[0]
+        else:
+            files = {}
+            for name in glob.glob(os.path.join(path, '**', '*.json'), recursive=True):
+                with open(name, encoding='utf-8') as source:
+                    files[os.path.relpath(name, path).replace(os.sep, '/')] = json.load(source)
+            return files
+
+    with zipfile.ZipFile(path) as archive:
+        return {
+            name: json.loads(archive.read(name).decode('utf-8'))
+            for name in archive.namelist() if name.endswith('.json')
+        }
+
+
+def _plain_messages(message_groups):
+    """Plain-text/custom-payload messages of a messageGroupsList (first message of each group)."""
+    messages = []
+    for group in message_groups or []:
+        message = group.get('message') or {}
+        if message.get('plainTextMessage'):
+            messages.append({'contentType': 'PlainText', 'content': message['plainTextMessage']['value']})
+        elif message.get('customPayload'):
+            messages.append({'contentType': 'CustomPayload', 'content': message['customPayload']['value']})
+    return messages
+
+
+def _next_step(step):
+    """(dialog action type, target intent) of a Lex next-step specification."""
+    step = step or {}
+    return ((step.get('dialogAction') or {}).get('type'), (step.get('intent') or {}).get('name'))
+
+
+class IntentDefinition:
+
+    def __init__(self, definition, slots):
+        self.name = definition['name']
+        self.utterances = [u['utterance'] for u in definition.get('sampleUtterances') or []]
+        self.dialog_code_hook = bool((definition.get('dialogCodeHook') or {}).get('enabled'))
+        self.fulfillment_code_hook = bool((definition.get('fulfillmentCodeHook') or {}).get('enabled'))
+
+        priorities = sorted(definition.get('slotPriorities') or [], key=lambda entry: entry['priority'])
+        by_name = {slot['name']: slot for slot in slots}
+        ordered = [entry['slotName'] for entry in priorities]
+        self.slot_order = ordered + [name for name in by_name if name not in ordered]
+        self.slots = {}
+        for name in self.slot_order:
+            elicitation = by_name[name].get('valueElicitationSetting') or {}
+            prompt = elicitation.get('promptSpecification') or {}
+            self.slots[name] = {
+                'type': by_name[name].get('slotTypeName'),
+                'required': elicitation.get('slotConstraint') == 'Required',
+                'prompt': _plain_messages(prompt.get('messageGroupsList')),
+                'max_retries': prompt.get('maxRetries', DEFAULT_MAX_RETRIES),
+            }
+
+        initial = definition.get('initialResponseSetting') or {}
+        self.initial_messages = _plain_messages((initial.get('initialResponse') or {}).get('messageGroupsList'))
+        self.ends_after_initial = _next_step(initial.get('nextStep'))[0] == 'EndConversation'
+
+        confirmation = definition.get('intentConfirmationSetting') or {}
+        self.confirmation = None
+        if confirmation.get('isActive'):
+            prompt = confirmation.get('promptSpecification') or {}
+            self.confirmation = {
+                'prompt': _plain_messages(prompt.get('messageGroupsList')),
+                'max_retries': prompt.get('maxRetries', DEFAULT_MAX_RETRIES),
+                'confirmed': _next_step(confirmation.get('confirmationNextStep')),
+                'declined': _next_step(confirmation.get('declinationNextStep')),
+                'declined_messages': _plain_messages((confirmation.get('declinationResponse') or {}).get('messageGroupsList')),
+            }
+
+        closing = definition.get('intentClosingSetting') or {}
+        self.closing_messages = []
+        if closing.get('isActive'):
+            self.closing_messages = _plain_messages((closing.get('closingResponse') or {}).get('messageGroupsList'))
+
+        self._patterns = [self._compile(utterance) for utterance in self.utterances]
+
+    @staticmethod
+    def _compile(utterance):
+        """(regex, slot names, tokens) of a sample utterance; utterances with {slot} become regexes."""
+        slot_names = re.findall(r'\{([^}]+)\}', utterance)
+        if not slot_names:
+            return None, [], set(normalize(utterance).split())
+
+        parts = re.split(r'\{[^}]+\}', utterance)
+        pattern = r'(.+?)'.join(re.escape(normalize(part)).replace(r'\ ', r'\s*') for part in parts)
+        return re.compile(r'^\s*' + pattern + r'\s*$'), slot_names, set()
+
+    def match(self, text):
+        """Returns (score 0-1, extracted slot texts) of the message against the sample utterances."""
+        normalized = normalize(text)
+        tokens = set(normalized.split())
+        best = (0.0, {})
+        for utterance, (regex, slot_names, utterance_tokens) in zip(self.utterances, self._patterns):
+            if regex is not None:
+                found = regex.match(normalized)
+                if found:
+                    return 1.0, dict(zip(slot_names, (value.strip() for value in found.groups())))
+                continue
+            if normalized == normalize(utterance):
+                return 1.0, {}
+            if tokens and utterance_tokens:
+                score = len(tokens & utterance_tokens) / len(tokens | utterance_tokens)
+                if score > best[0]:
+                    best = (score, {})
+        return best
+
+
+class LexBot:
+    """Intents, slots and slot types of one locale of the exported bot."""
+
+    def __init__(self, files, locale=DEFAULT_LOCALE):
+        prefix = next(name.split('/BotLocales/')[0] for name in files if '/BotLocales/' in name)
+        locale_prefix = f"{prefix}/BotLocales/{locale}/"
+
+        locale_definition = files.get(locale_prefix + 'BotLocale.json', {})
+        self.locale = locale
+        self.confidence_threshold = locale_definition.get('nluConfidenceThreshold') or 0.4
+
+        self.slot_types = {}
+        for name, content in files.items():
+            if name.startswith(locale_prefix + 'SlotTypes/') and name.endswith('/SlotType.json'):
+                self.slot_types[content['name']] = {
+                    'strategy': (content.get('valueSelectionSetting') or {}).get('resolutionStrategy'),
+                    'values': {
+                        normalize(synonym): value['sampleValue']['value']
+                        for value in content.get('slotTypeValues') or []
+                        for synonym in [value['sampleValue']['value']]
+                        + [entry['value'] for entry in value.get('synonyms') or []]
+                    },
+                }
+
+        self.intents = {}
+        for name, content in files.items():
+            if name.startswith(locale_prefix + 'Intents/') and name.endswith('/Intent.json'):
+                folder = name[:-len('Intent.json')]
+                slots = [
+                    slot for slot_name, slot in files.items()
+                    if slot_name.startswith(folder + 'Slots/') and slot_name.endswith('/Slot.json')
+                ]
+                self.intents[content['name']] = IntentDefinition(content, slots)
+
+    def classify(self, text):
+        """Returns (intent, score, extracted slot texts); FallbackIntent below the confidence threshold."""
+        best = (None, 0.0, {})
+        for intent in self.intents.values():
+            score, slots = intent.match(text)
+            if score > best[1]:
+                best = (intent, score, slots)
+
+        if best[1] < self.confidence_threshold:
+            return self.intents.get('FallbackIntent'), 1.0, {}
+        return best
+
+    def resolve_slot(self, slot_type, text):
+        """Resolves a slot value as the built-in or custom slot type would; None when it does not fit."""
+        text = (text or '').strip()
+        if not text:
+            return None
+
+        if slot_type == 'AMAZON.Number':
+            found = re.search(r'-?\d+(?:[.,]\d+)?', text)
+            return found.group().replace(',', '.') if found else None
+        if slot_type == 'AMAZON.PhoneNumber':
+            digits = re.sub(r'\D', '', text)
+            return digits if len(digits) >= 8 else None
+        if slot_type == 'AMAZON.EmailAddress':
+            found = re.search(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+', text)
+            return found.group().lower() if found else None
+        if slot_type == 'AMAZON.FirstName':
+            return text.split()[0].capitalize()
+        if slot_type in self.slot_types:
+            slot_definition = self.slot_types[slot_type]
+            value = slot_definition['values'].get(normalize(text))
+            if value is None and slot_definition['strategy'] == 'ORIGINAL_VALUE':
+                return text
+            return value
+        # AMAZON.FreeFormInput, AMAZON.AlphaNumeric and other built-ins keep the text
+        return text
+
+
+def load_bot(path=None, locale=DEFAULT_LOCALE):
+    """Loads the exported bot (zip or folder; default: the export in the repository's aumigo folder)."""
+    return LexBot(_read_export(path or DEFAULT_BOT_PATH), locale)
+
+
+# ---------------------------------------------------------------------------
+# Dialog
+# ---------------------------------------------------------------------------
+
+class LexSimulator:
+    """
+    Runs the dialog of a `LexBot`, keeping the dialog state per session like Lex does.
+
+    Args:
+        bot (LexBot): Loaded bot definition.
+        code_hook (callable, optional): Lambda code hook, `code_hook(event, context)`.
+    """
+
+    def __init__(self, bot, code_hook=None, bot_id='LOCAL', bot_alias_id='LOCAL'):
+        self.bot = bot
+        self.code_hook = code_hook
+        self.bot_id = bot_id
+        self.bot_alias_id = bot_alias_id
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def reset(self, session_id=None):
+        """Forgets the dialog state of one session (or of all of them)."""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def recognize_text(self, sessionId, text, sessionState=None, botId=None, botAliasId=None, localeId=None, **kwargs):
+        """Same request and response shape as lexv2-runtime `recognize_text`."""
+        with self._lock:
+            session = self._sessions.setdefault(sessionId, {'intent': None, 'attributes': {}})
+        if sessionState and sessionState.get('sessionAttributes') is not None:
+            session['attributes'] = dict(sessionState['sessionAttributes'])
+
+        turn = {'messages': [], 'interpretation': None, 'text': text}
+        self._turn(session, sessionId, text, turn)
+
+        dialog = session['intent']
+        intent_state = dialog or session.get('last_intent') or {}
+        return {
+            'sessionId': sessionId,
+            'messages': turn['messages'],
+            'sessionState': {
+                'dialogAction': session.get('dialog_action', {'type': 'Close'}),
+                'intent': {
+                    'name': intent_state.get('name'),
+                    'slots': intent_state.get('slots', {}),
+                    'state': intent_state.get('state', 'InProgress'),
+                    'confirmationState': intent_state.get('confirmationState', 'None'),
+                },
+                'sessionAttributes': session['attributes'],
+            },
+            'interpretations': [turn['interpretation']] if turn['interpretation'] else [],
+            'requestAttributes': {},
+        }
+
+    # -- dialog steps -------------------------------------------------------
+
+    def _turn(self, session, session_id, text, turn):
+        dialog = session['intent']
+
+        if dialog and dialog.get('awaiting') == 'confirmation':
+            answer = self._yes_no(text)
+            if answer is None:
+                return self._retry(session, session_id, turn, dialog['definition'].confirmation['prompt'],
+                                   dialog['definition'].confirmation['max_retries'], {'type': 'ConfirmIntent'})
+            dialog['confirmationState'] = 'Confirmed' if answer else 'Denied'
+            dialog['awaiting'] = None
+            action, target = dialog['definition'].confirmation['confirmed' if answer else 'declined']
+            if action == 'StartIntent' and target:
+                return self._start(session, session_id, self.bot.intents[target], {}, 1.0, text, turn)
+            if not answer:
+                turn['messages'].extend(dialog['definition'].confirmation['declined_messages'])
+                return self._close(session, 'Failed')
+            return self._advance(session, session_id, text, turn)
+
+        if dialog and dialog.get('awaiting') == 'slot':
+            slot_name = dialog['slot_to_elicit']
+            slot = dialog['definition'].slots.get(slot_name, {'type': None})
+            intent, score, extracted = self.bot.classify(text)
+            # messages that fully match another intent's template (e.g. the image analysis) interrupt the slot
+            if intent is not None and intent.name != dialog['name'] and score == 1.0 and extracted:
+                return self._start(session, session_id, intent, extracted, score, text, turn)
+
+            value = self.bot.resolve_slot(slot['type'], text)
+            if value is None:
+                return self._retry(session, session_id, turn, slot.get('prompt', []), slot.get('max_retries', DEFAULT_MAX_RETRIES),
+                                   {'type': 'ElicitSlot', 'slotToElicit': slot_name})
+            dialog['slots'][slot_name] = self._slot_value(text, value)
+            dialog['awaiting'] = None
+            dialog['retries'] = 0
+            return self._advance(session, session_id, text, turn)
+
+        intent, score, extracted = self.bot.classify(text)
+        if intent is None:
+            session['dialog_action'] = {'type': 'ElicitIntent'}
+            return None
+        return self._start(session, session_id, intent, extracted, score, text, turn)
+
+    def _start(self, session, session_id, definition, extracted, score, text, turn):
+        slots = {name: None for name in definition.slot_order}
+        for name, raw in extracted.items():
+            value = self.bot.resolve_slot(definition.slots.get(name, {}).get('type'), raw)
+            if value is not None:
+                slots[name] = self._slot_value(raw, value)
+
+        session['intent'] = {
+            'name': definition.name,
+            'definition': definition,
+            'slots': slots,
+            'state': 'InProgress',
+            'confirmationState': 'None',
+            'awaiting': None,
+            'retries': 0,
+        }
+        turn['interpretation'] = {
+            'intent': {'name': definition.name, 'slots': slots, 'state': 'InProgress', 'confirmationState': 'None'},
+            'nluConfidence': {'score': round(score, 2)},
+        }
+        turn['messages'].extend(definition.initial_messages)
+
+        if definition.ends_after_initial:
+            return self._close(session, 'Fulfilled')
+        return self._advance(session, session_id, text, turn)
+
+    def _advance(self, session, session_id, text, turn):
+        dialog = session['intent']
+        definition = dialog['definition']
+
+        if definition.dialog_code_hook and self.code_hook:
+            if not self._invoke(session, session_id, text, turn, 'DialogCodeHook'):
+                return None
+
+        missing = [name for name in definition.slot_order
+                   if definition.slots[name]['required'] and not dialog['slots'].get(name)]
+        if missing:
+            return self._elicit(session, turn, missing[0])
+
+        if definition.confirmation and dialog['confirmationState'] == 'None':
+            dialog['awaiting'] = 'confirmation'
+            session['dialog_action'] = {'type': 'ConfirmIntent'}
+            turn['messages'].extend(definition.confirmation['prompt'])
+            return None
+
+        dialog['state'] = 'ReadyForFulfillment'
+        if definition.fulfillment_code_hook and self.code_hook:
+            if not self._invoke(session, session_id, text, turn, 'FulfillmentCodeHook'):
+                return None
+
+        turn['messages'].extend(definition.closing_messages)
+        return self._close(session, 'Fulfilled')
+
+    def _elicit(self, session, turn, slot_name, messages=None):
+        dialog = session['intent']
+        dialog['awaiting'] = 'slot'
+        dialog['slot_to_elicit'] = slot_name
+        session['dialog_action'] = {'type': 'ElicitSlot', 'slotToElicit': slot_name}
+        if messages is None:
+            messages = dialog['definition'].slots.get(slot_name, {}).get('prompt', [])
+        turn['messages'].extend(messages)
+        return None
+
+    def _retry(self, session, session_id, turn, prompt, max_retries, dialog_action):
+        dialog = session['intent']
+        dialog['retries'] = dialog.get('retries', 0) + 1
+        if dialog['retries'] > max_retries:
+            return self._close(session, 'Failed')
+        session['dialog_action'] = dialog_action
+        turn['messages'].extend(prompt)
+        return None
+
+    def _close(self, session, state):
+        dialog = session['intent'] or {}
+        session['last_intent'] = {key: dialog.get(key) for key in ('name', 'slots', 'confirmationState')}
+        session['last_intent']['state'] = state
+        session['intent'] = None
+        session['dialog_action'] = {'type': 'Close'}
+        return None
+
+    def _invoke(self, session, session_id, text, turn, source):
+        """
+        Calls the code hook and applies its dialog action. Returns True when the
+        simulator should go on with its own dialog management (Delegate).
+        """
+        dialog = session['intent']
+        event = {
+            'messageVersion': '1.0',
+            'invocationSource': source,
+            'inputMode': 'Text',
+            'responseContentType': 'text/plain; charset=utf-8',
+            'sessionId': session_id,
+            'inputTranscript': text,
+            'bot': {'id': self.bot_id, 'name': 'Aumigo', 'aliasId': self.bot_alias_id,
+                    'localeId': self.bot.locale, 'version': 'DRAFT'},
+            'interpretations': [turn['interpretation']] if turn['interpretation'] else [],
+            'sessionState': {
+                'sessionAttributes': dict(session['attributes']),
+                'activeContexts': [],
+                'intent': {
+                    'name': dialog['name'],
+                    'slots': dict(dialog['slots']),
+                    'state': dialog['state'],
+                    'confirmationState': dialog['confirmationState'],
+                },
+            },
+            'requestAttributes': {},
+        }
+        response = self.code_hook(event, None) or {}
+
+        session_state = response.get('sessionState') or {}
+        if session_state.get('sessionAttributes') is not None:
+            session['attributes'] = session_state['sessionAttributes']
+        returned_intent = session_state.get('intent') or {}
+        for name, value in (returned_intent.get('slots') or {}).items():
+            dialog['slots'][name] = value
+        messages = response.get('messages') or []
+
+        action = (session_state.get('dialogAction') or {}).get('type', 'Delegate')
+        if action == 'Delegate':
+            turn['messages'].extend(messages)
+            return True
+        if action == 'ElicitSlot':
+            self._elicit(session, turn, session_state['dialogAction'].get('slotToElicit'), messages)
+            return False
+        if action == 'ConfirmIntent':
+            dialog['awaiting'] = 'confirmation'
+            session['dialog_action'] = {'type': 'ConfirmIntent'}
+            turn['messages'].extend(messages)
+            return False
+        if action == 'ElicitIntent':
+            turn['messages'].extend(messages)
+            session['intent'] = None
+            session['dialog_action'] = {'type': 'ElicitIntent'}
+            return False
+
+        # Close
+        turn['messages'].extend(messages)
+        self._close(session, returned_intent.get('state') or 'Fulfilled')
+        return False
+
+    @staticmethod
+    def _slot_value(original, interpreted):
+        return {'value': {'originalValue': original, 'interpretedValue': interpreted, 'resolvedValues': [interpreted]}}
+
+    @staticmethod
+    def _yes_no(text):
+        tokens = set(normalize(text).split())
+        if tokens & NO_WORDS:
+            return False
+        if tokens & YES_WORDS:
+            return True
+        return None
+
+
+def create_simulator(path=None, code_hook=None):
+    """Loads the bot and returns a simulator that calls `code_hook` (default: handler.lex_handler)."""
+    if code_hook is None:
+        from handler import lex_handler as code_hook
+    return LexSimulator(load_bot(path), code_hook)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _print_reply(reply):
+    for message in reply.get('messages', []):
+        print(f"bot> {message.get('content')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bot', help='Exported bot zip or folder (default: the aumigo folder of the repository)')
+    parser.add_argument('--script', help='File with one user message per line (default: interactive)')
+    parser.add_argument('--phone', default='5511987654321', help='WhatsApp number of the simulated user')
+    parser.add_argument('--direct', action='store_true', help='Talk to the simulator directly, without the webhook')
+    parser.add_argument('--verbose', action='store_true', help='Keep the handler prints and logs')
+    args = parser.parse_args(argv)
+
+    # run the whole pipeline locally: in-memory storage and local AWS stand-ins
+    os.environ.setdefault('STORAGE_BACKEND', 'memory')
+    os.environ.setdefault('S3_BUCKET_NAME', 'local-bucket')
+    os.environ.setdefault('BUCKET_NAME', 'local-bucket')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    from services.storage import get_storage
+    from tools.local_clients import install_local_clients, seed_storage
+
+    bot = load_bot(args.bot)
+    simulator = LexSimulator(bot)
+    install_local_clients(lex_bot=simulator)
+    seed_storage(get_storage())
+
+    import handler
+    simulator.code_hook = handler.lex_handler
+
+    if args.script:
+        with open(args.script, encoding='utf-8') as script:
+            lines = [line.rstrip('\n') for line in script if line.strip()]
+    else:
+        lines = None
+
+    def send(text):
+        if args.direct:
+            return simulator.recognize_text(sessionId=args.phone, text=text)
+        body = urlencode({'Body': text, 'From': f'whatsapp:+{args.phone}'})
+        return handler.webhook_handler({'body': body, 'headers': {}}, None)
+
+    def chat(text):
+        if args.verbose:
+            reply = send(text)
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                reply = send(text)
+        if args.direct:
+            _print_reply(reply)
+        else:
+            print(f"bot> {reply.get('body')}")
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if lines is not None:
+        for text in lines:
+            print(f"you> {text}")
+            chat(text)
+        return 0
+
+    try:
+        while True:
+            chat(input('you> '))
+    except (EOFError, KeyboardInterrupt):
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
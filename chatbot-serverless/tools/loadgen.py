@@ -0,0 +1,394 @@
+"""
+Load generator for the WhatsApp webhook (handler.webhook_handler).
+
+Replays recorded Twilio webhook bodies, or synthesizes conversations (text and
+image turns from many `From` numbers), and drives the handler concurrently:
+turns of one number run in order, different numbers run in parallel. Lex is
+replaced by the bot simulator of `tools.lex_simulator` (which calls the intent
+code hooks) or by a fixed echo reply, S3, Rekognition and Polly by the
+in-memory stand-ins of `tools.local_clients`, storage runs on the memory (or
+sqlite) backend seeded with sample pets, and image turns download a small JPEG
+from a local HTTP server, so no AWS or Twilio access is needed. A fixed latency can be added per dependency to emulate the
+network; without it the run measures only our own CPU cost.
+
+With `--record-cassette` the run goes to the real AWS services instead (storage on
+DynamoDB, credentials and table names from the environment; Lex stays local unless
+`--lex aws`) and every AWS and media download call is written to a cassette;
+`--cassette` replays one offline (see `tools.cassette`), with the latencies of
+`--cassette-latency` drawn per call, so webhook_service and the intents run
+against production-shaped responses deterministically.
+
+Every request is signed with TWILIO_AUTH_TOKEN (a fixed test token unless set),
+so the webhook's signature check runs as in production.
+
+Replay files have one request per line, either the raw form-encoded body or a
+JSON object with a `body` string or a `params` dict.
+
+Usage (from the chatbot-serverless folder):
+    python -m tools.loadgen --users 200 --concurrency 16
+    python -m tools.loadgen --users 200 --lex echo
+    python -m tools.loadgen --users 50 --image-ratio 0.3 --latency lexv2-runtime=0.08,dynamodb=0.005
+    python -m tools.loadgen --record /tmp/turns.txt --users 20
+    python -m tools.loadgen --replay /tmp/turns.txt --json
+    python -m tools.loadgen --replay /tmp/turns.txt --concurrency 1 --record-cassette /tmp/turns.cassette.json.gz
+    python -m tools.loadgen --replay /tmp/turns.txt --cassette /tmp/turns.cassette.json.gz \
+        --cassette-latency 'lexv2-runtime=lognormal:0.08:0.3,dynamodb=recorded,*=0.02'
+"""
+import argparse
+import base64
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode
+
+# the handler modules read their configuration at import time
+os.environ.setdefault('STORAGE_BACKEND', 'memory')
+os.environ.setdefault('S3_BUCKET_NAME', 'loadgen-bucket')
+os.environ.setdefault('BUCKET_NAME', 'loadgen-bucket')
+os.environ.setdefault('BOT_ID', 'LOADGEN')
+os.environ.setdefault('BOT_ALIAS_ID', 'LOADGEN')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+# replayed conversations arrive much faster than people type: per-user limits are off unless set
+os.environ.setdefault('RATE_LIMIT_USER_MESSAGES', '')
+os.environ.setdefault('RATE_LIMIT_USER_IMAGES', '')
+# requests are signed like Twilio does, so the webhook runs its signature check
+os.environ.setdefault('TWILIO_ACCOUNT_SID', 'AC' + '0' * 32)
+os.environ.setdefault('TWILIO_AUTH_TOKEN', 'loadgen-auth-token')
+
+# registration, adoption, donation and goodbye, following the bot's dialog; {phone} is the sender's number
+TEXT_TURNS = [
+    'Oi',
+    'Não',
+    'Maria',
+    'maria{phone}@example.com',
+    '{phone}',
+    '30',
+    '1',
+    'Rex - Labrador',
+    '2',
+    '4',
+]
+
+# smallest valid JPEG header followed by padding, about the size of a WhatsApp thumbnail
+# an 8x8 JPEG padded with a 24 KB comment segment, so it decodes (see utils.image_utils) and weighs like a photo thumbnail
+_JPEG_8X8 = base64.b64decode(
+    '/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDABALDA4MChAODQ4SERATGCgaGBYWGDEjJR0oOjM9PDkzODdASFxOQERXRTc4UG1RV19iZ2hnPk1xeXBkeFxlZ2P/'
+    '2wBDARESEhgVGC8aGi9jQjhCY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2P/wAARCAAIAAgDASIAAhEBAxEB/8QA'
+    'HwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkK'
+    'FhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXG'
+    'x8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAEC'
+    'AxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOE'
+    'hYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwDSoooryzsP/9k='
+)
+FAKE_JPEG = _JPEG_8X8[:2] + b'\xff\xfe' + (24 * 1024 + 2).to_bytes(2, 'big') + bytes(24 * 1024) + _JPEG_8X8[2:]
+
+TWILIO_ACCOUNT = os.environ['TWILIO_ACCOUNT_SID']
+WEBHOOK_HOST = 'loadgen.execute-api.us-east-1.amazonaws.com'
+WEBHOOK_PATH = '/dev/webhook'
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    # keep-alive, like Twilio's media hosts, so the downloads reuse their connections
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(FAKE_JPEG)))
+        self.end_headers()
+        self.wfile.write(FAKE_JPEG)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_media_server():
+    """Starts the local server that plays the role of the Twilio media URLs. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _MediaHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def synthesize_body(phone, text=None, media_url=None):
+    """Builds a Twilio WhatsApp webhook body (application/x-www-form-urlencoded)."""
+    params = {
+        'SmsMessageSid': 'SM' + uuid.uuid4().hex,
+        'NumMedia': '1' if media_url else '0',
+        'ProfileName': 'Loadgen',
+        'WaId': phone,
+        'Body': text or '',
+        'To': 'whatsapp:+14155238886',
+        'From': f'whatsapp:+{phone}',
+        'AccountSid': TWILIO_ACCOUNT,
+        'ApiVersion': '2010-04-01',
+    }
+    if media_url:
+        params['MediaContentType0'] = 'image/jpeg'
+        params['MediaUrl0'] = media_url
+    return urlencode(params)
+
+
+def synthesize_conversations(users, turns, image_ratio, media_base_url, seed=None):
+    """
+    Returns one list of bodies per number: `turns` messages each, a share of them images.
+    """
+    rng = random.Random(seed)
+    conversations = []
+    for index in range(users):
+        phone = f"55119{index:08d}"
+        bodies = []
+        for turn in range(turns):
+            if rng.random() < image_ratio:
+                bodies.append(synthesize_body(phone, media_url=f"{media_base_url}/media/{phone}/{turn}.jpg"))
+            else:
+                text = TEXT_TURNS[turn % len(TEXT_TURNS)].format(phone=phone[-11:])
+                bodies.append(synthesize_body(phone, text=text))
+        conversations.append(bodies)
+    return conversations
+
+
+def load_replay(path):
+    """Reads a replay file and groups its bodies by `From`, keeping their order."""
+    conversations = {}
+    with open(path, encoding='utf-8') as replay:
+        for line in replay:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                body = record.get('body') or urlencode(record.get('params', {}))
+            else:
+                body = line
+            sender = parse_qs(body).get('From', [''])[0]
+            conversations.setdefault(sender, []).append(body)
+    return list(conversations.values())
+
+
+def build_event(body):
+    """
+    API Gateway proxy event for a webhook body, signed with TWILIO_AUTH_TOKEN.
+    """
+    from utils.twilio_utils import compute_signature
+
+    signature = compute_signature(
+        os.environ['TWILIO_AUTH_TOKEN'], f"https://{WEBHOOK_HOST}{WEBHOOK_PATH}", parse_qs(body, keep_blank_values=True)
+    )
+    return {
+        'httpMethod': 'POST',
+        'path': '/webhook',
+        'requestContext': {'path': WEBHOOK_PATH, 'stage': 'dev'},
+        'headers': {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Host': WEBHOOK_HOST,
+            'X-Forwarded-Proto': 'https',
+            'X-Twilio-Signature': signature,
+        },
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+def percentile(samples, percent):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def run(conversations, concurrency, webhook_handler):
+    """
+    Drives the webhook handler with the conversations and returns the report.
+
+    Each conversation runs in order on one worker; up to `concurrency` conversations
+    run at the same time.
+    """
+    from utils.metrics_utils import count_dependency_calls
+    from utils.profiling_utils import get_intent_stats, reset_intent_stats
+
+    reset_intent_stats()
+    latencies = []
+    statuses = {}
+    calls = {}
+    lock = threading.Lock()
+
+    def play(bodies):
+        for body in bodies:
+            with count_dependency_calls() as turn_calls:
+                started = time.perf_counter()
+                try:
+                    status = webhook_handler(build_event(body), None).get('statusCode', 0)
+                except Exception:
+                    status = 'exception'
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed_ms)
+                statuses[status] = statuses.get(status, 0) + 1
+                for service, count in turn_calls.items():
+                    calls[service] = calls.get(service, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(play, conversations))
+    seconds = time.perf_counter() - started
+
+    total = len(latencies)
+    return {
+        'turns': total,
+        'conversations': len(conversations),
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'turns_per_second': round(total / seconds, 1) if seconds else 0.0,
+        'latency_ms': {
+            'avg': round(sum(latencies) / total, 2) if total else 0.0,
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(max(latencies, default=0.0), 2),
+        },
+        'status_codes': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'dependency_calls': dict(sorted(calls.items())),
+        'dependency_calls_per_turn': {
+            service: round(count / total, 2) for service, count in sorted(calls.items())
+        } if total else {},
+        'intents': {
+            name: {key: stats[key] for key in ('count', 'errors', 'p50_ms', 'p95_ms', 'p99_ms')}
+            for name, stats in sorted(get_intent_stats().items())
+        },
+    }
+
+
+def parse_latencies(value):
+    """Parses 'service=seconds,...' (e.g. 'lexv2-runtime=0.08,dynamodb=0.005')."""
+    latencies = {}
+    for entry in filter(None, (value or '').split(',')):
+        service, _, seconds = entry.partition('=')
+        latencies[service.strip()] = float(seconds)
+    return latencies
+
+
+def format_report(report):
+    latency = report['latency_ms']
+    lines = [
+        f"Turns: {report['turns']} ({report['conversations']} conversations, concurrency {report['concurrency']})",
+        f"Duration: {report['seconds']} s | Throughput: {report['turns_per_second']} turns/s",
+        f"Latency (ms): avg {latency['avg']} | p50 {latency['p50']} | p95 {latency['p95']} "
+        f"| p99 {latency['p99']} | max {latency['max']}",
+        f"Status codes: {report['status_codes']}",
+        "Dependency calls (total / per turn):",
+    ]
+    for service, count in report['dependency_calls'].items():
+        lines.append(f"  {service:<14} {count:>8} / {report['dependency_calls_per_turn'][service]}")
+    if report['intents']:
+        lines.append("Intents (count, errors, p50/p95/p99 ms):")
+        for name, stats in report['intents'].items():
+            lines.append(f"  {name:<20} {stats['count']:>6} {stats['errors']:>4}  "
+                         f"{stats['p50_ms']} / {stats['p95_ms']} / {stats['p99_ms']}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100, help='Distinct WhatsApp numbers to synthesize')
+    parser.add_argument('--turns', type=int, default=len(TEXT_TURNS), help='Messages per number')
+    parser.add_argument('--image-ratio', type=float, default=0.1, help='Share of turns that send an image')
+    parser.add_argument('--concurrency', type=int, default=8, help='Conversations played at the same time')
+    parser.add_argument('--replay', help='Replay file instead of synthesized conversations')
+    parser.add_argument('--record', help='Write the synthesized bodies to this file and exit')
+    parser.add_argument('--lex', default='simulator', choices=('simulator', 'echo', 'aws'),
+                        help='Lex stand-in: the bot simulator (runs the intents) or a fixed echo reply; '
+                             "'aws' keeps the real Lex runtime (with a cassette only)")
+    parser.add_argument('--bot', help='Exported bot zip or folder used by the simulator')
+    parser.add_argument('--latency', default='', help="Per-call latency in seconds, e.g. 'lexv2-runtime=0.08,dynamodb=0.005'")
+    parser.add_argument('--storage', default=os.environ['STORAGE_BACKEND'], choices=('memory', 'sqlite'),
+                        help='Storage backend used by the handlers')
+    parser.add_argument('--cassette', help='Replay the AWS and Twilio calls from this cassette')
+    parser.add_argument('--record-cassette', help='Call the real AWS services and record the calls to this cassette')
+    parser.add_argument('--cassette-latency', default='',
+                        help="Per-call latency of replayed calls, e.g. 'lexv2-runtime=lognormal:0.08:0.3,*=recorded'")
+    parser.add_argument('--seed', type=int, help='Random seed of the synthesized conversations and cassette latencies')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--verbose', action='store_true', help='Keep the handler prints and logs')
+    args = parser.parse_args(argv)
+    if args.cassette and args.record_cassette:
+        parser.error('--cassette and --record-cassette are exclusive')
+    if args.lex == 'aws' and not (args.cassette or args.record_cassette):
+        parser.error('--lex aws needs --cassette or --record-cassette')
+
+    server, media_base_url = start_media_server()
+    try:
+        if args.replay:
+            conversations = load_replay(args.replay)
+        else:
+            conversations = synthesize_conversations(args.users, args.turns, args.image_ratio, media_base_url, args.seed)
+
+        if args.record:
+            with open(args.record, 'w', encoding='utf-8') as record:
+                for bodies in conversations:
+                    record.writelines(body + '\n' for body in bodies)
+            print(f"{sum(map(len, conversations))} turns written to {args.record}", file=sys.stderr)
+            return 0
+
+        latencies = parse_latencies(args.latency)
+
+        cassette = None
+        if args.cassette or args.record_cassette:
+            from tools.cassette import Cassette, parse_latency_spec
+
+            if args.cassette:
+                cassette = Cassette.load(args.cassette, parse_latency_spec(args.cassette_latency), args.seed)
+                # the recorded requests name these tables, bucket and bot
+                os.environ.update(cassette.environment)
+            else:
+                cassette = Cassette('record')
+            cassette.install()
+
+        from services.storage import set_storage
+        from utils.client_utils import set_client
+        from tools.local_clients import install_local_clients, count_storage_calls, seed_storage, LocalLexClient
+        from tools.lex_simulator import LexSimulator, load_bot
+
+        simulator = LexSimulator(load_bot(args.bot)) if args.lex == 'simulator' else None
+        if cassette is None:
+            install_local_clients(latencies, lex_bot=simulator)
+            storage = seed_storage(set_storage(args.storage))
+            count_storage_calls(storage, latency=latencies.get('dynamodb', 0.0))
+        else:
+            if args.lex != 'aws':
+                set_client('lexv2-runtime', LocalLexClient(latencies.get('lexv2-runtime', 0.0), bot=simulator))
+            set_storage('dynamodb')
+
+        from handler import webhook_handler, lex_handler
+        if simulator is not None:
+            simulator.code_hook = lex_handler
+
+        if args.verbose:
+            report = run(conversations, args.concurrency, webhook_handler)
+        else:
+            logging.getLogger().setLevel(logging.WARNING)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                report = run(conversations, args.concurrency, webhook_handler)
+    finally:
+        server.shutdown()
+
+    if cassette is not None and args.record_cassette:
+        cassette.save(args.record_cassette)
+        print(f"{len(cassette.interactions)} calls recorded to {args.record_cassette}: {cassette.summary()}",
+              file=sys.stderr)
+    elif cassette is not None:
+        print(f"{cassette.replayed} calls replayed from {args.cassette}", file=sys.stderr)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Local stand-ins for the AWS clients, used by the load generator and other local runs.
+
+Each stand-in implements only the operations the code calls, keeps its state in
+memory, reports every call through `record_dependency_call` (like the real
+clients do through the botocore hooks) and can add a fixed latency per call to
+emulate the network. `install_local_clients()` registers them in
+`utils.client_utils`; it must run before the handler modules are imported.
+"""
+import io
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from utils.client_utils import set_client
+from utils.metrics_utils import record_dependency_call
+
+
+class LocalClient:
+    service_name = None
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def _call(self):
+        record_dependency_call(self.service_name)
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class LocalLexClient(LocalClient):
+    """
+    Lex V2 runtime stand-in. Without a `bot` it replies with a fixed message and
+    keeps the session attributes; with one, `recognize_text` is delegated to it.
+    """
+    service_name = 'lexv2-runtime'
+
+    def __init__(self, latency=0.0, bot=None):
+        super().__init__(latency)
+        self.bot = bot
+
+    def recognize_text(self, botId=None, botAliasId=None, localeId=None, sessionId=None, text='', sessionState=None, **kwargs):
+        self._call()
+        if self.bot is not None:
+            return self.bot.recognize_text(sessionId=sessionId, text=text, sessionState=sessionState or {})
+
+        session_attributes = dict((sessionState or {}).get('sessionAttributes') or {})
+        session_attributes['turns'] = str(int(session_attributes.get('turns', '0')) + 1)
+        return {
+            'sessionId': sessionId,
+            'sessionState': {
+                'dialogAction': {'type': 'ElicitIntent'},
+                'sessionAttributes': session_attributes,
+            },
+            'messages': [{'contentType': 'PlainText', 'content': f"Recebi: {text}"}],
+        }
+
+
+class LocalS3Client(LocalClient):
+    """S3 stand-in keeping the objects in memory, keyed by (bucket, key)."""
+    service_name = 's3'
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.objects = {}
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def _store(self, bucket, key, body, content_type=None):
+        with self._lock:
+            self.objects[(bucket, key)] = {'Body': body, 'ContentType': content_type or 'binary/octet-stream'}
+
+    def _get(self, bucket, key, operation):
+        with self._lock:
+            stored = self.objects.get((bucket, key))
+        if stored is None:
+            raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+        return stored
+
+    def put_object(self, Bucket, Key, Body=b'', ContentType=None, **kwargs):
+        self._call()
+        body = Body.read() if hasattr(Body, 'read') else Body
+        self._store(Bucket, Key, body.encode() if isinstance(body, str) else bytes(body), ContentType)
+        return {'ETag': f'"{uuid.uuid4().hex}"'}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, **kwargs):
+        self._call()
+        self._store(Bucket, Key, Fileobj.read(), (ExtraArgs or {}).get('ContentType'))
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._call()
+        stored = self._get(Bucket, Key, 'GetObject')
+        return {'Body': io.BytesIO(stored['Body']), 'ContentLength': len(stored['Body']),
+                'ContentType': stored['ContentType']}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call()
+        stored = self._get(Bucket, Key, 'HeadObject')
+        return {'ContentLength': len(stored['Body']), 'ContentType': stored['ContentType']}
+
+    def generate_presigned_url(self, ClientMethod, Params=None, ExpiresIn=3600, **kwargs):
+        # signing is local in boto3 as well: no call is recorded
+        params = Params or {}
+        return f"https://{params.get('Bucket')}.s3.local/{params.get('Key')}?X-Amz-Expires={ExpiresIn}"
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, **kwargs):
+        self._call()
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {'ContentType': ContentType, 'parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._call()
+        with self._lock:
+            self._uploads[UploadId]['parts'][PartNumber] = bytes(Body)
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload=None, **kwargs):
+        self._call()
+        with self._lock:
+            upload = self._uploads.pop(UploadId)
+        body = b''.join(upload['parts'][number] for number in sorted(upload['parts']))
+        self._store(Bucket, Key, body, upload['ContentType'])
+        return {'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._call()
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+
+class LocalRekognitionClient(LocalClient):
+    """Rekognition stand-in that always sees a Labrador."""
+    service_name = 'rekognition'
+
+    LABELS = [
+        {'Name': 'Dog', 'Confidence': 98.7, 'Parents': [{'Name': 'Animal'}, {'Name': 'Pet'}]},
+        {'Name': 'Labrador Retriever', 'Confidence': 91.2, 'Parents': [{'Name': 'Dog'}]},
+        {'Name': 'Animal', 'Confidence': 98.7, 'Parents': []},
+    ]
+
+    def detect_labels(self, Image=None, MaxLabels=None, MinConfidence=None, **kwargs):
+        self._call()
+        return {'Labels': [dict(label) for label in self.LABELS]}
+
+
+class LocalPollyClient(LocalClient):
+    """Polly stand-in returning silent audio sized like real speech in each format (~2 KB per 10 characters in MP3)."""
+    service_name = 'polly'
+
+    # approximate bytes per character of Portuguese speech (~15 characters per second)
+    BYTES_PER_CHARACTER = {'mp3': 200, 'ogg_vorbis': 110, 'ogg_opus': 55, 'pcm': 2100}
+
+    def synthesize_speech(self, Text='', OutputFormat='mp3', VoiceId=None, **kwargs):
+        self._call()
+        content_type = {'mp3': 'audio/mpeg', 'ogg_vorbis': 'audio/ogg', 'ogg_opus': 'audio/ogg', 'pcm': 'audio/pcm'}.get(OutputFormat)
+        size = self.BYTES_PER_CHARACTER.get(OutputFormat, 200) * max(len(Text), 1)
+        return {'AudioStream': io.BytesIO(bytes(size)), 'ContentType': content_type}
+
+
+class CountingRepository:
+    """Proxy of a storage repository that records each call as a call to `service`."""
+
+    def __init__(self, repository, service='dynamodb', latency=0.0):
+        self._repository = repository
+        self._service = service
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attribute = getattr(self._repository, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            record_dependency_call(self._service)
+            if self._latency:
+                time.sleep(self._latency)
+            return attribute(*args, **kwargs)
+        return counted
+
+
+def count_storage_calls(storage, service='dynamodb', latency=0.0):
+    """Wraps the repositories of a non-AWS backend so its calls are counted (and delayed) like DynamoDB calls."""
+    for name in ('pets', 'users', 'solicitations', 'sessions', 'images'):
+        setattr(storage, name, CountingRepository(getattr(storage, name), service, latency))
+    return storage
+
+
+SAMPLE_PETS = [
+    ('Rex', 'Cachorro', 'Labrador', 3),
+    ('Mel', 'Cachorro', 'Poodle', 5),
+    ('Thor', 'Cachorro', 'Pastor Alemão', 2),
+    ('Luna', 'Cachorro', 'Husky', 1),
+    ('Bob', 'Cachorro', 'Pug', 4),
+    ('Nina', 'Gato', 'Siamês', 2),
+]
+
+
+def seed_storage(storage, pets=SAMPLE_PETS):
+    """Adds the sample pets (name, species, breed, age) to an empty local backend."""
+    if storage.pets.list_all():
+        return storage
+    for index, (name, specie, breed, age) in enumerate(pets):
+        storage.pets.put({
+            'id': f"pet-{index:04d}",
+            'nome': name,
+            'especie': specie,
+            'raça': breed,
+            'idade': age,
+            'disponivel': True,
+        })
+    return storage
+
+
+def install_local_clients(latencies=None, lex_bot=None):
+    """
+    Registers the stand-ins in `utils.client_utils`.
+
+    Args:
+        latencies (dict, optional): service -> seconds added to every call.
+        lex_bot (object, optional): Object with `recognize_text` that replaces the fixed Lex reply.
+
+    Returns:
+        dict: service -> stand-in client.
+    """
+    latencies = latencies or {}
+    clients = {
+        'lexv2-runtime': LocalLexClient(latencies.get('lexv2-runtime', 0.0), bot=lex_bot),
+        's3': LocalS3Client(latencies.get('s3', 0.0)),
+        'rekognition': LocalRekognitionClient(latencies.get('rekognition', 0.0)),
+        'polly': LocalPollyClient(latencies.get('polly', 0.0)),
+    }
+    for service, client in clients.items():
+        set_client(service, client)
+    return clients
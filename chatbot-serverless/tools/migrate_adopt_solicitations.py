@@ -0,0 +1,105 @@
+"""
+Migra solicitações de adoção do formato antigo ('embedded') para o formato 'reference'.
+
+No formato antigo cada solicitação carrega cópias completas do pet e do usuário.
+A migração reescreve essas linhas guardando apenas `petId`, `userId` e a projeção
+usada na listagem. A escrita é condicional, então linhas já migradas (ou alteradas
+por outra execução) não são sobrescritas.
+
+Uso (a partir da pasta chatbot-serverless):
+    python -m tools.migrate_adopt_solicitations --dry-run
+    python -m tools.migrate_adopt_solicitations --page-size 200
+"""
+import argparse
+import sys
+
+from services.dynamo.adopt_solicitations import project, PET_PROJECTION, USER_PROJECTION
+from services.storage.dynamodb_backend import DynamoAdoptSolicitationRepository
+
+# A migração é específica do DynamoDB, independente do STORAGE_BACKEND configurado
+table = DynamoAdoptSolicitationRepository().table
+
+
+def migrate_item(item):
+    """
+    Converte uma solicitação no formato antigo para o formato 'reference'.
+
+    Returns:
+        dict: O item migrado, ou None se o item já estiver no novo formato ou não puder ser migrado.
+    """
+    if 'petId' in item or 'userId' in item:
+        return None
+
+    pet = item.get('pet') or {}
+    user = item.get('user') or {}
+    if not pet.get('id') or not user.get('id'):
+        return None
+
+    migrated = {key: value for key, value in item.items() if key not in ('pet', 'user')}
+    migrated['petId'] = pet['id']
+    migrated['userId'] = user['id']
+    migrated['pet'] = project(pet, PET_PROJECTION)
+    migrated['user'] = project(user, USER_PROJECTION)
+    return migrated
+
+
+def migrate(page_size=100, dry_run=False):
+    """
+    Percorre a tabela de solicitações e migra as linhas no formato antigo.
+
+    Returns:
+        dict: Contadores de itens lidos, migrados, ignorados e com falha.
+    """
+    stats = {'scanned': 0, 'migrated': 0, 'skipped': 0, 'failed': 0}
+    scan_kwargs = {'Limit': page_size}
+
+    while True:
+        response = table.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            stats['scanned'] += 1
+            migrated = migrate_item(item)
+            if migrated is None:
+                stats['skipped'] += 1
+                continue
+
+            if dry_run:
+                stats['migrated'] += 1
+                continue
+
+            try:
+                table.put_item(
+                    Item=migrated,
+                    ConditionExpression='attribute_exists(id) AND attribute_not_exists(petId)'
+                )
+                stats['migrated'] += 1
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                stats['skipped'] += 1
+            except Exception as e:
+                print(f"Erro ao migrar a solicitação {item.get('id')}: {e}", file=sys.stderr)
+                stats['failed'] += 1
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=100, help='Itens lidos por página do scan')
+    parser.add_argument('--dry-run', action='store_true', help='Apenas conta as linhas que seriam migradas')
+    args = parser.parse_args(argv)
+
+    stats = migrate(page_size=args.page_size, dry_run=args.dry_run)
+    print(
+        f"Lidas: {stats['scanned']} | Migradas: {stats['migrated']} | "
+        f"Ignoradas: {stats['skipped']} | Falhas: {stats['failed']}"
+        + (" (dry-run)" if args.dry_run else "")
+    )
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
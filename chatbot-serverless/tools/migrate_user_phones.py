@@ -0,0 +1,106 @@
+"""
+Migra os telefones dos usuários para o formato E.164 ('+5511987654321').
+
+Usuários cadastrados antes da padronização têm o telefone gravado como foi
+digitado ('11987654321', '5511987654321', ...), e só são encontrados pelas
+consultas extras de PHONE_LEGACY_LOOKUP. A migração percorre a tabela e
+grava apenas o atributo `phone` de cada usuário com `UpdateItem`, condicionado
+ao valor lido, então um cadastro alterado nesse meio tempo não é sobrescrito.
+Depois dela, PHONE_LEGACY_LOOKUP=false deixa a identificação com uma consulta só.
+
+Uso (a partir da pasta chatbot-serverless):
+    python -m tools.migrate_user_phones --dry-run
+    python -m tools.migrate_user_phones --page-size 200
+"""
+import argparse
+import sys
+
+from services.storage.dynamodb_backend import DynamoUserRepository
+from utils.phone_utils import to_e164
+
+# A migração é específica do DynamoDB, independente do STORAGE_BACKEND configurado
+table = DynamoUserRepository().table
+
+
+def migrated_phone(item):
+    """
+    Retorna o telefone do usuário em E.164.
+
+    Returns:
+        str: O novo telefone, ou None se já estiver em E.164 ou não puder ser convertido.
+    """
+    phone = item.get('phone')
+    if not isinstance(phone, str) or not phone:
+        return None
+    canonical = to_e164(phone)
+    if canonical is None or canonical == phone:
+        return None
+    return canonical
+
+
+def migrate(page_size=100, dry_run=False):
+    """
+    Percorre a tabela de usuários e converte os telefones fora do padrão.
+
+    Returns:
+        dict: Contadores de itens lidos, migrados, ignorados e com falha.
+    """
+    stats = {'scanned': 0, 'migrated': 0, 'skipped': 0, 'failed': 0}
+    scan_kwargs = {
+        'Limit': page_size,
+        'ProjectionExpression': '#id, #phone',
+        'ExpressionAttributeNames': {'#id': 'id', '#phone': 'phone'},
+    }
+
+    while True:
+        response = table.scan(**scan_kwargs)
+
+        for item in response.get('Items', []):
+            stats['scanned'] += 1
+            phone = migrated_phone(item)
+            if phone is None:
+                stats['skipped'] += 1
+                continue
+
+            if dry_run:
+                stats['migrated'] += 1
+                continue
+
+            try:
+                table.update_item(
+                    Key={'id': item['id']},
+                    UpdateExpression='SET phone = :phone',
+                    ConditionExpression='phone = :old',
+                    ExpressionAttributeValues={':phone': phone, ':old': item['phone']}
+                )
+                stats['migrated'] += 1
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                stats['skipped'] += 1
+            except Exception as e:
+                print(f"Erro ao migrar o telefone do usuário {item.get('id')}: {e}", file=sys.stderr)
+                stats['failed'] += 1
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=100, help='Itens lidos por página do scan')
+    parser.add_argument('--dry-run', action='store_true', help='Apenas conta os telefones que seriam migrados')
+    args = parser.parse_args(argv)
+
+    stats = migrate(page_size=args.page_size, dry_run=args.dry_run)
+    print(
+        f"Lidos: {stats['scanned']} | Migrados: {stats['migrated']} | "
+        f"Ignorados: {stats['skipped']} | Falhas: {stats['failed']}"
+        + (" (dry-run)" if args.dry_run else "")
+    )
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
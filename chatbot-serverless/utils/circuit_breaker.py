@@ -0,0 +1,125 @@
+import threading
+import time
+
+from utils.metrics_utils import emit_metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# numeric value of each state in the CircuitBreakerState metric
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the dependency's circuit is open."""
+
+    def __init__(self, name):
+        super().__init__(f"Circuit breaker '{name}' is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker kept in the warm container's memory.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls fail
+    immediately for `recovery_timeout` seconds. Then a single trial call is let
+    through (half-open): a success closes the circuit, a failure opens it again.
+    Every state change is published as an EMF metric.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Returns True if a call to the dependency may be attempted now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self.rejected += 1
+            emit_metrics({'CircuitBreakerRejected': 1}, {'Dependency': self.name})
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != OPEN:
+                    self._transition(OPEN)
+
+    def call(self, function, *args, **kwargs):
+        """
+        Calls `function` through the breaker.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(self.name)
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'rejected': self.rejected,
+        }
+
+    def _transition(self, state):
+        previous, self.state = self.state, state
+        print(f"Circuit breaker '{self.name}': {previous} -> {state}")
+        emit_metrics(
+            {'CircuitBreakerState': STATE_VALUES[state]},
+            {'Dependency': self.name},
+            units={'CircuitBreakerState': 'None'},
+            properties={'previousState': previous, 'state': state},
+        )
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, failure_threshold=5, recovery_timeout=30):
+    """Returns the container-wide breaker of a dependency, creating it on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, failure_threshold, recovery_timeout)
+        return _breakers[name]
+
+
+def get_breaker_states():
+    """Returns a snapshot of every breaker created in this container."""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
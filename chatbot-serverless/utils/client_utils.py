@@ -0,0 +1,231 @@
+"""
+Central configuration of the clients used to reach downstream services.
+
+Every boto3 client and resource is created here with explicit connect/read
+timeouts and a retry policy, and is cached for the life of the container.
+Each AWS client also goes through a per-service circuit breaker, hooked into
+botocore's event system: while a service keeps failing, calls to it fail
+immediately with `CircuitOpenError` instead of holding the Lambda until timeout.
+
+Defaults can be overridden per service with environment variables, e.g.
+`POLLY_READ_TIMEOUT=2`, `DYNAMODB_MAX_ATTEMPTS=5`, `LEXV2_RUNTIME_RETRY_MODE=standard`.
+
+Twilio media downloads go through one `requests` session per container, whose
+keep-alive connections are reused by the next downloads.
+"""
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+from utils.circuit_breaker import get_breaker, CircuitOpenError
+from utils.metrics_utils import record_dependency_call
+
+DEFAULT_CLIENT_SETTINGS = {
+    'connect_timeout': 2,
+    'read_timeout': 10,
+    'max_attempts': 3,
+    'retry_mode': 'adaptive',
+    'failure_threshold': 5,
+    'recovery_timeout': 30,
+}
+
+# Non-essential dependencies (TTS) fail fast; the user still gets the text reply
+SERVICE_CLIENT_SETTINGS = {
+    'dynamodb': {'connect_timeout': 1, 'read_timeout': 3, 'max_attempts': 4},
+    'lexv2-runtime': {'read_timeout': 8, 'max_attempts': 2},
+    'polly': {'connect_timeout': 1, 'read_timeout': 3, 'max_attempts': 1, 'failure_threshold': 3},
+    'rekognition': {'read_timeout': 8, 'max_attempts': 2},
+    's3': {'connect_timeout': 2, 'read_timeout': 10, 'max_attempts': 3},
+}
+
+# Twilio media downloads (not an AWS client, but configured here with the rest)
+TWILIO_CONNECT_TIMEOUT = float(os.getenv('TWILIO_CONNECT_TIMEOUT', '2'))
+TWILIO_READ_TIMEOUT = float(os.getenv('TWILIO_READ_TIMEOUT', '10'))
+# keep-alive connections kept per host (Twilio's API and the media host it redirects to)
+TWILIO_POOL_SIZE = int(os.getenv('TWILIO_POOL_SIZE', '4'))
+# bytes read at a time from a download; also the read size of the S3 uploads of a download stream
+TWILIO_DOWNLOAD_CHUNK_SIZE = int(os.getenv('TWILIO_DOWNLOAD_CHUNK_SIZE', str(256 * 1024)))
+
+# HTTP status codes that count as a failure of the dependency (4xx are caller errors)
+_THROTTLING_CODES = {'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestLimitExceeded',
+                     'ProvisionedThroughputExceededException', 'TooManyRequestsException',
+                     'ServiceUnavailable', 'SlowDown'}
+
+_clients = {}
+_resources = {}
+_twilio_session = None
+_lock = threading.Lock()
+
+
+def get_client_settings(service):
+    """
+    Returns the effective settings of a service: defaults, per-service values and env overrides.
+
+    Args:
+        service (str): boto3 service name (e.g. 'polly', 'lexv2-runtime').
+
+    Returns:
+        dict: Timeouts, retry policy and circuit breaker thresholds.
+    """
+    settings = dict(DEFAULT_CLIENT_SETTINGS)
+    settings.update(SERVICE_CLIENT_SETTINGS.get(service, {}))
+
+    prefix = service.upper().replace('-', '_')
+    for name, value in settings.items():
+        override = os.getenv(f"{prefix}_{name.upper()}")
+        if override is not None:
+            settings[name] = override if isinstance(value, str) else type(value)(float(override))
+    return settings
+
+
+def get_client_config(service):
+    """Builds the botocore `Config` (timeouts and retries) of a service."""
+    settings = get_client_settings(service)
+    return Config(
+        connect_timeout=settings['connect_timeout'],
+        read_timeout=settings['read_timeout'],
+        retries={'max_attempts': settings['max_attempts'], 'mode': settings['retry_mode']},
+    )
+
+
+def get_service_breaker(service):
+    """Returns the circuit breaker that protects a service."""
+    settings = get_client_settings(service)
+    return get_breaker(service, settings['failure_threshold'], settings['recovery_timeout'])
+
+
+def _is_dependency_failure(http_response, parsed):
+    if http_response is not None and http_response.status_code >= 500:
+        return True
+    error_code = (parsed or {}).get('Error', {}).get('Code')
+    return error_code in _THROTTLING_CODES
+
+
+def register_circuit_breaker(client, service):
+    """
+    Hooks the service's circuit breaker into a botocore client.
+
+    Calls are refused before being sent while the circuit is open. Responses with
+    5xx/throttling errors and connection errors (after retries) count as failures.
+    Every call is also reported to `metrics_utils.record_dependency_call`.
+    """
+    breaker = get_service_breaker(service)
+    events = client.meta.events
+    service_id = client.meta.service_model.service_id.hyphenize()
+
+    def before_call(**kwargs):
+        record_dependency_call(service)
+        if not breaker.allow_request():
+            raise CircuitOpenError(service)
+
+    def after_call(http_response=None, parsed=None, **kwargs):
+        if _is_dependency_failure(http_response, parsed):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def after_call_error(exception=None, **kwargs):
+        if not isinstance(exception, CircuitOpenError):
+            breaker.record_failure()
+
+    events.register(f'before-call.{service_id}', before_call, unique_id=f'circuit-breaker-before-{service}')
+    events.register(f'after-call.{service_id}', after_call, unique_id=f'circuit-breaker-after-{service}')
+    events.register(f'after-call-error.{service_id}', after_call_error, unique_id=f'circuit-breaker-error-{service}')
+
+
+def get_client(service):
+    """
+    Returns the container-wide boto3 client of a service, configured and protected by its breaker.
+
+    Args:
+        service (str): boto3 service name.
+
+    Returns:
+        botocore.client.BaseClient: The cached client.
+    """
+    with _lock:
+        if service not in _clients:
+            client = boto3.client(service, config=get_client_config(service))
+            register_circuit_breaker(client, service)
+            _clients[service] = client
+        return _clients[service]
+
+
+def set_client(service, client):
+    """
+    Installs a stand-in client for a service (used by local tools such as the load generator).
+
+    Modules that bind their client at import time (e.g. `services.webhook_service`)
+    only see the stand-in if it is installed before they are imported.
+
+    Args:
+        service (str): boto3 service name.
+        client (object): Object exposing the client methods used by the code.
+    """
+    with _lock:
+        _clients[service] = client
+
+
+def get_resource(service):
+    """
+    Returns the container-wide boto3 resource of a service (e.g. 'dynamodb').
+
+    Args:
+        service (str): boto3 service name.
+
+    Returns:
+        boto3.resources.base.ServiceResource: The cached resource.
+    """
+    with _lock:
+        if service not in _resources:
+            resource = boto3.resource(service, config=get_client_config(service))
+            register_circuit_breaker(resource.meta.client, service)
+            _resources[service] = resource
+        return _resources[service]
+
+
+def get_twilio_session():
+    """
+    Returns the container-wide `requests` session used for Twilio media downloads.
+
+    Its connections are kept alive (up to TWILIO_POOL_SIZE per host) and reused by
+    the next downloads of the container, which skip the TCP and TLS handshakes.
+    `requests` is imported on first use: only the webhook downloads media.
+
+    Returns:
+        requests.Session: The cached session.
+    """
+    global _twilio_session
+    with _lock:
+        if _twilio_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=TWILIO_POOL_SIZE, pool_maxsize=TWILIO_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _twilio_session = session
+        return _twilio_session
+
+
+def get_http_pool_stats(session):
+    """
+    Returns the connection counters of a `requests` session's pools.
+
+    Returns:
+        dict: 'connections' opened and 'requests' sent since the session was created;
+            requests minus connections is how many reused a kept-alive connection.
+    """
+    stats = {'connections': 0, 'requests': 0}
+    # the same adapter may be mounted for several prefixes
+    for adapter in {id(adapter): adapter for adapter in list(session.adapters.values())}.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                stats['connections'] += pool.num_connections
+                stats['requests'] += pool.num_requests
+    return stats
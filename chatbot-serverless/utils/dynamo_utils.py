@@ -1,2 +1,244 @@
+import base64
+import contextvars
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.storage.base import UnprocessedKeysError
+from utils.phone_utils import to_e164
+
+# DynamoDB accepts at most 100 keys per BatchGetItem request
+BATCH_GET_MAX_KEYS = 100
+BATCH_GET_MAX_RETRIES = 5
+
+# DynamoDB accepts at most 100 actions per TransactWriteItems request
+TRANSACT_MAX_ACTIONS = 100
+TRANSACT_MAX_ATTEMPTS = 5
+TRANSACT_MAX_WORKERS = 4
+# códigos de cancelamento que não dependem do item: a transação pode ser repetida
+TRANSACT_RETRYABLE_CODES = ('None', 'TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded')
+
+
 def format_phone_number(phone):
-    return phone.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
\ No newline at end of file
+    """
+    Formata o telefone no padrão E.164 ('+5511987654321'), usado para gravar e buscar usuários.
+
+    Números que não podem ser convertidos (ex.: sem DDD) são apenas limpos de
+    espaços, hífens e parênteses, como antes.
+    """
+    return to_e164(phone) or phone.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+
+
+def batch_get_items(dynamodb, table_name, ids, cache=None, key_name='id'):
+    """
+    Busca vários itens de uma tabela pelo ID usando `BatchGetItem`.
+
+    Os IDs são deduplicados e os que já estão no `cache` não são buscados novamente.
+    As chaves são enviadas em lotes de 100 e as `UnprocessedKeys` são reenviadas
+    com backoff exponencial; as que continuarem sem leitura após BATCH_GET_MAX_RETRIES
+    tentativas resultam em UnprocessedKeysError, em vez de parecerem inexistentes.
+
+    Args:
+        dynamodb: Recurso boto3 do DynamoDB.
+        table_name (str): Nome da tabela.
+        ids (iterable): IDs dos itens a serem buscados.
+        cache (dict, opcional): Cache da invocação, indexado por (tabela, id).
+        key_name (str): Nome da chave de partição (default: 'id').
+
+    Returns:
+        dict: Mapa id -> item para os itens encontrados.
+
+    Raises:
+        UnprocessedKeysError: Com os itens lidos e os IDs que ficaram sem leitura.
+    """
+    if cache is None:
+        cache = {}
+
+    found = {}
+    missing = []
+    unprocessed = []
+    for item_id in dict.fromkeys(i for i in ids if i):
+        cached = cache.get((table_name, item_id))
+        if cached is not None:
+            found[item_id] = cached
+        else:
+            missing.append(item_id)
+
+    for start in range(0, len(missing), BATCH_GET_MAX_KEYS):
+        request = {
+            table_name: {'Keys': [{key_name: item_id} for item_id in missing[start:start + BATCH_GET_MAX_KEYS]]}
+        }
+        attempt = 0
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(table_name, []):
+                cache[(table_name, item[key_name])] = item
+                found[item[key_name]] = item
+
+            request = response.get('UnprocessedKeys') or None
+            if request:
+                attempt += 1
+                if attempt > BATCH_GET_MAX_RETRIES:
+                    unprocessed += [key[key_name] for key in request[table_name]['Keys']]
+                    break
+                time.sleep(min(0.05 * (2 ** attempt), 1))
+
+    if unprocessed:
+        raise UnprocessedKeysError(found, unprocessed)
+    return found
+
+
+def _action_item(action):
+    body = next(iter(action.values()))
+    return body['TableName'], json.dumps(body['Key'], sort_keys=True, default=str)
+
+
+def plan_transaction_chunks(groups, max_actions=TRANSACT_MAX_ACTIONS):
+    """
+    Distribui grupos de ações em transações de até `max_actions` ações.
+
+    Uma transação não pode ter duas ações sobre o mesmo item, então um grupo que
+    toca um item de um grupo anterior (ex.: duas solicitações do mesmo pet) vai
+    para uma transação posterior. Cada transação recebe um nível: as do mesmo
+    nível não compartilham itens e podem ser executadas em paralelo; os níveis
+    são executados em ordem, preservando a ordem dos grupos sobre o mesmo item.
+
+    Args:
+        groups (list): Pares (chave, ações) na ordem do pedido.
+        max_actions (int): Máximo de ações por transação.
+
+    Returns:
+        list: Níveis, cada um uma lista de transações (listas de grupos).
+    """
+    chunks = []  # [grupos, itens, quantidade de ações]
+    last_chunk = {}  # item -> índice da última transação que o usa
+    for key, actions in groups:
+        items = {_action_item(action) for action in actions}
+        index = max((last_chunk[item] + 1 for item in items if item in last_chunk), default=0)
+        while index < len(chunks) and (chunks[index][2] + len(actions) > max_actions or chunks[index][1] & items):
+            index += 1
+        if index == len(chunks):
+            chunks.append([[], set(), 0])
+        chunk = chunks[index]
+        chunk[0].append((key, actions))
+        chunk[1].update(items)
+        chunk[2] += len(actions)
+        for item in items:
+            last_chunk[item] = index
+
+    levels = []
+    item_level = {}
+    for chunk_groups, items, _ in chunks:
+        level = max((item_level[item] + 1 for item in items if item in item_level), default=0)
+        for item in items:
+            item_level[item] = level
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(chunk_groups)
+    return levels
+
+
+def _transact_chunk(client, groups, outcomes):
+    pending = groups
+    for attempt in range(TRANSACT_MAX_ATTEMPTS):
+        try:
+            # o token torna idempotente o reenvio da mesma tentativa pelo botocore
+            client.transact_write_items(
+                TransactItems=[action for _, actions in pending for action in actions],
+                ClientRequestToken=str(uuid.uuid4())
+            )
+            for key, _ in pending:
+                outcomes[key] = None
+            return
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get('CancellationReasons') or []
+            retry = []
+            offset = 0
+            for key, actions in pending:
+                codes = [reason.get('Code', 'None') for reason in reasons[offset:offset + len(actions)]]
+                offset += len(actions)
+                failed = [(index, code) for index, code in enumerate(codes) if code not in TRANSACT_RETRYABLE_CODES]
+                if failed:
+                    outcomes[key] = failed[0]
+                else:
+                    retry.append((key, actions))
+            if len(retry) == len(pending):
+                # só conflitos com outras transações ou limite de vazão: espera antes de repetir
+                time.sleep(min(0.05 * (2 ** attempt), 1))
+            pending = retry
+        except client.exceptions.TransactionInProgressException:
+            time.sleep(min(0.05 * (2 ** attempt), 1))
+        except client.exceptions.ProvisionedThroughputExceededException:
+            time.sleep(min(0.05 * (2 ** attempt), 1))
+        except Exception as e:
+            # ex.: ValidationException; a transação não será aceita repetindo
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code') or type(e).__name__
+            for key, _ in pending:
+                outcomes[key] = (None, code)
+            return
+
+        if not pending:
+            return
+
+    for key, _ in pending:
+        outcomes[key] = (None, 'TransactionConflict')
+
+
+def transact_write_groups(client, groups, max_workers=TRANSACT_MAX_WORKERS):
+    """
+    Grava grupos de ações com `TransactWriteItems`, cada grupo de forma atômica.
+
+    Os grupos são agrupados em transações de até 100 ações (`plan_transaction_chunks`).
+    Quando uma transação é cancelada, os `CancellationReasons` (um por ação, na
+    ordem enviada) indicam quais grupos falharam, por exemplo por uma condição
+    (`ConditionalCheckFailed`); os demais grupos são reenviados sem eles. Conflitos
+    com outras transações e limites de vazão são repetidos com backoff exponencial.
+    As transações de um mesmo nível são executadas em paralelo.
+
+    Args:
+        client: Client do DynamoDB (o do recurso, `table.meta.client`, aceita os tipos Python).
+        groups (list): Pares (chave, ações); a chave identifica o grupo no resultado.
+        max_workers (int): Transações enviadas ao mesmo tempo.
+
+    Returns:
+        dict: chave -> None se o grupo foi gravado, ou (índice da ação, código) se falhou
+            (índice None quando o grupo não foi gravado após as tentativas).
+    """
+    outcomes = {}
+    levels = plan_transaction_chunks(groups)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for chunks in levels:
+            # cada nível termina antes do próximo: grupos sobre o mesmo item mantêm a ordem
+            futures = [
+                executor.submit(contextvars.copy_context().run, _transact_chunk, client, chunk, outcomes)
+                for chunk in chunks
+            ]
+            for future in futures:
+                future.result()
+    return outcomes
+
+
+def encode_page_token(last_evaluated_key):
+    """Converte a `LastEvaluatedKey` do DynamoDB em um token opaco para a API."""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+def decode_page_token(token):
+    """
+    Converte o token recebido na API de volta em `ExclusiveStartKey`.
+
+    Raises:
+        ValueError: Se o token não foi gerado por `encode_page_token` (base64, JSON ou chave inválidos).
+    """
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except ValueError:
+        raise ValueError("Token de página inválido") from None
+    if not isinstance(key, dict) or not key or not all(isinstance(value, str) for value in key.values()):
+        raise ValueError("Token de página inválido")
+    return key
@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import json
+
+from utils.json_utils import dumps
+
+# Lambda rejects responses above 6 MB, counted on the serialized proxy response
+LAMBDA_RESPONSE_MAX_BYTES = 6 * 1024 * 1024
+
+
+def get_header(event, name):
+    """
+    Returns a request header from an API Gateway event, ignoring the header case.
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        name (str): Header name.
+
+    Returns:
+        str: The header value, or None if it was not sent.
+    """
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def get_request_body(event):
+    """
+    Returns the request body as text, decoding it when API Gateway delivers it base64-encoded
+    (binary media types, or test events that mimic them).
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+
+    Returns:
+        str: The request body ('' when the request has no body).
+    """
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode('utf-8')
+    return body
+
+
+def compute_etag(body):
+    """Computes a strong ETag from the response body."""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(event, etag):
+    """
+    Checks whether the `If-None-Match` header of the request matches the ETag.
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        etag (str): ETag of the current representation.
+
+    Returns:
+        bool: True if the client already has the current representation.
+    """
+    if_none_match = get_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    if '*' in candidates:
+        return True
+    # weak comparison, as recommended for If-None-Match
+    return etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in candidates)
+
+
+def http_response(event, status_code, body, content_type='application/json', headers=None, etag=None):
+    """
+    Builds an API Gateway proxy response with conditional GET.
+
+    For successful responses an ETag is sent (the given one, e.g. a cached catalog
+    response, or a hash of the body). When the request `If-None-Match` matches it, a
+    bodyless 304 is returned. Compression is left to API Gateway
+    (`minimumCompressionSize` in serverless.yml), which measures the encoded bytes
+    and negotiates the encoding with the client.
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        status_code (int): HTTP status of the response.
+        body (str): Response body.
+        content_type (str): Value of the Content-Type header.
+        headers (dict, optional): Extra response headers.
+        etag (str, optional): ETag to use instead of the body hash.
+
+    Returns:
+        dict: Response in the Lambda proxy integration format.
+    """
+    response_headers = {"Content-Type": content_type}
+    response_headers.update(headers or {})
+
+    if status_code == 200:
+        response_headers['ETag'] = etag or compute_etag(body)
+        if etag_matches(event, response_headers['ETag']):
+            del response_headers['Content-Type']
+            return {
+                "statusCode": 304,
+                "headers": response_headers,
+                "body": "",
+            }
+
+    return {
+        "statusCode": status_code,
+        "headers": response_headers,
+        "body": body,
+    }
+
+
+def json_response(event, status_code, payload, headers=None, etag=None):
+    """
+    Serializes the payload with the shared JSON serializer (Decimal, sets and
+    datetimes from DynamoDB included) and builds the response with `http_response`.
+
+    Args:
+        event (dict): Event data received by the Lambda function.
+        status_code (int): HTTP status of the response.
+        payload: JSON-serializable response payload.
+        headers (dict, optional): Extra response headers.
+        etag (str, optional): ETag to use instead of the body hash.
+
+    Returns:
+        dict: Response in the Lambda proxy integration format.
+    """
+    return http_response(event, status_code, dumps(payload), headers=headers, etag=etag)
+
+
+def response_size(response):
+    """
+    Returns the size in bytes of a proxy response as the Lambda runtime sends it.
+
+    The runtime serializes the response with `json.dumps`, so quotes, backslashes,
+    control and non-ASCII characters of the body are escaped and a body can grow
+    well past its own length.
+    """
+    return len(json.dumps(response))
@@ -0,0 +1,220 @@
+"""
+Preprocessing of the images users send to the webhook.
+
+Phone photos arrive at full resolution (often 3-5 MB, 4000px wide), while
+Rekognition labels a dog just as well at ~1280px. Before the photo reaches S3
+and Rekognition, the download is capped, the real format is sniffed from the
+magic bytes (the content type Twilio declares is not trusted) and, when Pillow
+is installed, the image is downscaled and re-encoded as JPEG.
+
+Decoding and resizing are CPU bound. With IMAGE_PROCESS_POOL_WORKERS > 0 they
+run in a process pool, so a large photo does not hold the GIL of the request
+thread; the default (0) runs inline, which is what Lambda needs since it has no
+/dev/shm for multiprocessing.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow is optional: without it the original is used as is
+    Image = None
+
+PILLOW_AVAILABLE = Image is not None
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_BYTES = int(os.getenv('MAX_IMAGE_BYTES', str(8 * 1024 * 1024)))
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '1280'))
+IMAGE_JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+IMAGE_PROCESS_POOL_WORKERS = int(os.getenv('IMAGE_PROCESS_POOL_WORKERS', '0'))
+
+# formats Rekognition accepts directly
+REKOGNITION_TYPES = ('image/jpeg', 'image/png')
+EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'image/heic': 'heic',
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class ImageTooLargeError(Exception):
+    """The image is bigger than MAX_IMAGE_BYTES."""
+
+    def __init__(self, max_bytes):
+        super().__init__(f"Image larger than {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class UnsupportedImageError(Exception):
+    """The bytes are not an image format that can be processed."""
+
+
+def sniff_image_type(data):
+    """
+    Detects the image format from its first bytes.
+
+    Args:
+        data (bytes): The beginning of the file (16 bytes are enough).
+
+    Returns:
+        str: The MIME type, or None if the format is not recognized.
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'heic', b'heix', b'mif1', b'msf1'):
+        return 'image/heic'
+    return None
+
+
+def read_capped(chunks, max_bytes=MAX_IMAGE_BYTES, content_length=None, hasher=None):
+    """
+    Reads a stream of chunks into memory, stopping as soon as it exceeds `max_bytes`.
+
+    Args:
+        chunks (iterable): Byte chunks (e.g. `response.iter_content(...)`).
+        max_bytes (int): Maximum size accepted.
+        content_length (str|int, optional): Declared size, rejected before reading when over the cap.
+        hasher (optional): hashlib object updated with every chunk as it arrives.
+
+    Returns:
+        bytes: The content.
+
+    Raises:
+        ImageTooLargeError: When the content is bigger than `max_bytes`.
+    """
+    if content_length is not None and str(content_length).isdigit() and int(content_length) > max_bytes:
+        raise ImageTooLargeError(max_bytes)
+
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        if len(buffer) > max_bytes:
+            raise ImageTooLargeError(max_bytes)
+    return bytes(buffer)
+
+
+def downscale_to_jpeg(data, max_dimension=IMAGE_MAX_DIMENSION, quality=IMAGE_JPEG_QUALITY):
+    """
+    Fits the image in `max_dimension` x `max_dimension` and encodes it as JPEG.
+
+    JPEGs are decoded in draft mode, which lets the decoder scale by 1/2, 1/4 or
+    1/8 while decoding, so a 12 MP photo is never fully expanded in memory. The
+    EXIF orientation is applied, since the derivative drops the EXIF data. A JPEG
+    that already fits is returned unchanged.
+
+    Args:
+        data (bytes): The original image.
+        max_dimension (int): Maximum width and height in pixels.
+        quality (int): JPEG quality of the derivative.
+
+    Returns:
+        tuple: (jpeg_bytes, width, height).
+
+    Raises:
+        UnsupportedImageError: When Pillow cannot decode the image.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format == 'JPEG' and max(image.size) <= max_dimension and not _has_rotation(image):
+                return data, image.width, image.height
+
+            image.draft('RGB', (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS, reducing_gap=2.0)
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=quality, optimize=True)
+            return output.getvalue(), image.width, image.height
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise UnsupportedImageError(str(e)) from e
+
+
+def _has_rotation(image):
+    # 0x0112 is the EXIF Orientation tag; 1 means the pixels are stored upright
+    return image.getexif().get(0x0112, 1) != 1
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_POOL_WORKERS)
+    return _pool
+
+
+def _downscale(data, max_dimension, quality):
+    if IMAGE_PROCESS_POOL_WORKERS <= 0:
+        return downscale_to_jpeg(data, max_dimension, quality)
+    try:
+        pool = _get_pool()
+    except OSError as e:
+        logger.warning(f"Process pool unavailable ({e}), processing the image inline")
+        return downscale_to_jpeg(data, max_dimension, quality)
+    return pool.submit(downscale_to_jpeg, data, max_dimension, quality).result()
+
+
+def preprocess_image(data, max_dimension=IMAGE_MAX_DIMENSION, quality=IMAGE_JPEG_QUALITY):
+    """
+    Sniffs the image format and builds the derivative sent to Rekognition.
+
+    Without Pillow the original is used as the derivative, as long as it is a
+    format Rekognition accepts (JPEG or PNG).
+
+    Args:
+        data (bytes): The original image, as downloaded.
+        max_dimension (int): Maximum width and height of the derivative.
+        quality (int): JPEG quality of the derivative.
+
+    Returns:
+        dict: content_type and extension of the original, derivative (bytes),
+            derivative_content_type, width and height (None without Pillow).
+
+    Raises:
+        UnsupportedImageError: When the bytes are not a supported image.
+    """
+    content_type = sniff_image_type(data[:16])
+    if content_type is None:
+        raise UnsupportedImageError('Unknown image format')
+
+    result = {
+        'content_type': content_type,
+        'extension': EXTENSIONS[content_type],
+        'derivative': data,
+        'derivative_content_type': content_type,
+        'width': None,
+        'height': None,
+    }
+
+    if not PILLOW_AVAILABLE:
+        if content_type not in REKOGNITION_TYPES:
+            raise UnsupportedImageError(f"{content_type} requires Pillow to be converted")
+        return result
+
+    derivative, width, height = _downscale(data, max_dimension, quality)
+    result.update(derivative=derivative, derivative_content_type='image/jpeg', width=width, height=height)
+    return result
@@ -0,0 +1,60 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is used otherwise
+    orjson = None
+
+
+def _default(value):
+    """
+    Converts the types returned by DynamoDB (and our own timestamps) to JSON types.
+
+    Called by the encoder only for objects it does not know, so the whole document
+    is serialized in a single pass, without copying it first.
+    """
+    if isinstance(value, Decimal):
+        # DynamoDB returns every number as Decimal
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        # string, number and binary sets
+        return list(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(
+    ensure_ascii=False,
+    check_circular=False,
+    separators=(',', ':'),
+    default=_default,
+)
+
+
+def dumps(obj):
+    """
+    Serializes an object to a compact JSON string, handling Decimal, sets and datetimes.
+
+    Uses orjson when it is installed and the standard library C encoder otherwise.
+
+    Args:
+        obj: Object to serialize (e.g. items read from DynamoDB).
+
+    Returns:
+        str: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return _encoder.encode(obj)
+
+
+def dumps_bytes(obj):
+    """Same as `dumps`, but returns UTF-8 encoded bytes (avoids a decode/encode round trip with orjson)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return _encoder.encode(obj).encode('utf-8')
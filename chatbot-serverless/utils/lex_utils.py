@@ -39,14 +39,43 @@ def generate_lex_response(intentName, sessionState, sessionAttributes, message,
     return lex_response_json
     
 
+def resolve_animal(animal_name):
+    """
+    Resolve o animal escolhido pelo usuário.
+
+    Primeiro procura o formato da lista ("Nome - Raça" ou "Nome - Espécie - Raça")
+    no banco de dados; se não encontrar, busca o texto livre no índice de busca
+    (services.pet_search_service), que tolera acentos e ordem das palavras. O texto
+    livre só escolhe o animal quando nomeia exatamente um; prefixos e erros de
+    digitação ("rex labrdor") voltam como opções para o usuário confirmar. Nos dois
+    caminhos só animais disponíveis são aceitos.
+
+    Returns:
+        tuple: (animal, opções). `animal` é o animal encontrado ou None; nesse caso
+            `opções` lista os animais mais próximos do texto (pode ser vazia).
+    """
+    parts = [part.strip() for part in animal_name.split(" - ")]
+    if len(parts) >= 2:
+        pet = get_pet_by_name_and_breed(parts[0], parts[-1])
+        if pet and pet.get('disponivel', True):
+            return pet, []
+
+    from services.pet_search_service import resolve_pet
+
+    try:
+        return resolve_pet(animal_name)
+    except Exception as e:
+        print(f"Erro ao buscar o animal '{animal_name}': {e}")
+        return None, []
+
+
 def animal_exists(animal_name):
     """
     Verifica se o animal especificado existe no banco de dados.
     """
-    name, breed = animal_name.split(" - ")
-    pet = get_pet_by_name_and_breed(name, breed)
+    pet, _ = resolve_animal(animal_name)
     print(pet)
     if pet:
         return pet
 
-    return False
\ No newline at end of file
+    return False
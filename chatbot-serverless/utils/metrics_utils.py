@@ -0,0 +1,75 @@
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'Aumigo')
+
+# set METRICS_ENABLED=false to silence the EMF lines (e.g. in local benchmarks)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+
+
+def emit_metrics(metrics, dimensions=None, units=None, properties=None):
+    """
+    Prints metrics in the CloudWatch Embedded Metric Format (EMF).
+
+    Lambda ships stdout to CloudWatch Logs, which extracts the metrics from the
+    log line without any API call.
+
+    Args:
+        metrics (dict): Metric name -> value (a number or a list of numbers).
+        dimensions (dict, optional): Dimension name -> value.
+        units (dict, optional): Metric name -> CloudWatch unit (default: 'Count').
+        properties (dict, optional): Extra fields logged with the metrics, not turned into metrics.
+
+    Returns:
+        dict: The EMF document (also returned when metrics are disabled).
+    """
+    dimensions = dimensions or {}
+    units = units or {}
+
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [list(dimensions)],
+                "Metrics": [{"Name": name, "Unit": units.get(name, 'Count')} for name in metrics],
+            }],
+        },
+    }
+    document.update(properties or {})
+    document.update(dimensions)
+    document.update(metrics)
+
+    if METRICS_ENABLED:
+        print(json.dumps(document, default=str))
+    return document
+
+
+# Dependency calls made in the active scopes (e.g. one webhook turn and, inside it, one intent)
+_call_counts = contextvars.ContextVar('dependency_call_counts', default=())
+
+
+@contextmanager
+def count_dependency_calls():
+    """
+    Counts the downstream calls made inside the block.
+
+    Every client created by `utils.client_utils` reports its calls here, so the
+    yielded dict ends up with service -> number of calls (e.g. {'dynamodb': 2, 'polly': 1}).
+    Scopes can be nested: a call is counted in every active scope.
+    """
+    counts = {}
+    token = _call_counts.set(_call_counts.get() + (counts,))
+    try:
+        yield counts
+    finally:
+        _call_counts.reset(token)
+
+
+def record_dependency_call(service):
+    """Adds one call of `service` to the active `count_dependency_calls` scopes, if any."""
+    for counts in _call_counts.get():
+        counts[service] = counts.get(service, 0) + 1
@@ -0,0 +1,93 @@
+"""
+Phone number canonicalization (E.164).
+
+The same number reaches the bot in several shapes: the WhatsApp sender
+('whatsapp:+5511987654321'), what users type when registering
+('(11) 98765-4321', '011 98765 4321', '+55 11 98765-4321') and the formats
+stored before canonicalization (digits without '+' or without the country
+code). `to_e164` turns all of them into '+5511987654321', the format users are
+stored and looked up with; `legacy_phone_variants` lists the older stored forms
+of a number, for lookups of users registered before.
+"""
+import os
+import re
+
+# country code of numbers typed without one (area code + number)
+DEFAULT_COUNTRY_CODE = os.getenv('DEFAULT_COUNTRY_CODE', '55')
+
+# E.164 allows up to 15 digits including the country code
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+# national numbers: 2-digit area code (DDD) + 8 (landline) or 9 (mobile) digits
+NATIONAL_DIGITS = (10, 11)
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def to_e164(phone, default_country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Returns the number in E.164 ('+' and digits), or None if it cannot be one.
+
+    Accepts channel prefixes ('whatsapp:', 'tel:'), '+' or '00' international
+    prefixes, national numbers with or without the trunk '0', and numbers that
+    already start with the default country code but lack the '+'.
+    """
+    if phone is None:
+        return None
+    text = str(phone).strip()
+    if ':' in text:
+        text = text.split(':', 1)[1].strip()
+
+    digits = _NON_DIGITS.sub('', text)
+    if text.startswith('+'):
+        pass
+    elif text.startswith('00'):
+        digits = digits[2:]
+    else:
+        digits = digits.lstrip('0')
+        if len(digits) in NATIONAL_DIGITS and default_country_code:
+            digits = default_country_code + digits
+        elif not (default_country_code and digits.startswith(default_country_code)
+                  and len(digits) - len(default_country_code) in NATIONAL_DIGITS):
+            return None
+
+    if not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS:
+        return None
+    return f"+{digits}"
+
+
+def _ninth_digit_variant(national):
+    # Brazilian mobiles gained a leading 9; old registrations and some WhatsApp
+    # accounts still carry the 8-digit form, so each form is tried for the other
+    if len(national) == 11 and national[2] == '9':
+        return national[:2] + national[3:]
+    if len(national) == 10 and national[2] in '6789':
+        return national[:2] + '9' + national[2:]
+    return None
+
+
+def legacy_phone_variants(phone, default_country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Lists the other forms the number may have been stored with, most likely first.
+
+    The forms are: the raw input with only spaces, dashes and parentheses removed
+    (the format used before E.164), the E.164 digits without '+', the national
+    number, and, for Brazilian mobiles, the same forms with or without the ninth digit.
+
+    Returns:
+        list: Distinct variants, never including the E.164 form itself.
+    """
+    canonical = to_e164(phone, default_country_code)
+    raw = str(phone).replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+    # channel addresses ('whatsapp:+55...') were never stored as typed
+    variants = [raw] if ':' not in raw else []
+    if canonical:
+        numbers = [canonical[1:]]
+        if default_country_code == '55' and canonical.startswith('+55'):
+            alternative = _ninth_digit_variant(canonical[3:])
+            if alternative:
+                numbers.append('55' + alternative)
+        for digits in numbers:
+            national = digits[len(default_country_code):] if digits.startswith(default_country_code) else None
+            variants += [f"+{digits}", digits] + ([national] if national else [])
+    return [variant for variant in dict.fromkeys(variants) if variant and variant != canonical]
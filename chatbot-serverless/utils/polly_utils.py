@@ -0,0 +1,193 @@
+"""
+Output profiles of the Polly text-to-speech.
+
+A profile fixes the voice, the engine (standard or neural), the output format
+and the sample rate. WhatsApp plays OGG/Opus voice notes natively, and speech
+at 16 kHz Opus is several times smaller than 22 kHz MP3, so replies reach phones
+on slow networks sooner and S3 egress drops. POLLY_PROFILE selects the profile
+(default: 'mp3', the original output); POLLY_VOICE, POLLY_ENGINE and
+POLLY_SAMPLE_RATE override single fields of it.
+
+'ogg_opus' needs a botocore recent enough to know the format; 'ogg_vorbis' works
+with any version.
+
+Texts longer than one Polly call are synthesized in chunks whose audio is
+concatenated, which only MP3 frames and PCM samples allow: OGG files written back
+to back become chained streams, and many mobile decoders play only the first
+one or reject the file. OGG profiles therefore synthesize up to POLLY_MAX_CHARS
+characters in a single call; longer texts are synthesized as MP3 with the same
+voice and engine (see `synthesis_profile`).
+"""
+import os
+import re
+
+# sample rates Polly accepts for each output format
+SAMPLE_RATES = {
+    'mp3': ('8000', '16000', '22050', '24000'),
+    'ogg_vorbis': ('8000', '16000', '22050', '24000'),
+    'ogg_opus': ('8000', '16000', '24000', '48000'),
+    'pcm': ('8000', '16000'),
+}
+CONTENT_TYPES = {
+    'mp3': 'audio/mpeg',
+    'ogg_vorbis': 'audio/ogg',
+    'ogg_opus': 'audio/ogg',
+    'pcm': 'audio/pcm',
+}
+EXTENSIONS = {
+    'mp3': 'mp3',
+    'ogg_vorbis': 'ogg',
+    'ogg_opus': 'ogg',
+    'pcm': 'pcm',
+}
+ENGINES = ('standard', 'neural')
+# formats whose separately synthesized files can be concatenated into one playable file
+CONCATENABLE_FORMATS = ('mp3', 'pcm')
+
+PROFILES = {
+    'mp3': {'voice': 'Vitoria', 'engine': 'standard', 'output_format': 'mp3', 'sample_rate': '22050'},
+    'mp3-neural': {'voice': 'Vitoria', 'engine': 'neural', 'output_format': 'mp3', 'sample_rate': '24000'},
+    'opus': {'voice': 'Vitoria', 'engine': 'standard', 'output_format': 'ogg_opus', 'sample_rate': '16000'},
+    'opus-neural': {'voice': 'Vitoria', 'engine': 'neural', 'output_format': 'ogg_opus', 'sample_rate': '16000'},
+    'vorbis': {'voice': 'Vitoria', 'engine': 'standard', 'output_format': 'ogg_vorbis', 'sample_rate': '16000'},
+    'vorbis-neural': {'voice': 'Vitoria', 'engine': 'neural', 'output_format': 'ogg_vorbis', 'sample_rate': '16000'},
+}
+
+POLLY_PROFILE = os.getenv('POLLY_PROFILE', 'mp3')
+
+# Polly bills and accepts at most 3000 characters of plain text per SynthesizeSpeech call
+POLLY_MAX_CHARS = 3000
+# longer texts are split into chunks of at most this size, synthesized in parallel
+POLLY_CHUNK_CHARS = min(int(os.getenv('POLLY_CHUNK_CHARS', '1000')), POLLY_MAX_CHARS)
+
+# sentence ends (followed by whitespace) and line breaks
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?;:…])\s+|\s*\n+\s*')
+# softer break points used inside a sentence that does not fit a chunk
+_CLAUSE_BREAK = re.compile(r'(?<=[,)\]])\s+|\s+-\s+')
+
+
+def get_profile(name=None, **overrides):
+    """
+    Returns a validated profile.
+
+    Args:
+        name (str, optional): Profile name (default: POLLY_PROFILE).
+        **overrides: voice, engine, output_format or sample_rate replacing the
+            profile values; when not given, POLLY_VOICE, POLLY_ENGINE and
+            POLLY_SAMPLE_RATE are used.
+
+    Returns:
+        dict: name, voice, engine, output_format, sample_rate, content_type, extension and
+            id (a string identifying the audio produced, part of the cache key).
+
+    Raises:
+        ValueError: For an unknown profile, engine or a sample rate the format does not support.
+    """
+    name = name or POLLY_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown Polly profile '{name}', expected one of: {', '.join(PROFILES)}")
+
+    profile = dict(PROFILES[name], name=name)
+    for field in ('voice', 'engine', 'sample_rate'):
+        value = overrides.get(field) or os.getenv(f"POLLY_{field.upper()}")
+        if value:
+            profile[field] = str(value)
+    if overrides.get('output_format'):
+        profile['output_format'] = overrides['output_format']
+
+    if profile['engine'] not in ENGINES:
+        raise ValueError(f"Unknown Polly engine '{profile['engine']}'")
+    if profile['sample_rate'] not in SAMPLE_RATES.get(profile['output_format'], ()):
+        raise ValueError(f"Sample rate {profile['sample_rate']} is not valid for {profile['output_format']}")
+
+    profile['content_type'] = CONTENT_TYPES[profile['output_format']]
+    profile['extension'] = EXTENSIONS[profile['output_format']]
+    profile['id'] = f"{profile['voice']}-{profile['engine']}-{profile['output_format']}-{profile['sample_rate']}"
+    return profile
+
+
+def is_concatenable(profile):
+    return profile['output_format'] in CONCATENABLE_FORMATS
+
+
+def synthesis_profile(profile, text):
+    """
+    Returns the profile the text is synthesized with.
+
+    The profile itself, unless the text needs more than one Polly call and the
+    profile's format cannot be concatenated (OGG): then the same voice and engine
+    in MP3, at the profile's sample rate when MP3 supports it.
+    """
+    if is_concatenable(profile) or len(text.strip()) <= POLLY_MAX_CHARS:
+        return profile
+    rates = SAMPLE_RATES['mp3']
+    sample_rate = profile['sample_rate'] if profile['sample_rate'] in rates else rates[-1]
+    return get_profile(profile['name'], voice=profile['voice'], engine=profile['engine'],
+                       output_format='mp3', sample_rate=sample_rate)
+
+
+def chunk_chars(profile):
+    """Maximum chunk size of the profile: OGG audio is never split, so a chunk is a whole Polly call."""
+    return POLLY_CHUNK_CHARS if is_concatenable(profile) else POLLY_MAX_CHARS
+
+
+def synthesize_kwargs(profile, text):
+    """Arguments of `polly.synthesize_speech` for the profile."""
+    return {
+        'Text': text,
+        'OutputFormat': profile['output_format'],
+        'VoiceId': profile['voice'],
+        'Engine': profile['engine'],
+        'SampleRate': profile['sample_rate'],
+    }
+
+
+def _pieces(text, pattern):
+    return [piece for piece in pattern.split(text) if piece and piece.strip()]
+
+
+def _split_long(sentence, max_chars):
+    # a sentence longer than a chunk: break at clauses, then at spaces, then anywhere
+    parts = []
+    for clause in _pieces(sentence, _CLAUSE_BREAK):
+        while len(clause) > max_chars:
+            cut = clause.rfind(' ', 0, max_chars + 1)
+            cut = cut if cut > 0 else max_chars
+            parts.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            parts.append(clause)
+    return parts
+
+
+def split_text(text, max_chars=POLLY_CHUNK_CHARS):
+    """
+    Splits a text into chunks of at most `max_chars` characters, at sentence boundaries.
+
+    Sentences (and lines, e.g. the entries of the pet list) are packed greedily
+    into chunks; a sentence that does not fit one chunk is split at commas, then
+    at spaces. The chunks, read in order, say the same as the text.
+
+    Args:
+        text (str): Text to synthesize.
+        max_chars (int): Maximum size of a chunk.
+
+    Returns:
+        list: The chunks (a single one when the text fits).
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    chunks = []
+    current = ''
+    for sentence in _pieces(text, _SENTENCE_BREAK):
+        for piece in ([sentence] if len(sentence) <= max_chars else _split_long(sentence, max_chars)):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,215 @@
+"""
+Latency, dependency-call and (optional) profiling instrumentation of the Lex intents.
+
+Every fulfillment wrapped by `instrument_intent` updates an in-memory histogram
+of the intent's latency and the number of calls it made to each downstream
+service, and emits the same data as an EMF line. `get_intent_stats()` returns
+the accumulated histograms, which is how local test runs and benchmarks read them.
+
+Profiling is off by default. Set `LEX_PROFILE=cprofile` (CPU, top functions by
+cumulative time) or `LEX_PROFILE=tracemalloc` (peak memory and top allocation
+sites), and `LEX_PROFILE_SAMPLE_RATE` (0-1, default 0.1) to profile a sample of
+the invocations.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from utils.metrics_utils import emit_metrics, count_dependency_calls
+
+LEX_PROFILE = os.getenv('LEX_PROFILE', '').lower()
+LEX_PROFILE_SAMPLE_RATE = float(os.getenv('LEX_PROFILE_SAMPLE_RATE', '0.1'))
+PROFILE_TOP_ENTRIES = 15
+
+# upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# latencies kept per intent to compute percentiles (oldest are dropped first)
+MAX_SAMPLES = 1000
+
+_stats = {}
+_profiles = {}
+_lock = threading.Lock()
+
+
+def _new_stats():
+    return {
+        'count': 0,
+        'errors': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        'samples': [],
+        'calls': {},
+    }
+
+
+def _bucket_index(latency_ms):
+    for index, upper in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= upper:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def record_intent(intent_name, latency_ms, calls, error=False):
+    """
+    Adds one fulfillment to the intent's histogram and emits it as EMF.
+
+    Args:
+        intent_name (str): Name of the intent.
+        latency_ms (float): Time spent in the fulfillment.
+        calls (dict): Downstream calls made, service -> count.
+        error (bool): Whether the fulfillment raised an exception.
+    """
+    with _lock:
+        stats = _stats.setdefault(intent_name, _new_stats())
+        stats['count'] += 1
+        stats['errors'] += int(error)
+        stats['total_ms'] += latency_ms
+        stats['max_ms'] = max(stats['max_ms'], latency_ms)
+        stats['buckets'][_bucket_index(latency_ms)] += 1
+        stats['samples'].append(latency_ms)
+        if len(stats['samples']) > MAX_SAMPLES:
+            del stats['samples'][0]
+        for service, count in calls.items():
+            stats['calls'][service] = stats['calls'].get(service, 0) + count
+
+    metrics = {
+        'IntentLatency': latency_ms,
+        'IntentErrors': int(error),
+        'DynamoDBCalls': calls.get('dynamodb', 0),
+        'PollyCalls': calls.get('polly', 0),
+    }
+    emit_metrics(
+        metrics,
+        {'Intent': intent_name},
+        units={'IntentLatency': 'Milliseconds'},
+        properties={'dependencyCalls': calls},
+    )
+
+
+def get_intent_stats():
+    """
+    Returns the histograms accumulated in this container (or local process).
+
+    Returns:
+        dict: intent -> count, errors, avg/p50/p95/p99/max latency (ms),
+        histogram (bucket upper bound -> count) and downstream calls per invocation.
+    """
+    with _lock:
+        report = {}
+        for intent_name, stats in _stats.items():
+            count = stats['count'] or 1
+            labels = [f"<={upper}ms" for upper in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            report[intent_name] = {
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'avg_ms': round(stats['total_ms'] / count, 2),
+                'p50_ms': round(_percentile(stats['samples'], 50), 2),
+                'p95_ms': round(_percentile(stats['samples'], 95), 2),
+                'p99_ms': round(_percentile(stats['samples'], 99), 2),
+                'max_ms': round(stats['max_ms'], 2),
+                'histogram': dict(zip(labels, stats['buckets'])),
+                'calls_per_invocation': {
+                    service: round(total / count, 2) for service, total in stats['calls'].items()
+                },
+            }
+        return report
+
+
+def get_last_profiles():
+    """Returns the last profiling report captured for each intent."""
+    with _lock:
+        return dict(_profiles)
+
+
+def reset_intent_stats():
+    """Clears the accumulated histograms and profiles (used between local runs)."""
+    with _lock:
+        _stats.clear()
+        _profiles.clear()
+
+
+def _should_profile():
+    return LEX_PROFILE in ('cprofile', 'tracemalloc') and random.random() < LEX_PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def _profile(intent_name):
+    mode = LEX_PROFILE if _should_profile() else None
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP_ENTRIES)
+            _store_profile(intent_name, {'mode': mode, 'report': output.getvalue()})
+        return
+
+    if mode == 'tracemalloc':
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not already_tracing:
+                tracemalloc.stop()
+            top = after.compare_to(before, 'lineno')[:PROFILE_TOP_ENTRIES]
+            _store_profile(intent_name, {
+                'mode': mode,
+                'peak_bytes': peak,
+                'report': '\n'.join(str(stat) for stat in top),
+            })
+        return
+
+    yield
+
+
+def _store_profile(intent_name, profile):
+    with _lock:
+        _profiles[intent_name] = profile
+    print(f"Profile ({profile['mode']}) da intent {intent_name}:\n{profile['report']}")
+
+
+@contextmanager
+def instrument_intent(intent_name):
+    """
+    Measures one intent fulfillment: latency, downstream calls and optional profile.
+
+    Usage:
+        with instrument_intent(intentName):
+            response = select_intent(intentName, event)
+    """
+    started = time.perf_counter()
+    error = False
+    with count_dependency_calls() as calls:
+        try:
+            with _profile(intent_name):
+                yield calls
+        except Exception:
+            error = True
+            raise
+        finally:
+            record_intent(intent_name, (time.perf_counter() - started) * 1000, dict(calls), error)
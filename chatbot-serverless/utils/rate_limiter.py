@@ -0,0 +1,226 @@
+"""
+Per-user and global rate limits of the webhook.
+
+Every limit is a token bucket per key (a phone number, or '*' for the global
+limits) kept in the warm container's memory, so a flood from one number is
+refused without any call. When DYNAMODB_TABLE_RATE_LIMITS is set, each limit
+is also enforced across containers by an atomic counter per key and time
+window (`UpdateItem ADD` with a condition on the limit). Global limits lease
+several tokens per update to keep that counter off the hot path (a container
+may end a window holding up to lease - 1 unused tokens, so the global limit
+errs on the strict side), and a key that exhausted its window is refused
+locally until the window ends. If the counter cannot be reached, the local
+bucket alone decides (fail open).
+
+Limits are configured as "<requests>/<seconds>", e.g. RATE_LIMIT_USER_IMAGES=10/3600;
+an empty value disables the limit.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.metrics_utils import emit_metrics
+
+RATE_LIMIT_TABLE = os.getenv('DYNAMODB_TABLE_RATE_LIMITS')
+RATE_LIMIT_USER_MESSAGES = os.getenv('RATE_LIMIT_USER_MESSAGES', '20/60')
+RATE_LIMIT_USER_IMAGES = os.getenv('RATE_LIMIT_USER_IMAGES', '10/3600')
+RATE_LIMIT_GLOBAL_MESSAGES = os.getenv('RATE_LIMIT_GLOBAL_MESSAGES', '3000/60')
+RATE_LIMIT_GLOBAL_IMAGES = os.getenv('RATE_LIMIT_GLOBAL_IMAGES', '120/60')
+
+# keys (phone numbers) whose buckets are kept per limiter; the least recently used are dropped
+MAX_TRACKED_KEYS = 10000
+
+GLOBAL_KEY = '*'
+
+
+def parse_limit(value):
+    """Parses '<requests>/<seconds>' into (requests, seconds); returns None when empty."""
+    if not value:
+        return None
+    requests, _, seconds = value.partition('/')
+    return int(requests), float(seconds or 60)
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled continuously at `rate` tokens per second."""
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self, tokens=1):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+
+class DynamoCounter:
+    """Fixed-window counters in DynamoDB: one item per (limiter, key, window), expired by TTL."""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    @property
+    def client(self):
+        from utils.client_utils import get_client
+        return get_client('dynamodb')
+
+    def acquire(self, name, key, window, window_seconds, amount, limit):
+        """
+        Adds `amount` to the counter unless it would go over `limit`.
+
+        Returns:
+            bool: True if the amount was granted.
+        """
+        try:
+            self.client.update_item(
+                TableName=self.table_name,
+                Key={'id': {'S': f"{name}#{key}#{window}"}},
+                UpdateExpression='ADD #count :amount SET expiresAt = if_not_exists(expiresAt, :expires)',
+                ConditionExpression='attribute_not_exists(#count) OR #count <= :ceiling',
+                ExpressionAttributeNames={'#count': 'count'},
+                ExpressionAttributeValues={
+                    ':amount': {'N': str(amount)},
+                    ':ceiling': {'N': str(limit - amount)},
+                    # kept one extra window so late requests of the previous window still find it
+                    ':expires': {'N': str(int((window + 2) * window_seconds))},
+                },
+            )
+            return True
+        except self.client.exceptions.ConditionalCheckFailedException:
+            return False
+
+
+class RateLimiter:
+    """
+    A named limit of `limit` requests per `window_seconds` for each key.
+
+    Args:
+        name (str): Name used in the metrics and the counter ids (e.g. 'user-images').
+        limit (int): Requests allowed per window.
+        window_seconds (float): Window length; the local bucket refills at limit / window.
+        lease (int): Tokens taken from the shared counter at a time (global limits).
+        counter (DynamoCounter, optional): Shared counter; local-only when None.
+    """
+
+    def __init__(self, name, limit, window_seconds, lease=1, counter=None):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.lease = max(1, min(lease, limit))
+        self.counter = counter
+        self.rejected = 0
+        self._buckets = OrderedDict()
+        self._credits = {}  # key -> (window, tokens leased from the counter and not used yet)
+        self._exhausted = {}  # key -> window in which the shared counter refused the key
+        self._lock = threading.Lock()
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.limit, self.limit / self.window_seconds)
+            while len(self._buckets) > MAX_TRACKED_KEYS:
+                old_key, _ = self._buckets.popitem(last=False)
+                self._credits.pop(old_key, None)
+                self._exhausted.pop(old_key, None)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def allow(self, key):
+        """Returns True if a request of `key` may go on, consuming one token."""
+        window = int(time.time() // self.window_seconds)
+        with self._lock:
+            if self._exhausted.get(key) == window or not self._bucket(key).try_acquire():
+                return self._reject(key)
+            if self.counter is None:
+                return True
+
+            credit_window, credits = self._credits.get(key, (window, 0))
+            if credit_window == window and credits > 0:
+                self._credits[key] = (window, credits - 1)
+                return True
+
+        granted = self._acquire_shared(key, window)
+        with self._lock:
+            if not granted:
+                self._exhausted[key] = window
+                return self._reject(key)
+            if granted > 1:
+                self._credits[key] = (window, granted - 1)
+        return True
+
+    def _acquire_shared(self, key, window):
+        try:
+            for amount in dict.fromkeys((self.lease, 1)):
+                if self.counter.acquire(self.name, key, window, self.window_seconds, amount, self.limit):
+                    return amount
+            return 0
+        except Exception as e:
+            # the counter is a fairness backstop: without it the local bucket still limits the container
+            print(f"Rate limit counter unavailable ({self.name}): {e}")
+            return 1
+
+    def _reject(self, key):
+        self.rejected += 1
+        emit_metrics({'RateLimited': 1}, {'Limiter': self.name})
+        return False
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, limit_setting, lease=1):
+    """
+    Returns the container-wide limiter `name`, creating it on first use.
+
+    Args:
+        name (str): Limiter name.
+        limit_setting (str): '<requests>/<seconds>' (empty disables the limiter).
+        lease (int): Tokens leased from the shared counter at a time.
+
+    Returns:
+        RateLimiter: The limiter, or None when disabled.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            limit = parse_limit(limit_setting)
+            counter = DynamoCounter(RATE_LIMIT_TABLE) if RATE_LIMIT_TABLE else None
+            _limiters[name] = RateLimiter(name, limit[0], limit[1], lease, counter) if limit else None
+        return _limiters[name]
+
+
+def check_webhook_limits(user_id, has_image):
+    """
+    Applies the webhook limits to one incoming message.
+
+    Args:
+        user_id (str): Phone number of the sender.
+        has_image (bool): Whether the message carries an image (S3 upload + Rekognition).
+
+    Returns:
+        str: The name of the limit exceeded, or None if the message may be processed.
+    """
+    checks = [
+        ('user-messages', RATE_LIMIT_USER_MESSAGES, user_id, 1),
+        ('global-messages', RATE_LIMIT_GLOBAL_MESSAGES, GLOBAL_KEY, 20),
+    ]
+    if has_image:
+        checks += [
+            ('user-images', RATE_LIMIT_USER_IMAGES, user_id, 1),
+            ('global-images', RATE_LIMIT_GLOBAL_IMAGES, GLOBAL_KEY, 5),
+        ]
+
+    for name, setting, key, lease in checks:
+        limiter = get_limiter(name, setting, lease)
+        if limiter is not None and not limiter.allow(key):
+            return name
+    return None
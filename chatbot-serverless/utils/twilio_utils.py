@@ -0,0 +1,172 @@
+"""
+Validation of the requests Twilio sends to the webhook.
+
+Runs before anything else in the webhook, so junk, oversized, forged or replayed
+traffic is refused for a few microseconds of CPU instead of the S3, Rekognition,
+DynamoDB and Lex calls of a real turn. The checks go from the cheapest up:
+
+1. body size (WEBHOOK_MAX_BODY_BYTES), taken from the event before decoding it;
+2. content type, which must be the form encoding Twilio uses;
+3. required fields (From, AccountSid) and, when TWILIO_ACCOUNT_SID is set, the account;
+4. the X-Twilio-Signature header: base64 HMAC-SHA1, keyed by TWILIO_AUTH_TOKEN,
+   of the public URL of the webhook followed by every POST parameter (sorted by
+   name, name then value). See https://www.twilio.com/docs/usage/security.
+
+The public URL is rebuilt from the API Gateway event (X-Forwarded-Proto, Host and
+the request path, stage included). Behind a custom domain or a proxy that
+rewrites the path, set WEBHOOK_PUBLIC_URL to the URL configured in Twilio.
+Signatures are always checked unless TWILIO_VALIDATE_SIGNATURE=false is set
+explicitly. With validation on and no TWILIO_AUTH_TOKEN, the check fails closed:
+every request is refused with 403 (reason 'auth token not configured'), so a
+deploy that lost its token shows up as rejected traffic instead of silently
+accepting forged requests.
+"""
+import base64
+import hashlib
+import hmac
+import os
+from urllib.parse import parse_qs, urlencode
+
+from utils.http_utils import get_header, get_request_body
+
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
+TWILIO_VALIDATE_SIGNATURE = os.getenv('TWILIO_VALIDATE_SIGNATURE', 'true').lower() != 'false'
+WEBHOOK_PUBLIC_URL = os.getenv('WEBHOOK_PUBLIC_URL')
+
+# a message is at most 1600 characters; even fully percent-encoded, with the media
+# and profile fields, a legitimate body stays well below this
+WEBHOOK_MAX_BODY_BYTES = int(os.getenv('WEBHOOK_MAX_BODY_BYTES', str(32 * 1024)))
+
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+REQUIRED_FIELDS = ('From', 'AccountSid')
+
+if not TWILIO_VALIDATE_SIGNATURE:
+    print("Twilio signature validation disabled: webhook requests are not authenticated")
+elif not TWILIO_AUTH_TOKEN:
+    print("TWILIO_AUTH_TOKEN is not set: every webhook request will be refused")
+
+
+class WebhookRejected(Exception):
+    """A webhook request refused by the validation; `reason` is a short label for logs and metrics."""
+
+    def __init__(self, status_code, reason):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+def compute_signature(auth_token, url, params):
+    """
+    Computes the X-Twilio-Signature of a request.
+
+    Args:
+        auth_token (str): Twilio auth token of the account.
+        url (str): Full URL Twilio posted to, query string included.
+        params (dict): POST parameters, name -> list of values.
+
+    Returns:
+        str: The base64 encoded HMAC-SHA1.
+    """
+    payload = [url]
+    for name in sorted(params):
+        for value in sorted(params[name]):
+            payload.append(name)
+            payload.append(value)
+    digest = hmac.new(auth_token.encode('utf-8'), ''.join(payload).encode('utf-8'), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def _with_and_without_port(url):
+    # Twilio signs the URL as configured; proxies may add or drop the default port
+    scheme, _, rest = url.partition('://')
+    host, slash, path = rest.partition('/')
+    default_port = ':443' if scheme == 'https' else ':80'
+    if host.endswith(default_port):
+        return [url, f"{scheme}://{host[:-len(default_port)]}{slash}{path}"]
+    if ':' not in host:
+        return [url, f"{scheme}://{host}{default_port}{slash}{path}"]
+    return [url]
+
+
+def webhook_urls(event):
+    """
+    Returns the candidate public URLs of the request, for the signature check.
+
+    Args:
+        event (dict): API Gateway proxy event.
+
+    Returns:
+        list: URLs (empty when the event has no Host header and WEBHOOK_PUBLIC_URL is not set).
+    """
+    query = event.get('multiValueQueryStringParameters') or {
+        name: [value] for name, value in (event.get('queryStringParameters') or {}).items()
+    }
+    query_string = f"?{urlencode(query, doseq=True)}" if query else ''
+
+    if WEBHOOK_PUBLIC_URL:
+        return _with_and_without_port(WEBHOOK_PUBLIC_URL + query_string)
+
+    host = get_header(event, 'Host')
+    if not host:
+        return []
+    scheme = get_header(event, 'X-Forwarded-Proto') or 'https'
+    # requestContext.path keeps the stage ('/dev/webhook'), event['path'] does not
+    path = (event.get('requestContext') or {}).get('path') or event.get('path') or '/'
+    return _with_and_without_port(f"{scheme}://{host}{path}{query_string}")
+
+
+def validate_signature(event, params):
+    """Checks the X-Twilio-Signature header of the request against the auth token."""
+    signature = get_header(event, 'X-Twilio-Signature')
+    if not signature:
+        return False
+    return any(
+        hmac.compare_digest(compute_signature(TWILIO_AUTH_TOKEN, url, params), signature)
+        for url in webhook_urls(event)
+    )
+
+
+def parse_webhook_request(event):
+    """
+    Validates a Twilio webhook request and returns its parameters.
+
+    Args:
+        event (dict): API Gateway proxy event.
+
+    Returns:
+        dict: POST parameters, name -> list of values (as `parse_qs`, blank values kept).
+
+    Raises:
+        WebhookRejected: With 413, 415, 400 or 403 when a check fails.
+    """
+    raw_body = event.get('body') or ''
+    # base64 grows the body by 4/3: compare before paying for the decoding
+    max_raw = WEBHOOK_MAX_BODY_BYTES * 4 // 3 + 4 if event.get('isBase64Encoded') else WEBHOOK_MAX_BODY_BYTES
+    if len(raw_body) > max_raw:
+        raise WebhookRejected(413, 'body too large')
+
+    content_type = get_header(event, 'Content-Type') or ''
+    if content_type.split(';')[0].strip().lower() != FORM_CONTENT_TYPE:
+        raise WebhookRejected(415, 'unsupported content type')
+
+    try:
+        body = get_request_body(event)
+    except ValueError:  # invalid base64 or UTF-8
+        raise WebhookRejected(400, 'undecodable body')
+    if len(body) > WEBHOOK_MAX_BODY_BYTES:
+        raise WebhookRejected(413, 'body too large')
+
+    # blank values are part of the signature (e.g. an empty Body on image messages)
+    params = parse_qs(body, keep_blank_values=True)
+    if not all(params.get(field, [''])[0] for field in REQUIRED_FIELDS):
+        raise WebhookRejected(400, 'missing required fields')
+    if TWILIO_ACCOUNT_SID and params['AccountSid'][0] != TWILIO_ACCOUNT_SID:
+        raise WebhookRejected(403, 'unknown account')
+
+    if TWILIO_VALIDATE_SIGNATURE:
+        if not TWILIO_AUTH_TOKEN:
+            raise WebhookRejected(403, 'auth token not configured')
+        if not validate_signature(event, params):
+            raise WebhookRejected(403, 'invalid signature')
+    return params
@@ -0,0 +1,96 @@
+"""
+Direct rendering of the TwiML replies sent back to Twilio.
+
+The webhook only ever answers with `<Response>` holding `<Message>` verbs (a text
+body or one `<Media>` URL), so the XML is written straight to a string instead
+of building a `twilio.twiml.MessagingResponse` tree and serializing it with
+ElementTree. The output is byte-identical to `str(MessagingResponse())` for the
+same messages, including the self-closing tags ElementTree emits for empty
+elements, and the twilio package is no longer imported on the hot path.
+"""
+import json
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+
+def escape_xml(text):
+    """Escapes element text the way ElementTree does (&, < and >)."""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _message(body):
+    if not body:
+        return '<Message />'
+    return f'<Message>{escape_xml(str(body))}</Message>'
+
+
+def _media_message(url):
+    if not url:
+        return '<Message><Media /></Message>'
+    return f'<Message><Media>{escape_xml(str(url))}</Media></Message>'
+
+
+def render_twiml(parts):
+    """
+    Renders a messaging response.
+
+    Args:
+        parts (list): ('text', body) or ('media', url) tuples, one `<Message>` each, in order.
+
+    Returns:
+        str: The TwiML document.
+    """
+    if not parts:
+        return XML_DECLARATION + '<Response />'
+    body = ''.join(_media_message(value) if kind == 'media' else _message(value) for kind, value in parts)
+    return f'{XML_DECLARATION}<Response>{body}</Response>'
+
+
+def lex_message_parts(messages):
+    """
+    Converts the Lex messages into TwiML parts.
+
+    Only CustomPayload messages whose content is a JSON object are parsed; they may
+    carry an `image` and/or `audio` URL (sent as media) and a `text`. Any other
+    message, or a payload that is not valid JSON, is sent as text.
+
+    Args:
+        messages (list): `messages` of the Lex recognize_text response.
+
+    Returns:
+        list: ('text', body) / ('media', url) tuples for `render_twiml`.
+    """
+    parts = []
+    for message in messages:
+        if 'content' not in message:
+            continue
+        content = message['content']
+
+        if message.get('contentType') == 'CustomPayload' and isinstance(content, str) and content.lstrip().startswith('{'):
+            try:
+                payload = json.loads(content)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                if 'image' in payload:
+                    parts.append(('media', payload['image']))
+                # audio is None when TTS was skipped (Polly failed or its breaker is open)
+                if payload.get('audio'):
+                    parts.append(('media', payload['audio']))
+                if 'text' in payload:
+                    parts.append(('text', payload['text']))
+                continue
+
+        parts.append(('text', content))
+    return parts
+
+
+def render_lex_messages(messages):
+    """Renders the Lex messages as the TwiML reply of the webhook."""
+    return render_twiml(lex_message_parts(messages))
@@ -0,0 +1,76 @@
+"""
+Warmup invocations of the Lambda entry points.
+
+A warmup event ({"warmup": true}, sent by the schedules in serverless.yml, or
+the event of serverless-plugin-warmup) is answered by the `warmable` wrapper
+before the handler runs: it prepares what the function's first real request
+would otherwise pay for (imports, boto3 clients, the pet catalog, the audio of
+the static phrases, see services.warmup_service) and returns a short report.
+"""
+import functools
+import time
+
+WARMUP_SOURCE = 'serverless-plugin-warmup'
+
+# False until the container served its first invocation (warmup or not)
+_container_warm = False
+
+
+def is_warmup_event(event):
+    """Returns True if the event is a warmup invocation instead of a request."""
+    return isinstance(event, dict) and (event.get('warmup') is True or event.get('source') == WARMUP_SOURCE)
+
+
+def run_steps(steps):
+    """
+    Runs the warmup steps in order; a failing step is reported and does not stop the others.
+
+    Args:
+        steps (list): (name, callable) pairs.
+
+    Returns:
+        dict: durations_ms (name -> ms), results (name -> returned value, when not None)
+            and errors (name -> message).
+    """
+    durations, results, errors = {}, {}, {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            result = step()
+            if result is not None:
+                results[name] = result
+        except Exception as e:
+            errors[name] = str(e)
+        durations[name] = round((time.perf_counter() - started) * 1000, 1)
+    return {'durations_ms': durations, 'results': results, 'errors': errors}
+
+
+def warmable(handler):
+    """
+    Decorates a Lambda entry point so warmup events run its warmup plan instead of the handler.
+
+    The plan is looked up by the handler's name in services.warmup_service, which
+    is imported only by warmup invocations.
+    """
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _container_warm
+        cold_start = not _container_warm
+        _container_warm = True
+
+        if not is_warmup_event(event):
+            return handler(event, context)
+
+        from services.warmup_service import warmup
+
+        started = time.perf_counter()
+        report = warmup(handler.__name__)
+        report.update({
+            'warmup': True,
+            'function': handler.__name__,
+            'coldStart': cold_start,
+            'totalMs': round((time.perf_counter() - started) * 1000, 1),
+        })
+        print(f"Warmup: {report}")
+        return report
+    return wrapper
@@ -1,9 +1,97 @@
-import boto3
-import datetime
-from services.rekogntion_service import detect_pet_in_image
-from services.s3_service import upload_from_url_to_s3
+import hashlib
+import logging
 
-def process_request_media(mediaType, mediaUrl, user_msg):
+logger = logging.getLogger(__name__)
+
+
+def preprocess_request_image(mediaUrl, user_id=None):
+    """
+    Downloads an image sent by the user and stores the original and the derivative in S3.
+
+    The download stops as soon as it exceeds MAX_IMAGE_BYTES, the format is taken
+    from the magic bytes instead of the declared content type, and the derivative
+    (downscaled JPEG, see utils.image_utils) is what Rekognition receives.
+
+    Objects are named by the SHA-256 of the original, computed while streaming, so
+    concurrent uploads never overwrite each other and a photo already stored
+    (a resend, or the same picture from another user) is neither preprocessed nor
+    uploaded again: a HEAD on the derivative is enough. Each user keeps a reference
+    to the images they sent (services.dynamo.user_images).
+
+    Args:
+        mediaUrl (str): Media URL.
+        user_id (str, optional): Phone number of the sender, for the reference.
+
+    Returns:
+        dict: sha256, original_key, derivative_key, derivative (bytes, None when the
+            image was already stored) and the preprocessing details, or
+            {'message': ...} with the reply for the user when the image cannot be used.
+    """
+    from services.s3_service import open_url_stream, upload_bytes_to_s3, object_exists
+    from services.dynamo.user_images import insert_user_image
+    from utils.client_utils import TWILIO_DOWNLOAD_CHUNK_SIZE
+    from utils.image_utils import (
+        EXTENSIONS, IMAGE_MAX_DIMENSION, MAX_IMAGE_BYTES, PILLOW_AVAILABLE,
+        ImageTooLargeError, UnsupportedImageError, preprocess_image, read_capped, sniff_image_type
+    )
+
+    hasher = hashlib.sha256()
+    try:
+        with open_url_stream(mediaUrl) as response:
+            data = read_capped(
+                response.iter_content(TWILIO_DOWNLOAD_CHUNK_SIZE),
+                MAX_IMAGE_BYTES,
+                response.headers.get('Content-Length'),
+                hasher
+            )
+    except ImageTooLargeError:
+        return {'message': f"A imagem é muito grande, envie uma foto de até {MAX_IMAGE_BYTES // (1024 * 1024)} MB."}
+    except Exception as e:
+        print(f"Erro ao baixar a imagem: {e}")
+        return {'message': "Não foi possível baixar a imagem, tente novamente."}
+
+    unsupported = {'message': "Não consegui abrir essa imagem, envie uma foto em JPEG ou PNG."}
+    content_type = sniff_image_type(data[:16])
+    if content_type is None:
+        return unsupported
+
+    sha256 = hasher.hexdigest()
+    original_key = f"assets/originals/{sha256}.{EXTENSIONS[content_type]}"
+    # the derivative depends on the resize settings too; without Pillow the original is used as is
+    derivative_key = f"assets/{sha256}-{IMAGE_MAX_DIMENSION}.jpg" if PILLOW_AVAILABLE else original_key
+    image = {'sha256': sha256, 'content_type': content_type, 'original_bytes': len(data), 'derivative': None}
+
+    if object_exists(derivative_key):
+        logger.info(f"Imagem {sha256} já armazenada, upload ignorado")
+        image['deduplicated'] = True
+    else:
+        try:
+            image.update(preprocess_image(data))
+        except UnsupportedImageError as e:
+            logger.info(f"Imagem não suportada: {e}")
+            return unsupported
+
+        if derivative_key != original_key and not object_exists(original_key):
+            upload_bytes_to_s3(data, original_key, content_type, prefix="")
+        if not upload_bytes_to_s3(image['derivative'], derivative_key, image['derivative_content_type'], prefix=""):
+            return {'message': "Não foi possível salvar a imagem, tente novamente."}
+
+        logger.info(
+            f"Imagem {content_type} de {len(data)} bytes -> derivado de {len(image['derivative'])} bytes "
+            f"({image['width']}x{image['height']})"
+        )
+        image['deduplicated'] = False
+
+    if user_id:
+        try:
+            insert_user_image(user_id, sha256, original_key, derivative_key, content_type, len(data))
+        except Exception as e:
+            print(f"Erro ao registrar a imagem do usuário: {e}")
+
+    return dict(image, original_key=original_key, derivative_key=derivative_key)
+
+
+def process_request_media(mediaType, mediaUrl, user_msg, user_id=None):
     """
     Process the request media and return the media content.
 
@@ -11,17 +99,24 @@ def process_request_media(mediaType, mediaUrl, user_msg):
         mediaType (str): Type of the media.
         mediaUrl (str): Media URL.
         user_msg (str): User message.
+        user_id (str, optional): Phone number of the sender.
 
     Returns:
         str: Media content.
     """
     
-    if mediaType == 'image/jpg' or mediaType == 'image/jpeg' or mediaType == 'image/png':
-        image_name = datetime.datetime.now().strftime("%Y%m%d%H%M%S") + "pet_image.jpg"
-        # download the image from the URL and upload it to S3
-        path_image = upload_from_url_to_s3(mediaUrl, image_name)
-        # detect the pet in the image
-        pet_detected = detect_pet_in_image(path_image)
+    if mediaType.startswith('image/'):
+        # only image turns need S3 and Rekognition: text turns skip creating those clients
+        from services.rekogntion_service import detect_pet_in_image
+
+        image = preprocess_request_image(mediaUrl, user_id)
+        if 'message' in image:
+            return image['message']
+
+        # a fresh derivative is small enough to go inline, so Rekognition does not read it back from S3
+        pet_detected = detect_pet_in_image(image['derivative_key'], image_bytes=image['derivative'])
+        if not pet_detected.get('success'):
+            return pet_detected.get('message', user_msg)
 
         # get the breeds of the pets detected
         type_pet = [pet['type'] for pet in pet_detected['pets'] if 'type' in pet]